@@ -0,0 +1,48 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Заглушка модуля machine для запуска драйверов на ПК (CPython). Смотри veml7700emu.py"""
+
+
+class Pin:
+    """Вывод MCU. Хранит уровень и обработчик прерывания, уровень меняется методом value."""
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, pin_id=None, mode=-1, pull=-1, value=None):
+        self.id = pin_id
+        self._value = 1 if value is None else value
+        self._handler = None
+        self._trigger = 0
+
+    def value(self, val=None):
+        if val is None:
+            return self._value
+        old, self._value = self._value, int(bool(val))
+        if self._handler is not None:
+            if old and not self._value and self._trigger & Pin.IRQ_FALLING:
+                self._handler(self)
+            if not old and self._value and self._trigger & Pin.IRQ_RISING:
+                self._handler(self)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        self._handler = handler
+        self._trigger = trigger
+
+
+class I2C:
+    """Шина I2C. На ПК используйте эмулятор устройства (veml7700emu.Veml7700Emu)."""
+    def __init__(self, *args, **kwargs):
+        raise OSError("I2C bus is not available on the host, use veml7700emu.Veml7700Emu")
+
+
+class SPI:
+    """Шина SPI. На ПК недоступна."""
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, *args, **kwargs):
+        raise OSError("SPI bus is not available on the host")
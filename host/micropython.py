@@ -0,0 +1,21 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Заглушка модуля micropython для запуска драйверов на ПК (CPython). Смотри veml7700emu.py"""
+
+
+def const(value):
+    return value
+
+
+def native(func):
+    return func
+
+
+def viper(func):
+    return func
+
+
+def schedule(func, arg):
+    """На ПК нет ограничений ISR, функция вызывается сразу"""
+    func(arg)
+    return True
@@ -0,0 +1,342 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Эмулятор VEML7700 на уровне регистров для запуска драйвера на ПК (CPython), без платы.
+
+Состав каталога host:
+    machine.py, micropython.py - заглушки модулей MicroPython;
+    veml7700emu.py - виртуальные часы (time.ticks_ms, sleep_ms и т.д.), эмулятор шины I2C с VEML7700
+    и эмулятор мультиплексора I2C (TCA9548A) с датчиками на каналах.
+
+Эмулируются регистры CFG, порогов, PSM, ALS, WHITE и состояния (флаги прерывания с учетом persistence),
+период интегрирования и обновления данных (включая PSM), 2.5 мс стабилизации после выхода из shutdown.
+Освещенность задаётся числом или функцией от времени [мс] (сценарий освещения).
+Время виртуальное: sleep_ms сдвигает часы мгновенно, поэтому тесты производительности драйвера
+(количество транзакций, время до готовности данных) выполняются быстро и воспроизводимо.
+
+Example:
+    import sys
+    sys.path.insert(0, "host")     # заглушки machine и micropython
+    import veml7700emu
+    clock = veml7700emu.install()  # виртуальное время в модуле time
+    emu = veml7700emu.Veml7700Emu(light=lambda t_ms: 100 + t_ms / 1000, clock=clock)
+
+    from sensor_pack_2.bus_service import I2cAdapter
+    from veml7700vishay import Veml7700
+    sensor = Veml7700(I2cAdapter(emu))
+    sensor.write_config(gain_index=3, it_index=2)
+    time.sleep_ms(110)
+    print(sensor.get_measurement_value(0), emu.transactions)
+    veml7700emu.uninstall()        # модуль time снова без виртуального времени
+"""
+
+import time
+
+_IT_RAW = 12, 8, 0, 1, 2, 3    # сырые значения ALS_IT для времени интегрирования 25 * 2 ** it_index мс
+_K_SHIFT = 3, 4, 0, 1       # log2(gain / gain_base) для каждого индекса усиления
+_RESOLUTION_BASE = 1.8432   # [лк/отсчёт] при IT=25ms, gain=×1/8
+_SETTLE_US = 2500           # стабилизация после выхода из shutdown
+_EIO = 5
+_ENODEV = 19
+
+
+class VirtualClock:
+    """Виртуальные часы с функциями модуля time MicroPython. Время идёт только при вызове sleep_ms/sleep_us
+    или advance_us."""
+    def __init__(self):
+        self.us = 0
+
+    def advance_us(self, us: int):
+        self.us += int(us)
+
+    def ticks_ms(self) -> int:
+        return self.us // 1000
+
+    def ticks_us(self) -> int:
+        return self.us
+
+    @staticmethod
+    def ticks_diff(ticks1: int, ticks2: int) -> int:
+        return ticks1 - ticks2
+
+    @staticmethod
+    def ticks_add(ticks: int, delta: int) -> int:
+        return ticks + delta
+
+    def sleep_ms(self, ms: int):
+        self.advance_us(1000 * ms)
+
+    def sleep_us(self, us: int):
+        self.advance_us(us)
+
+
+# функции модуля time MicroPython, которые заменяет install
+TIME_FUNCTIONS = "ticks_ms", "ticks_us", "ticks_diff", "ticks_add", "sleep_ms", "sleep_us"
+_saved = {}     # исходные атрибуты модуля time (None - атрибута не было), смотри uninstall
+
+
+def install(clock: VirtualClock | None = None) -> VirtualClock:
+    """Добавляет в модуль time функции MicroPython (TIME_FUNCTIONS), работающие от виртуальных часов clock.
+    Возвращает часы. Модуль time общий для всего процесса: после работы с эмулятором вызовите uninstall
+    (в тестах pytest используйте фикстуру clock из tests/conftest.py, она восстанавливает time сама)."""
+    if clock is None:
+        clock = VirtualClock()
+    for name in TIME_FUNCTIONS:
+        if name not in _saved:
+            _saved[name] = getattr(time, name, None)
+        setattr(time, name, getattr(clock, name))
+    return clock
+
+
+def uninstall():
+    """Восстанавливает модуль time, измененный install"""
+    for name, value in _saved.items():
+        if value is None:
+            delattr(time, name)
+        else:
+            setattr(time, name, value)
+    _saved.clear()
+
+
+class Veml7700Emu:
+    """Эмулятор шины I2C (интерфейс machine.I2C) с одним датчиком VEML7700"""
+    ADDR_CFG_REG = 0x00
+    ADDR_HIGH_THRESHOLD_REG = 0x01
+    ADDR_LOW_THRESHOLD_REG = 0x02
+    ADDR_PWR_MODE_REG = 0x03
+    ADDR_RAW_LUX_REG = 0x04
+    ADDR_WH_CH_REG = 0x05
+    ADDR_STATUS_REG = 0x06
+
+    def __init__(self, light=100.0, white_ratio: float = 1.5, clock: VirtualClock | None = None,
+                 address: int = 0x10, int_pin=None, transaction_us: int = 100):
+        """light - освещенность [лк]: число или функция light(t_ms) -> lux (сценарий освещения);
+        white_ratio - отношение отсчётов канала белого к каналу ALS (больше 2 - источник с ИК-составляющей);
+        clock - виртуальные часы (смотри install);
+        address - адрес датчика на шине;
+        int_pin - вывод (machine.Pin из заглушки), на котором эмулируется линия INT (низкий уровень - прерывание);
+        transaction_us - длительность одной транзакции на шине, на нее сдвигаются часы."""
+        self.light = light
+        self.white_ratio = white_ratio
+        self.clock = clock if clock is not None else VirtualClock()
+        self.address = address
+        self.int_pin = int_pin
+        self.transaction_us = transaction_us
+        self.regs = [0] * 8
+        self.regs[self.ADDR_CFG_REG] = 0x0001    # после включения питания датчик в shutdown
+        self._period_start = None    # начало текущего периода интегрирования [мкс] или None (shutdown)
+        self._pers_count = 0         # количество выходов за окно подряд
+        self._int_low = False        # нужно установить низкий уровень на линии INT
+        # счетчики для оценки трафика
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.samples = 0             # количество завершенных периодов интегрирования
+        self._fail = 0
+
+    # ---------- управление эмулятором ----------
+
+    def fail_next(self, count: int = 1):
+        """Следующие count транзакций завершатся ошибкой OSError(EIO)"""
+        self._fail = count
+
+    def power_loss(self):
+        """Пропадание питания датчика: регистры возвращаются к значениям после включения (shutdown)"""
+        self.regs = [0] * 8
+        self.regs[self.ADDR_CFG_REG] = 0x0001
+        self._period_start = None
+        self._pers_count = 0
+
+    def reset_counters(self):
+        self.transactions = self.bytes_read = self.bytes_written = self.samples = 0
+
+    def get_lux(self, t_ms: float) -> float:
+        light = self.light
+        return light(t_ms) if callable(light) else light
+
+    # ---------- модель датчика ----------
+
+    def _config(self) -> tuple:
+        """Возвращает (gain_index, it_index, persistence_count, int_en, shutdown) из регистра CFG"""
+        cfg = self.regs[self.ADDR_CFG_REG]
+        raw_it = (cfg >> 6) & 0x0F
+        it_index = _IT_RAW.index(raw_it) if raw_it in _IT_RAW else 2
+        return (cfg >> 11) & 0x03, it_index, 1 << ((cfg >> 4) & 0x03), bool(cfg & 0x02), bool(cfg & 0x01)
+
+    def _refresh_us(self, it_ms: int) -> int:
+        """Период обновления данных: время интегрирования плюс время ожидания режима PSM"""
+        psm = self.regs[self.ADDR_PWR_MODE_REG]
+        wait_ms = 500 << ((psm >> 1) & 0x03) if psm & 0x01 else 0
+        return 1000 * (it_ms + wait_ms)
+
+    def _advance(self):
+        """Завершает все периоды интегрирования, закончившиеся к текущему моменту"""
+        if self._period_start is None:
+            return
+        gain_index, it_index, pers, int_en, _ = self._config()
+        it_ms = 25 << it_index
+        refresh = self._refresh_us(it_ms)
+        now = self.clock.us
+        while self._period_start + 1000 * it_ms <= now:
+            self._complete_sample(self._period_start, it_index, gain_index, pers, int_en)
+            self._period_start += refresh
+        if self._int_low:
+            # линия INT устанавливается после обновления модели: обработчик может сразу обратиться к датчику
+            self._int_low = False
+            if self.int_pin is not None:
+                self.int_pin.value(0)
+
+    def update(self):
+        """Завершает периоды интегрирования, закончившиеся к текущему моменту, без обмена по шине.
+        Датчик измеряет независимо от шины: вызывайте после sleep_ms, чтобы линия INT (int_pin)
+        изменилась в нужный момент, а не при следующей транзакции."""
+        self._advance()
+
+    def _complete_sample(self, start_us: int, it_index: int, gain_index: int, pers: int, int_en: bool):
+        # средняя освещенность за период интегрирования, по 4 точкам
+        t0 = start_us / 1000
+        it_ms = 25 << it_index
+        lux = sum(self.get_lux(t0 + it_ms * (i + 0.5) / 4) for i in range(4)) / 4
+        resolution = _RESOLUTION_BASE / (1 << (_K_SHIFT[gain_index] + it_index))
+        counts = max(0.0, lux / resolution)
+        regs = self.regs
+        regs[self.ADDR_RAW_LUX_REG] = als = min(0xFFFF, int(counts))
+        regs[self.ADDR_WH_CH_REG] = min(0xFFFF, int(counts * self.white_ratio))
+        self.samples += 1
+        if not int_en:
+            self._pers_count = 0
+            return
+        high, low = regs[self.ADDR_HIGH_THRESHOLD_REG], regs[self.ADDR_LOW_THRESHOLD_REG]
+        if als > high or als < low:
+            self._pers_count += 1
+            if self._pers_count >= pers:
+                regs[self.ADDR_STATUS_REG] |= 0x4000 if als > high else 0x8000
+                self._int_low = True
+        else:
+            self._pers_count = 0
+
+    def _write_cfg(self, value: int):
+        old_sd = bool(self.regs[self.ADDR_CFG_REG] & 0x01)
+        self.regs[self.ADDR_CFG_REG] = value
+        if value & 0x01:
+            self._period_start = None
+        elif old_sd:
+            self._period_start = self.clock.us + _SETTLE_US
+        else:
+            # перенастройка без shutdown: интегрирование начинается заново
+            self._period_start = self.clock.us
+        self._pers_count = 0
+
+    # ---------- интерфейс machine.I2C ----------
+
+    def _transaction(self, addr: int):
+        self.clock.advance_us(self.transaction_us)
+        self.transactions += 1
+        if addr != self.address:
+            raise OSError(_ENODEV)
+        if self._fail:
+            self._fail -= 1
+            raise OSError(_EIO)
+        self._advance()
+
+    def scan(self) -> list:
+        return [self.address]
+
+    def readfrom_mem_into(self, addr: int, memaddr: int, buf, *, addrsize: int = 8):
+        self._transaction(addr)
+        val = self.regs[memaddr] if 0 <= memaddr < len(self.regs) else 0
+        for i in range(len(buf)):
+            # датчик выдаёт одно 16-ти битное слово, младший байт первым, далее 0xFF
+            buf[i] = (val & 0xFF, val >> 8)[i] if i < 2 else 0xFF
+        self.bytes_read += len(buf)
+        if self.ADDR_STATUS_REG == memaddr:
+            # чтение регистра состояния сбрасывает флаги прерывания
+            self.regs[memaddr] = 0
+            if self.int_pin is not None:
+                self.int_pin.value(1)
+
+    def readfrom_mem(self, addr: int, memaddr: int, nbytes: int, *, addrsize: int = 8) -> bytes:
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        return bytes(buf)
+
+    def writeto_mem(self, addr: int, memaddr: int, buf, *, addrsize: int = 8):
+        self._transaction(addr)
+        self.bytes_written += len(buf)
+        if len(buf) < 2 or memaddr > self.ADDR_PWR_MODE_REG:
+            return  # регистры только для чтения
+        value = buf[0] | (buf[1] << 8)
+        if self.ADDR_CFG_REG == memaddr:
+            self._write_cfg(value)
+        else:
+            self.regs[memaddr] = value
+            if self.ADDR_PWR_MODE_REG == memaddr and self._period_start is not None:
+                self._period_start = self.clock.us
+
+    def writeto(self, addr: int, buf, stop: bool = True):
+        self._transaction(addr)
+        self.bytes_written += len(buf)
+        return len(buf)
+
+    def readfrom_into(self, addr: int, buf, stop: bool = True):
+        self._transaction(addr)
+        for i in range(len(buf)):
+            buf[i] = 0xFF
+        self.bytes_read += len(buf)
+
+
+class I2cMuxEmu:
+    """Эмулятор шины I2C с мультиплексором TCA9548A (PCA9548A). К каналам подключаются эмуляторы датчиков
+    (Veml7700Emu), в том числе с одинаковыми адресами. Запись одного байта по адресу мультиплексора
+    выбирает каналы (бит n - канал n), остальные транзакции передаются устройству с нужным адресом
+    на выбранных каналах. Если такого устройства нет или их несколько (конфликт адресов), то OSError(ENODEV)."""
+
+    def __init__(self, devices: dict, clock: VirtualClock | None = None, address: int = 0x70,
+                 transaction_us: int = 100):
+        """devices - словарь: номер канала (0..7) -> эмулятор устройства или список эмуляторов;
+        clock - виртуальные часы (смотри install);
+        address - адрес мультиплексора на шине;
+        transaction_us - длительность записи выбора каналов, на нее сдвигаются часы."""
+        self.clock = clock if clock is not None else VirtualClock()
+        self.address = address
+        self.transaction_us = transaction_us
+        self.devices = {ch: dev if isinstance(dev, (list, tuple)) else [dev] for ch, dev in devices.items()}
+        self.mask = 0               # выбранные каналы (после включения питания - ни одного)
+        self.selects = 0            # количество записей выбора каналов
+
+    def _device(self, addr: int):
+        found = [dev for ch, devs in self.devices.items() if self.mask >> ch & 1
+                 for dev in devs if dev.address == addr]
+        if 1 != len(found):
+            self.clock.advance_us(self.transaction_us)
+            raise OSError(_ENODEV)
+        return found[0]
+
+    def scan(self) -> list:
+        return sorted({self.address} | {dev.address for ch, devs in self.devices.items() if self.mask >> ch & 1
+                                        for dev in devs})
+
+    def writeto(self, addr: int, buf, stop: bool = True):
+        if addr == self.address:
+            self.clock.advance_us(self.transaction_us)
+            if len(buf):
+                self.mask = buf[-1]
+                self.selects += 1
+            return len(buf)
+        return self._device(addr).writeto(addr, buf, stop)
+
+    def readfrom_into(self, addr: int, buf, stop: bool = True):
+        if addr == self.address:
+            self.clock.advance_us(self.transaction_us)
+            for i in range(len(buf)):
+                buf[i] = self.mask
+            return
+        self._device(addr).readfrom_into(addr, buf, stop)
+
+    def readfrom_mem_into(self, addr: int, memaddr: int, buf, *, addrsize: int = 8):
+        self._device(addr).readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+
+    def readfrom_mem(self, addr: int, memaddr: int, nbytes: int, *, addrsize: int = 8) -> bytes:
+        return self._device(addr).readfrom_mem(addr, memaddr, nbytes, addrsize=addrsize)
+
+    def writeto_mem(self, addr: int, memaddr: int, buf, *, addrsize: int = 8):
+        self._device(addr).writeto_mem(addr, memaddr, buf, addrsize=addrsize)
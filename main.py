@@ -7,6 +7,7 @@
 from micropython import const
 from machine import I2C, Pin
 from veml7700vishay import Veml7700
+from veml7700range import AutoRangeMixin
 from sensor_pack_2.bus_service import I2cAdapter
 import time
 
@@ -15,6 +16,12 @@ SDA_PIN_N = const(6)
 SCL_PIN_N = const(7)
 FREQ_I2C = const(400_000)
 
+
+class Sensor(AutoRangeMixin, Veml7700):
+    """Драйвер с автоматическим выбором диапазона (auto_range)"""
+    pass
+
+
 if __name__ == '__main__':
     # пожалуйста установите выводы scl и sda в конструкторе для вашей платы, иначе ничего не заработает!
     # please set scl and sda pins for your board, otherwise nothing will work!
@@ -24,7 +31,7 @@ if __name__ == '__main__':
     # i2c = I2C(0, scl=Pin(13), sda=Pin(12), freq=400_000)  # on Arduino Nano RP2040 Connect tested
     i2c = I2C(id=ID_I2C, scl=Pin(SCL_PIN_N), sda=Pin(SDA_PIN_N), freq=FREQ_I2C)  # on Raspberry Pi Pico
     adaptor = I2cAdapter(i2c)
-    sol = Veml7700(adaptor)
+    sol = Sensor(adaptor)
 
     # если у вас посыпались исключения EIO, то проверьте все соединения.
     # gain = 1, integration time = 25 ms, persistence = 1, interrupt = shutdown = False
@@ -33,23 +40,28 @@ if __name__ == '__main__':
     # sol.set_power_save_mode(True, 2)
     sol.set_power_save_mode(enable_psm=False, psm=0)
     delay = old_lux = curr_max = 1
-    mpi = Veml7700.get_max_possible_illumination(sol.gain[0], sol.integration_time[0])
+    mpi = sol.max_possible_illumination
     print(f"Наибольшая освещенность при текущих настройках [lux]: {mpi}")
     # вычислен для начальной(!) конфигурации
     wt = sol.get_conversion_cycle_time()
     print(f"Режим нелинейного исправления используется?: {sol.use_non_linear_correction}")
     cnt = 0
-    for lux in sol:
+    while True:
         # Переключаем режим коррекции каждые 30 измерений (для проверки)
         sol.use_non_linear_correction = 0 == (cnt // 30) % 2
+        # оба канала и освещенность из одного снимка
+        raw, wh, lux = sol.read_als_white()
         if lux != old_lux:
             curr_max = max(lux, curr_max)
-            wh = sol.get_measurement_value(2)
             #
-            print(f"lux: {lux} raw: {sol.last_raw} white ch.: {wh} max: {curr_max} Normalized [%]: {100*lux/curr_max} Use non lin corr: {sol.use_non_linear_correction}")
+            print(f"lux: {lux} raw: {raw} white ch.: {wh} max: {curr_max} Normalized [%]: {100*lux/curr_max} Use non lin corr: {sol.use_non_linear_correction}")
         old_lux = lux
         if lux > 0.95 * mpi:
             print("Текущая освещенность превысила максимальную, при данных настройках!"
-                  " Нужно перенастроить датчик! Предел почти достигнут!")
+                  " Предел почти достигнут! Автоматически перенастраиваю датчик!")
+            lux, raw, conv, ms = sol.auto_range()
+            print(f"gain: {sol.gain} integration time: {sol.integration_time} conversions: {conv} time [ms]: {ms}")
+            mpi = sol.max_possible_illumination
+            wt = sol.get_conversion_cycle_time()
         time.sleep_ms(wt)
         cnt += 1
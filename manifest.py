@@ -0,0 +1,13 @@
+# Манифест для сборки прошивки MicroPython с "замороженными" (frozen) модулями драйвера.
+# Замороженные модули исполняются из flash, байт-код не загружается в кучу при импорте.
+#
+# Сборка (пример для ESP8266):
+#     make -C ports/esp8266 BOARD=ESP8266_GENERIC FROZEN_MANIFEST=/path/to/veml7700/manifest.py
+#
+# Включены только модули, необходимые для работы VEML7700 по шине I2C. Остальные модули пакета
+# (spi_adapter, i2c_mux, bus_retry, bus_stats, filters, ring_buffer, base_sensor_ext) и расширения драйвера
+# (veml7700async, veml7700event, veml7700range, veml7700calib, veml7700state, veml7700lut, veml7700ext)
+# добавьте при необходимости.
+include("$(PORT_DIR)/boards/manifest.py")
+package("sensor_pack_2", files=("__init__.py", "base_sensor.py", "bus_service.py"))
+module("veml7700vishay.py")
@@ -1,10 +1,27 @@
 # micropython
 # MIT license
 # Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Основа классов датчиков. Редко используемые интерфейсы и функции (check_value_ex, get_error_str,
+ITemperatureSensor, IPower, IDentifier) находятся в модуле base_sensor_ext и загружаются только при обращении к ним."""
 import struct
 import micropython
 from sensor_pack_2 import bus_service
-from machine import Pin
+
+# заранее созданные кортежи порядка байт, чтобы не создавать их при каждом вызове _get_byteorder_as_str
+_BYTEORDER_BIG = 'big', '>'
+_BYTEORDER_LITTLE = 'little', '<'
+# имена, перенесенные в модуль base_sensor_ext
+_MOVED = "check_value_ex", "get_error_str", "ITemperatureSensor", "IPower", "IDentifier"
+
+
+def __getattr__(name: str):
+    """Совместимость со старым кодом: from sensor_pack_2.base_sensor import IPower импортирует
+    модуль base_sensor_ext при первом обращении."""
+    if name not in _MOVED:
+        raise AttributeError(name)
+    from sensor_pack_2 import base_sensor_ext
+    return getattr(base_sensor_ext, name)
+
 
 @micropython.native
 def check_value(value: int | None,
@@ -36,71 +53,6 @@ def check_value(value: int | None,
 
     return value
 
-@micropython.native
-def check_value_ex(value: int | float | None,
-                   valid_range: range | tuple[int, int] | tuple[float, float] | None,
-                   error_msg: str) -> int | float | None:
-    """
-    Универсальная проверка значения (int или float) в допустимом диапазоне.
-
-    Аргументы:
-        value (int | float | None): Проверяемое значение.
-        valid_range (range | tuple | None): Допустимый диапазон.
-            - range: для целых значений (например, range(-40, 126))
-            - tuple[int, int]: для целых границ (например, (-40, 125))
-            - tuple[float, float]: для вещественных границ (например, (-40.0, 125.0))
-        error_msg (str): Сообщение об ошибке при выходе за диапазон.
-
-    Возвращает:
-        int | float | None: Проверенное значение, или None если value is None.
-
-    Raises:
-        ValueError: Если значение выходит за пределы диапазона.
-    """
-    if value is None or valid_range is None:
-        return value
-
-    # Проверка типа value
-    if not isinstance(value, (int, float)):
-        raise ValueError(f"Неподдерживаемый тип значения: {type(value)}")
-
-    # Проверка диапазона в зависимости от типа valid_range
-    if isinstance(valid_range, range):
-        if value not in valid_range:
-            raise ValueError(error_msg)
-        return value
-
-    if not isinstance(valid_range, tuple):
-        raise ValueError(f"Неподдерживаемый тип диапазона: {type(valid_range)}")
-
-    if 2 != len(valid_range):
-        raise ValueError(f"tuple должен содержать 2 элемента (min, max), получено: {len(valid_range)}")
-
-    min_val, max_val = valid_range
-    # Проверка типов значений границ диапазона
-    if not isinstance(min_val, (int, float)) or not isinstance(max_val, (int, float)):
-        raise ValueError(f"Границы диапазона должны быть int или float: {valid_range}")
-
-    if min_val >= max_val:
-        raise ValueError(f"min_val: {min_val} должно быть строго меньше max_val: {max_val}")
-
-        # Проверка значения в диапазоне
-    if min_val <= value <= max_val:
-        return value
-    else:
-        raise ValueError(error_msg)
-
-
-def get_error_str(val_name: str, val: int | float, rng: range | tuple) -> str:
-    """Возвращает подробное сообщение об ошибке;
-    val_name - имя переменной в коде;
-    val - значение переменной val_name;
-    rng - допустимый диапазон переменной"""
-    if isinstance(rng, range):
-        return f"Значение {val} параметра {val_name} вне диапазона [{rng.start}..{rng.stop - 1}]!"
-    # tuple
-    return f"Значение {val} параметра {val_name} вне диапазона: {rng}!"
-
 
 def all_none(*args):
     """возвращает Истина, если все входные параметры в None.
@@ -114,7 +66,7 @@ def all_none(*args):
 class Device:
     """Класс - основа датчика"""
 
-    def __init__(self, adapter: bus_service.BusAdapter, address: int | Pin, big_byte_order: bool):
+    def __init__(self, adapter: bus_service.BusAdapter, address: "int | Pin", big_byte_order: bool):
         """Базовый класс Устройство.
         Если big_byte_order равен True -> порядок байтов в регистрах устройства «big»
         (Порядок от старшего к младшему), в противном случае порядок байтов в регистрах "little"
@@ -136,8 +88,8 @@ class Device:
     def _get_byteorder_as_str(self) -> tuple:
         """Return byteorder as string"""
         if self.is_big_byteorder():
-            return 'big', '>'
-        return 'little', '<'
+            return _BYTEORDER_BIG
+        return _BYTEORDER_LITTLE
 
     def pack(self, fmt_char: str, *values) -> bytes:
         if not fmt_char:
@@ -164,6 +116,11 @@ class Device:
 class DeviceEx(Device):
     """Класс - основа датчика. Добавил общие методы доступа к шине. 30.01.2024"""
 
+    def __init__(self, adapter: bus_service.BusAdapter, address: "int | Pin", big_byte_order: bool):
+        super().__init__(adapter, address, big_byte_order)
+        # буфер для чтения/записи 16-ти битных регистров без выделения памяти при каждом обращении
+        self._buf_16 = bytearray(2)
+
     def read_reg(self, reg_addr: int, bytes_count=2) -> bytes:
         """считывает из регистра датчика значение.
         bytes_count - размер значения в байтах.
@@ -179,14 +136,33 @@ class DeviceEx(Device):
         byte_order = self._get_byteorder_as_str()[0]
         return self.adapter.write_register(self.address, reg_addr, value, bytes_count, byte_order)
 
+    @micropython.native
     def read_reg_16(self, address: int, signed: bool = False) -> int:
-        """Чтение регистра разрядностью 16 бит"""
-        _raw = self.read_reg(address, 2)
-        return self.unpack("h" if signed else "H", _raw)[0]
+        """Чтение регистра разрядностью 16 бит.
+        Значение считывается в буфер _buf_16 и собирается из байт напрямую, без struct.unpack,
+        поэтому в установившемся режиме память не выделяется."""
+        buf = self._buf_16
+        self.adapter.read_buf_from_memory(self.address, address, buf, 1)
+        if self.big_byte_order:
+            val = (buf[0] << 8) | buf[1]
+        else:
+            val = buf[0] | (buf[1] << 8)
+        if signed and val & 0x8000:
+            return val - 0x10000
+        return val
 
+    @micropython.native
     def write_reg_16(self, address: int, value: int):
-        """Запись регистра разрядностью 16 бит"""
-        self.write_reg(address, value, 2)
+        """Запись регистра разрядностью 16 бит.
+        Байты значения помещаются в буфер _buf_16, без int.to_bytes, поэтому память не выделяется."""
+        buf = self._buf_16
+        if self.big_byte_order:
+            buf[0] = (value >> 8) & 0xFF
+            buf[1] = value & 0xFF
+        else:
+            buf[0] = value & 0xFF
+            buf[1] = (value >> 8) & 0xFF
+        return self.adapter.write_buf_to_memory(self.address, address, buf)
 
     def read(self, n_bytes: int) -> bytes:
         """Читает из устройства n_bytes байт. Добавил 25.01.2024"""
@@ -240,50 +216,6 @@ class Iterator:
         raise NotImplementedError()
 
 
-class ITemperatureSensor:
-    """Вспомогательный или основной датчик температуры"""
-
-    def enable_temp_meas(self, enable: bool = True):
-        """Включает измерение температуры если enable Истина
-        Для переопределения программистом!!!"""
-        raise NotImplementedError()
-
-    def get_temperature(self) -> [int, float]:
-        """Возвращает температуру корпуса датчика в градусах Цельсия!
-        Для переопределения программистом!!!"""
-        raise NotImplementedError()
-
-
-# 0 - устройство выполняет все свои функции (максимальное энергопотребление)
-# maximum (на ваш выбор) - устройство выполняет минимум своих функций (минимальное энергопотребление)
-#
-class IPower:
-    """интерфейс управления мощностью потребления устройства"""
-
-    def set_power_level(self, level: int | None = 0) -> int:
-        """level >=0 or None
-        Устанавливает режим мощности;
-        level равен 0 - устройство выполняет все свои функции (максимальное энергопотребление)
-        level равен maximum (на ваш выбор) - устройство выполняет минимум своих функций (минимальное энергопотребление)
-        Возвращает текущий уровень потребления устройства.
-        Если level в None, то метод должен возвратить текущий уровень потребления устройства!
-        Если значение из регистра устройства не совпадет со шкалой 0-все включено...максимум-все выключено, то
-        преобразуйте его!
-        """
-        raise NotImplementedError()
-
-
-class IDentifier:
-    """Интерфейс идентификации"""
-
-    def get_id(self):
-        raise NotImplementedError()
-
-    def soft_reset(self):
-        """Программный сброс устройства"""
-        raise NotImplementedError()
-
-
 class IBaseSensorEx:
     """интерфейсы, обязательные для большинства датчиков"""
 
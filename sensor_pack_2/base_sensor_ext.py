@@ -0,0 +1,116 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Редко используемые интерфейсы и функции проверки значений, вынесенные из base_sensor,
+чтобы не загружать их в проектах, которым они не нужны."""
+import micropython
+
+
+@micropython.native
+def check_value_ex(value: int | float | None,
+                   valid_range: range | tuple[int, int] | tuple[float, float] | None,
+                   error_msg: str) -> int | float | None:
+    """
+    Универсальная проверка значения (int или float) в допустимом диапазоне.
+
+    Аргументы:
+        value (int | float | None): Проверяемое значение.
+        valid_range (range | tuple | None): Допустимый диапазон.
+            - range: для целых значений (например, range(-40, 126))
+            - tuple[int, int]: для целых границ (например, (-40, 125))
+            - tuple[float, float]: для вещественных границ (например, (-40.0, 125.0))
+        error_msg (str): Сообщение об ошибке при выходе за диапазон.
+
+    Возвращает:
+        int | float | None: Проверенное значение, или None если value is None.
+
+    Raises:
+        ValueError: Если значение выходит за пределы диапазона.
+    """
+    if value is None or valid_range is None:
+        return value
+
+    # Проверка типа value
+    if not isinstance(value, (int, float)):
+        raise ValueError(f"Неподдерживаемый тип значения: {type(value)}")
+
+    # Проверка диапазона в зависимости от типа valid_range
+    if isinstance(valid_range, range):
+        if value not in valid_range:
+            raise ValueError(error_msg)
+        return value
+
+    if not isinstance(valid_range, tuple):
+        raise ValueError(f"Неподдерживаемый тип диапазона: {type(valid_range)}")
+
+    if 2 != len(valid_range):
+        raise ValueError(f"tuple должен содержать 2 элемента (min, max), получено: {len(valid_range)}")
+
+    min_val, max_val = valid_range
+    # Проверка типов значений границ диапазона
+    if not isinstance(min_val, (int, float)) or not isinstance(max_val, (int, float)):
+        raise ValueError(f"Границы диапазона должны быть int или float: {valid_range}")
+
+    if min_val >= max_val:
+        raise ValueError(f"min_val: {min_val} должно быть строго меньше max_val: {max_val}")
+
+        # Проверка значения в диапазоне
+    if min_val <= value <= max_val:
+        return value
+    else:
+        raise ValueError(error_msg)
+
+
+def get_error_str(val_name: str, val: int | float, rng: range | tuple) -> str:
+    """Возвращает подробное сообщение об ошибке;
+    val_name - имя переменной в коде;
+    val - значение переменной val_name;
+    rng - допустимый диапазон переменной"""
+    if isinstance(rng, range):
+        return f"Значение {val} параметра {val_name} вне диапазона [{rng.start}..{rng.stop - 1}]!"
+    # tuple
+    return f"Значение {val} параметра {val_name} вне диапазона: {rng}!"
+
+
+class ITemperatureSensor:
+    """Вспомогательный или основной датчик температуры"""
+
+    def enable_temp_meas(self, enable: bool = True):
+        """Включает измерение температуры если enable Истина
+        Для переопределения программистом!!!"""
+        raise NotImplementedError()
+
+    def get_temperature(self) -> [int, float]:
+        """Возвращает температуру корпуса датчика в градусах Цельсия!
+        Для переопределения программистом!!!"""
+        raise NotImplementedError()
+
+
+# 0 - устройство выполняет все свои функции (максимальное энергопотребление)
+# maximum (на ваш выбор) - устройство выполняет минимум своих функций (минимальное энергопотребление)
+#
+class IPower:
+    """интерфейс управления мощностью потребления устройства"""
+
+    def set_power_level(self, level: int | None = 0) -> int:
+        """level >=0 or None
+        Устанавливает режим мощности;
+        level равен 0 - устройство выполняет все свои функции (максимальное энергопотребление)
+        level равен maximum (на ваш выбор) - устройство выполняет минимум своих функций (минимальное энергопотребление)
+        Возвращает текущий уровень потребления устройства.
+        Если level в None, то метод должен возвратить текущий уровень потребления устройства!
+        Если значение из регистра устройства не совпадет со шкалой 0-все включено...максимум-все выключено, то
+        преобразуйте его!
+        """
+        raise NotImplementedError()
+
+
+class IDentifier:
+    """Интерфейс идентификации"""
+
+    def get_id(self):
+        raise NotImplementedError()
+
+    def soft_reset(self):
+        """Программный сброс устройства"""
+        raise NotImplementedError()
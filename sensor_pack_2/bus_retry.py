@@ -0,0 +1,151 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Адаптер шины I2C с повтором транзакций после ошибок (EIO, ETIMEDOUT и т.д.), паузой между повторами,
+восстановлением 'зависшей' шины (SDA удерживается устройством в низком уровне) и счетчиками ошибок устройств.
+Одиночный сбой из-за помех или плохого контакта больше не прерывает цикл измерений.
+
+Example:
+    def make_bus():
+        return I2C(1, scl=Pin(7), sda=Pin(6), freq=400_000)
+    adapter = RetryI2cAdapter(make_bus(), retries=2, scl_pin=7, sda_pin=6, bus_factory=make_bus)
+    sensor = Veml7700(adapter)
+"""
+
+import time
+from machine import I2C, Pin
+from sensor_pack_2.bus_service import I2cAdapter
+
+
+class RetryI2cAdapter(I2cAdapter):
+    """Адаптер шины I2C с ограниченным количеством повторов транзакций.
+    Пока ошибок нет, транзакция выполняется так же, как в I2cAdapter, без дополнительных затрат.
+    После ошибки транзакция повторяется не более retries раз с паузой backoff_ms * 2 ** номер_повтора.
+    Начиная со второй ошибки подряд перед повтором выполняется восстановление шины (recover_bus), если заданы
+    выводы и функция создания шины.
+    Запись, выполненная повторно, проверяется чтением регистра (verify_writes), так как неизвестно,
+    дошла ли до устройства запись, завершившаяся ошибкой. Не используйте проверку для регистров только для записи!
+    Внимание: повтор чтения регистра, сбрасываемого при чтении (например, регистр состояния), может потерять флаги."""
+
+    def __init__(self, bus: I2C, retries: int = 2, backoff_ms: int = 1, verify_writes: bool = True,
+                 scl_pin: int | None = None, sda_pin: int | None = None, bus_factory=None):
+        """retries - наибольшее количество повторов транзакции;
+        backoff_ms - пауза перед первым повтором, удваивается перед каждым следующим;
+        verify_writes - проверять чтением результат повторной записи в регистр;
+        scl_pin, sda_pin - номера выводов MCU линий SCL и SDA для восстановления шины;
+        bus_factory - функция без параметров, создающая шину I2C заново (после восстановления)."""
+        super().__init__(bus)
+        self.retries = retries
+        self.backoff_ms = backoff_ms
+        self.verify_writes = verify_writes
+        self._scl_pin = scl_pin
+        self._sda_pin = sda_pin
+        self._bus_factory = bus_factory
+        self._errors = dict()       # адрес устройства -> количество ошибок
+        self.retry_count = 0        # количество выполненных повторов
+        self.recoveries = 0         # количество восстановлений шины
+
+    def get_error_count(self, device_addr: int | None = None) -> int:
+        """Возвращает количество ошибок транзакций устройства device_addr или всех устройств (None)"""
+        if device_addr is None:
+            return sum(self._errors.values())
+        return self._errors.get(device_addr, 0)
+
+    def reset_error_counters(self):
+        self._errors = dict()
+        self.retry_count = 0
+        self.recoveries = 0
+
+    def recover_bus(self) -> bool:
+        """Восстанавливает шину, если устройство удерживает SDA в низком уровне: до 9 импульсов на SCL,
+        затем условие STOP и создание шины заново функцией bus_factory.
+        Возвращает Истина, если восстановление выполнено (заданы выводы и bus_factory)."""
+        if self._scl_pin is None or self._sda_pin is None or self._bus_factory is None:
+            return False
+        scl = Pin(self._scl_pin, Pin.OPEN_DRAIN, value=1)
+        sda = Pin(self._sda_pin, Pin.IN, Pin.PULL_UP)
+        for _ in range(9):
+            if sda.value():
+                break
+            scl.value(0)
+            time.sleep_us(5)
+            scl.value(1)
+            time.sleep_us(5)
+        # STOP: SDA из низкого уровня в высокий при высоком уровне SCL
+        sda = Pin(self._sda_pin, Pin.OPEN_DRAIN, value=0)
+        time.sleep_us(5)
+        scl.value(1)
+        time.sleep_us(5)
+        sda.value(1)
+        self.bus = self._bus_factory()
+        self.recoveries += 1
+        return True
+
+    def _retry(self, error: OSError, device_addr: int, method: str, args: tuple, verify_reg: int | None = None,
+               verify_data=None):
+        """Повторяет транзакцию self.bus.method(*args) после ошибки error. Метод берется у шины при каждой
+        попытке, так как recover_bus заменяет шину. При verify_reg не None после успешного
+        повтора регистр verify_reg считывается и сравнивается с verify_data."""
+        errors = self._errors
+        for attempt in range(self.retries):
+            errors[device_addr] = errors.get(device_addr, 0) + 1
+            if attempt:
+                self.recover_bus()
+            time.sleep_ms(self.backoff_ms << attempt)
+            self.retry_count += 1
+            try:
+                result = getattr(self.bus, method)(*args)
+                if verify_reg is not None and self.verify_writes:
+                    if self.bus.readfrom_mem(device_addr, verify_reg, len(verify_data)) != bytes(verify_data):
+                        raise OSError(5)    # EIO, запись не подтверждена
+                return result
+            except OSError as e:
+                error = e
+        errors[device_addr] = errors.get(device_addr, 0) + 1
+        raise error
+
+    def write_register(self, device_addr: int, reg_addr: int, value: int | bytes | bytearray | memoryview,
+                       bytes_count: int, byte_order: str):
+        try:
+            return super().write_register(device_addr, reg_addr, value, bytes_count, byte_order)
+        except OSError as e:
+            data = value.to_bytes(bytes_count, byte_order) if isinstance(value, int) else value
+            return self._retry(e, device_addr, "writeto_mem", (device_addr, reg_addr, data), reg_addr, data)
+
+    def read_register(self, device_addr: int, reg_addr: int, bytes_count: int) -> bytes:
+        try:
+            return super().read_register(device_addr, reg_addr, bytes_count)
+        except OSError as e:
+            return self._retry(e, device_addr, "readfrom_mem", (device_addr, reg_addr, bytes_count))
+
+    def read(self, device_addr: int, n_bytes: int) -> bytes:
+        try:
+            return super().read(device_addr, n_bytes)
+        except OSError as e:
+            return self._retry(e, device_addr, "readfrom", (device_addr, n_bytes))
+
+    def read_to_buf(self, device_addr: int, buf: bytearray | memoryview) -> bytes:
+        try:
+            return super().read_to_buf(device_addr, buf)
+        except OSError as e:
+            self._retry(e, device_addr, "readfrom_into", (device_addr, buf))
+            return buf
+
+    def write(self, device_addr: int, buf: bytes | bytearray | memoryview):
+        try:
+            return super().write(device_addr, buf)
+        except OSError as e:
+            return self._retry(e, device_addr, "writeto", (device_addr, buf))
+
+    def read_buf_from_memory(self, device_addr: int, mem_addr, buf: bytearray | memoryview, address_size: int = 1):
+        try:
+            return super().read_buf_from_memory(device_addr, mem_addr, buf, address_size)
+        except OSError as e:
+            self._retry(e, device_addr, "readfrom_mem_into", (device_addr, mem_addr, buf))
+            return buf
+
+    def write_buf_to_memory(self, device_addr: int, mem_addr, buf: bytes | bytearray | memoryview):
+        try:
+            return super().write_buf_to_memory(device_addr, mem_addr, buf)
+        except OSError as e:
+            return self._retry(e, device_addr, "writeto_mem", (device_addr, mem_addr, buf), mem_addr, buf)
@@ -0,0 +1,232 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Учет транзакций на шине ввода/вывода: количество чтений и записей, переданные байты и ошибки для каждой пары
+(устройство, регистр), гистограммы длительности транзакций. Позволяет найти устройства, занимающие шину.
+
+Example:
+    adapter = InstrumentedAdapter(I2cAdapter(i2c))
+    sensor = Veml7700(adapter)
+    ...
+    print(adapter.report())
+"""
+
+import time
+from array import array
+from sensor_pack_2.bus_service import BusAdapter
+
+# верхние границы интервалов гистограммы длительности транзакций [мкс]. Последний интервал - все, что больше.
+LATENCY_BUCKETS_US = 50, 100, 200, 500, 1000, 2000, 5000
+_NO_REG = 0x1FF     # 'регистр' для транзакций без адреса регистра (read, write)
+_LO_MAX = 0x3FFFFFFF    # наибольшая младшая часть счетчика, small int MicroPython (2 ** 30 - 1)
+_DEV_FIRST = 0x400      # номер первого устройства, заданного не адресом (вывод CS шины SPI), больше 10-битного адреса
+
+
+class InstrumentedAdapter(BusAdapter):
+    """Обертка адаптера шины, ведущая учет транзакций. Память под счетчики выделяется в конструкторе.
+    При enabled в Ложь транзакции передаются адаптеру без учета. Если учет не нужен совсем,
+    используйте исходный адаптер, тогда затрат нет никаких.
+
+    Каждый счетчик хранится двумя частями (старшая * 2 ** 30 + младшая), чтобы его значение всегда
+    было small int MicroPython и учет не выделял память. Устройство учитывается по адресу на шине (I2C).
+    Устройство, заданное объектом (вывод CS шины SPI), получает номер при первой транзакции,
+    имя ему можно дать методом name_device."""
+
+    def __init__(self, adapter: BusAdapter, max_keys: int = 32):
+        """adapter - адаптер шины, транзакции которого учитываются;
+        max_keys - наибольшее количество пар (устройство, регистр). Пары сверх него учитываются
+        только в общих гистограммах."""
+        super().__init__(adapter.bus)
+        self.adapter = adapter
+        self.enabled = True
+        self._max_keys = max_keys
+        self._slots = dict()    # ключ пары (устройство, регистр) -> номер ячейки счетчиков
+        self._devices = dict()  # устройство, заданное объектом -> номер (_DEV_FIRST + n)
+        self._names = dict()    # номер устройства -> имя
+        self._keys = array('I', (0 for _ in range(max_keys)))
+        # счетчики: для ячейки i элемент 2 * i - младшая часть, 2 * i + 1 - старшая
+        self._reads = array('I', (0 for _ in range(2 * max_keys)))
+        self._writes = array('I', (0 for _ in range(2 * max_keys)))
+        self._bytes = array('I', (0 for _ in range(2 * max_keys)))
+        self._errors = array('I', (0 for _ in range(2 * max_keys)))
+        n = 2 * (len(LATENCY_BUCKETS_US) + 1)
+        self._hist_read = array('I', (0 for _ in range(n)))
+        self._hist_write = array('I', (0 for _ in range(n)))
+
+    def __getattr__(self, name):
+        # методы, которых нет в BusAdapter (например, SpiAdapter.write_and_read), передаются без учета
+        return getattr(self.adapter, name)
+
+    def reset(self):
+        """Обнуляет все счетчики. Номера и имена устройств сохраняются."""
+        self._slots = dict()
+        for arr in (self._reads, self._writes, self._bytes, self._errors, self._hist_read, self._hist_write):
+            for i in range(len(arr)):
+                arr[i] = 0
+
+    def name_device(self, device_addr, name: str):
+        """Задает имя устройства device_addr (адрес на шине или вывод CS) для get_stats и report"""
+        self._names[self._device(device_addr)] = name
+
+    def _device(self, device_addr) -> int:
+        """Возвращает номер устройства: адрес на шине или номер, присвоенный объекту (выводу CS)"""
+        if isinstance(device_addr, int):
+            return device_addr
+        dev = self._devices.get(device_addr, -1)
+        if dev < 0:
+            dev = _DEV_FIRST + len(self._devices)
+            self._devices[device_addr] = dev
+        return dev
+
+    def _slot(self, device_addr, reg_addr: int) -> int:
+        key = (self._device(device_addr) << 9) | (reg_addr & _NO_REG)
+        slot = self._slots.get(key, -1)
+        if slot < 0 and len(self._slots) < self._max_keys:
+            slot = len(self._slots)
+            self._slots[key] = slot
+            self._keys[slot] = key
+        return slot
+
+    @staticmethod
+    def _add(arr: array, i: int, n: int):
+        """Добавляет n к счетчику из элементов arr[i] (младшая часть) и arr[i + 1] (старшая)
+        без промежуточных значений больше _LO_MAX"""
+        free = _LO_MAX - arr[i]
+        if n > free:
+            arr[i] = n - free - 1
+            arr[i + 1] += 1
+        else:
+            arr[i] += n
+
+    @staticmethod
+    def _value(arr: array, i: int) -> int:
+        return (arr[i + 1] << 30) + arr[i]
+
+    def _account(self, device_addr, reg_addr: int, is_write: bool, n_bytes: int, t_start: int, ok: bool):
+        dt = time.ticks_diff(time.ticks_us(), t_start)
+        b = 0
+        for edge in LATENCY_BUCKETS_US:
+            if dt <= edge:
+                break
+            b += 2
+        self._add(self._hist_write if is_write else self._hist_read, b, 1)
+        slot = self._slot(device_addr, reg_addr)
+        if slot < 0:
+            return
+        slot <<= 1
+        if not ok:
+            self._add(self._errors, slot, 1)
+            return
+        self._add(self._writes if is_write else self._reads, slot, 1)
+        self._add(self._bytes, slot, n_bytes)
+
+    def read_register(self, device_addr, reg_addr: int, bytes_count: int) -> bytes:
+        if not self.enabled:
+            return self.adapter.read_register(device_addr, reg_addr, bytes_count)
+        t_start = time.ticks_us()
+        try:
+            result = self.adapter.read_register(device_addr, reg_addr, bytes_count)
+        except OSError:
+            self._account(device_addr, reg_addr, False, 0, t_start, False)
+            raise
+        self._account(device_addr, reg_addr, False, bytes_count, t_start, True)
+        return result
+
+    def write_register(self, device_addr, reg_addr: int, value, bytes_count: int, byte_order: str):
+        if not self.enabled:
+            return self.adapter.write_register(device_addr, reg_addr, value, bytes_count, byte_order)
+        t_start = time.ticks_us()
+        try:
+            result = self.adapter.write_register(device_addr, reg_addr, value, bytes_count, byte_order)
+        except OSError:
+            self._account(device_addr, reg_addr, True, 0, t_start, False)
+            raise
+        self._account(device_addr, reg_addr, True, bytes_count, t_start, True)
+        return result
+
+    def read(self, device_addr, n_bytes: int) -> bytes:
+        if not self.enabled:
+            return self.adapter.read(device_addr, n_bytes)
+        t_start = time.ticks_us()
+        try:
+            result = self.adapter.read(device_addr, n_bytes)
+        except OSError:
+            self._account(device_addr, _NO_REG, False, 0, t_start, False)
+            raise
+        self._account(device_addr, _NO_REG, False, n_bytes, t_start, True)
+        return result
+
+    def read_to_buf(self, device_addr, buf) -> bytes:
+        if not self.enabled:
+            return self.adapter.read_to_buf(device_addr, buf)
+        t_start = time.ticks_us()
+        try:
+            result = self.adapter.read_to_buf(device_addr, buf)
+        except OSError:
+            self._account(device_addr, _NO_REG, False, 0, t_start, False)
+            raise
+        self._account(device_addr, _NO_REG, False, len(buf), t_start, True)
+        return result
+
+    def write(self, device_addr, buf):
+        if not self.enabled:
+            return self.adapter.write(device_addr, buf)
+        t_start = time.ticks_us()
+        try:
+            result = self.adapter.write(device_addr, buf)
+        except OSError:
+            self._account(device_addr, _NO_REG, True, 0, t_start, False)
+            raise
+        self._account(device_addr, _NO_REG, True, len(buf), t_start, True)
+        return result
+
+    def read_buf_from_memory(self, device_addr, mem_addr, buf, address_size: int = 1):
+        if not self.enabled:
+            return self.adapter.read_buf_from_memory(device_addr, mem_addr, buf, address_size)
+        t_start = time.ticks_us()
+        try:
+            result = self.adapter.read_buf_from_memory(device_addr, mem_addr, buf, address_size)
+        except OSError:
+            self._account(device_addr, mem_addr, False, 0, t_start, False)
+            raise
+        self._account(device_addr, mem_addr, False, len(buf), t_start, True)
+        return result
+
+    def write_buf_to_memory(self, device_addr, mem_addr, buf):
+        if not self.enabled:
+            return self.adapter.write_buf_to_memory(device_addr, mem_addr, buf)
+        t_start = time.ticks_us()
+        try:
+            result = self.adapter.write_buf_to_memory(device_addr, mem_addr, buf)
+        except OSError:
+            self._account(device_addr, mem_addr, True, 0, t_start, False)
+            raise
+        self._account(device_addr, mem_addr, True, len(buf), t_start, True)
+        return result
+
+    def get_stats(self) -> list:
+        """Возвращает список кортежей (device, reg, reads, writes, bytes, errors) для всех учтенных пар.
+        device - имя устройства (name_device), иначе адрес на шине или номер устройства, заданного объектом.
+        reg равен None для транзакций без адреса регистра."""
+        result = []
+        for slot in range(len(self._slots)):
+            key = self._keys[slot]
+            dev = key >> 9
+            reg = key & _NO_REG
+            i = slot << 1
+            result.append((self._names.get(dev, dev), None if _NO_REG == reg else reg, self._value(self._reads, i),
+                           self._value(self._writes, i), self._value(self._bytes, i), self._value(self._errors, i)))
+        return result
+
+    def report(self) -> str:
+        """Возвращает краткий отчёт по учтенным транзакциям"""
+        lines = []
+        for dev, reg, rd, wr, nb, err in self.get_stats():
+            d = dev if isinstance(dev, str) else f"{dev:#04x}"
+            r = "--" if reg is None else f"{reg:02X}"
+            lines.append(f"dev {d} reg {r}: rd {rd} wr {wr} bytes {nb} err {err}")
+        edges = "".join(f"<={e} " for e in LATENCY_BUCKETS_US) + ">"
+        lines.append(f"us: {edges}")
+        for name, hist in (("rd", self._hist_read), ("wr", self._hist_write)):
+            lines.append(f"{name}: " + " ".join(str(self._value(hist, i)) for i in range(0, len(hist), 2)))
+        return "\n".join(lines)
@@ -0,0 +1,174 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Потоковые фильтры значений датчика. Каждый фильтр - итератор, источником которого служит другой итератор
+(датчик, наследник Iterator, или другой фильтр), поэтому фильтры объединяются в цепочку:
+
+    pipeline = DeadbandFilter(EmaFilter(MedianFilter(sensor, 5), 0.2), 0.02)
+    for lux in pipeline:
+        send(lux)   # только существенные изменения
+
+Фильтры берут значения из источника без пауз, поэтому источник должен задавать темп сам: каждый вызов
+next(source) должен возвращать новое значение. Итератор датчика (Veml7700.__next__) ждёт завершения периода
+интегрирования, так что Decimator(sensor, 10) возвращает значение раз в 10 периодов, а не 10 копий одного отсчёта.
+Источник, возвращающий значения без ожидания, оберните в итератор с паузой между значениями.
+
+Состояние фильтров (буферы, счетчики) создаётся в конструкторе. Без выделения памяти при обработке отсчёта
+работают только целочисленные цепочки: источник возвращает int (сырые отсчёты, миллилюксы),
+MedianFilter с typecode 'i' или 'H', EmaFilter с integer=True, HysteresisClamp с целым band, Decimator.
+В MicroPython каждое значение float - объект кучи: чтение из массива 'f', каждая операция с float
+(EmaFilter без integer, сравнение в DeadbandFilter) создают новые объекты."""
+
+from array import array
+from sensor_pack_2.base_sensor import Iterator
+
+
+class _Stage(Iterator):
+    """Базовый класс звена цепочки фильтров"""
+    def __init__(self, source):
+        """source - источник значений: итератор (Iterator, IBaseSensorEx с __next__ или другой фильтр),
+        возвращающий новое значение при каждом вызове next (смотри документацию модуля)"""
+        self._source = source
+
+
+class MedianFilter(_Stage):
+    """Медиана последних n значений. Подавляет одиночные выбросы.
+    Окно хранится и в порядке поступления, и упорядоченным: новое значение занимает место вытесненного
+    в упорядоченном массиве, поэтому обработка отсчёта выполняется за O(n)."""
+    def __init__(self, source, n: int = 5, typecode: str = 'f'):
+        """n - количество значений в окне (нечетное);
+        typecode - тип элементов массива окна: 'f' для float, 'i' или 'H' для int (например, миллилюксы
+        или сырые отсчёты). Для 'f' чтение каждого элемента создаёт объект float."""
+        super().__init__(source)
+        if n < 1:
+            raise ValueError(f"Invalid window size: {n}")
+        self._window = array(typecode, (0 for _ in range(n)))
+        self._sorted = array(typecode, (0 for _ in range(n)))
+        self._index = 0
+        self._count = 0
+
+    def __next__(self):
+        x = next(self._source)
+        win, srt = self._window, self._sorted
+        n = len(win)
+        i = self._index
+        cnt = self._count
+        if cnt < n:
+            # окно не заполнено: x занимает место за последним упорядоченным значением
+            j = cnt
+            cnt += 1
+            self._count = cnt
+        else:
+            # j - место вытесняемого значения в упорядоченном массиве
+            old = win[i]
+            j = 0
+            while srt[j] != old:
+                j += 1
+        # сдвиг соседей, пока x не окажется на своём месте
+        while j > 0 and srt[j - 1] > x:
+            srt[j] = srt[j - 1]
+            j -= 1
+        while j < cnt - 1 and srt[j + 1] < x:
+            srt[j] = srt[j + 1]
+            j += 1
+        srt[j] = x
+        win[i] = x
+        i += 1
+        self._index = 0 if i == n else i
+        return srt[cnt // 2]
+
+
+class EmaFilter(_Stage):
+    """Экспоненциальное скользящее среднее: y = y + alpha * (x - y)"""
+    def __init__(self, source, alpha: float = 0.2, integer: bool = False):
+        """alpha - коэффициент сглаживания 0..1. Чем меньше, тем сильнее сглаживание.
+        integer - целочисленный режим для значений int (|x| < 2 ** 21, например, сырые отсчёты): alpha
+        округляется до 1/256, состояние хранится в формате Q8 (y * 256), выход - округленное int.
+        Память при обработке отсчёта не выделяется."""
+        super().__init__(source)
+        if not 0 < alpha <= 1:
+            raise ValueError(f"Invalid alpha: {alpha}")
+        self._alpha = alpha
+        self._alpha_q8 = max(1, int(0.5 + 256 * alpha)) if integer else 0
+        self._y = None
+
+    def __next__(self):
+        x = next(self._source)
+        y = self._y
+        a = self._alpha_q8
+        if a:
+            # y в формате Q8. d * a / 256 вычисляется по частям d = 256 * q + r, иначе при x до 2 ** 21
+            # произведение d * a выходит за small int MicroPython
+            if y is None:
+                y = x << 8
+            else:
+                d = (x << 8) - y
+                y += (d >> 8) * a + (((d & 0xFF) * a) >> 8)
+            self._y = y
+            return (y + 0x80) >> 8
+        if y is None:
+            y = x
+        else:
+            y += self._alpha * (x - y)
+        self._y = y
+        return y
+
+
+class DeadbandFilter(_Stage):
+    """Пропускает значение, только если оно отличается от последнего пропущенного больше чем на
+    rel * |последнее| + abs_delta. Остальные значения отбрасываются, __next__ ждёт существенного изменения.
+    Заменяет сравнение вида lux != old_lux, которое пропускает любой шум."""
+    def __init__(self, source, rel: float = 0.02, abs_delta: float = 0.0):
+        """rel - относительная ширина зоны нечувствительности;
+        abs_delta - абсолютная ширина зоны (для значений около нуля)."""
+        super().__init__(source)
+        self._rel = rel
+        self._abs = abs_delta
+        self._last = None
+
+    def __next__(self):
+        src = self._source
+        last = self._last
+        while True:
+            x = next(src)
+            if last is None or abs(x - last) > self._rel * abs(last) + self._abs:
+                self._last = x
+                return x
+
+
+class Decimator(_Stage):
+    """Пропускает каждое n-е значение источника"""
+    def __init__(self, source, n: int):
+        super().__init__(source)
+        if n < 1:
+            raise ValueError(f"Invalid decimation factor: {n}")
+        self._n = n
+
+    def __next__(self):
+        src = self._source
+        for _ in range(self._n - 1):
+            next(src)
+        return next(src)
+
+
+class HysteresisClamp(_Stage):
+    """Гистерезис (люфт) шириной band: выход не меняется, пока вход находится в пределах ±band от выхода.
+    При выходе за пределы выход следует за входом с отставанием на band.
+    Устраняет дребезг значения около границы (например, при включении освещения по порогу)."""
+    def __init__(self, source, band: float):
+        super().__init__(source)
+        self._band = band
+        self._y = None
+
+    def __next__(self):
+        x = next(self._source)
+        y = self._y
+        band = self._band
+        if y is None:
+            y = x
+        elif x > y + band:
+            y = x - band
+        elif x < y - band:
+            y = x + band
+        self._y = y
+        return y
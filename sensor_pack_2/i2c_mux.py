@@ -0,0 +1,107 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Мультиплексор шины I2C и адаптер шины для устройств за ним.
+Вынесены из bus_service, чтобы не загружать их в проектах без мультиплексора."""
+
+from machine import I2C
+from sensor_pack_2.bus_service import I2cAdapter
+
+
+class I2cMux:
+    """Мультиплексор шины I2C (TCA9548A, PCA9548A и подобные). Позволяет подключить к одной шине несколько
+    устройств с одинаковым адресом (например, VEML7700 с фиксированным адресом 0x10), каждое на своём канале.
+    Хранит номер выбранного канала и не выполняет повторный выбор уже выбранного канала."""
+    def __init__(self, bus: I2C, address: int = 0x70, channels: int = 8):
+        """bus - шина I2C, к которой подключен мультиплексор;
+        address - адрес мультиплексора на шине (0x70..0x77);
+        channels - количество каналов мультиплексора."""
+        self.bus = bus
+        self.address = address
+        self.channels = channels
+        self._channel = -1      # выбранный канал, -1 - неизвестен (после включения или ошибки шины)
+        self._buf_1 = bytearray(1)
+        # количество выполненных записей выбора канала (для оценки трафика по шине)
+        self.select_count = 0
+
+    @property
+    def channel(self) -> int:
+        """Возвращает номер выбранного канала или -1, если он неизвестен"""
+        return self._channel
+
+    def select(self, channel: int) -> bool:
+        """Выбирает канал channel, если он еще не выбран. Возвращает Истина, если была выполнена запись
+        в мультиплексор. При ошибке шины выбранный канал становится неизвестным."""
+        if channel == self._channel:
+            return False
+        if not 0 <= channel < self.channels:
+            raise ValueError(f"Invalid mux channel: {channel}")
+        buf = self._buf_1
+        buf[0] = 1 << channel
+        try:
+            self.bus.writeto(self.address, buf)
+        except OSError:
+            self._channel = -1
+            raise
+        self._channel = channel
+        self.select_count += 1
+        return True
+
+    def deselect(self):
+        """Отключает все каналы мультиплексора"""
+        buf = self._buf_1
+        buf[0] = 0
+        self._channel = -1
+        self.bus.writeto(self.address, buf)
+
+    def get_adapter(self, channel: int) -> "I2cMuxAdapter":
+        """Возвращает адаптер шины для устройства, подключенного к каналу channel"""
+        return I2cMuxAdapter(self, channel)
+
+    def group_by_channel(self, items, key) -> list:
+        """Возвращает список items, упорядоченный по каналам так, чтобы обход начинался с выбранного канала
+        и каждый канал выбирался не более одного раза.
+        key - функция, возвращающая номер канала элемента списка (например, lambda s: s.channel)."""
+        cur = max(0, self._channel)
+        n = self.channels
+        return sorted(items, key=lambda item: (key(item) - cur) % n)
+
+
+class I2cMuxAdapter(I2cAdapter):
+    """Адаптер шины I2C для устройства за мультиплексором. Перед каждым обменом выбирает свой канал
+    мультиплексора (только если выбран другой канал). Адаптеры одного мультиплексора разделяют его состояние."""
+    def __init__(self, mux: I2cMux, channel: int):
+        super().__init__(mux.bus)
+        if not 0 <= channel < mux.channels:
+            raise ValueError(f"Invalid mux channel: {channel}")
+        self.mux = mux
+        self.channel = channel
+
+    def write_register(self, device_addr: int, reg_addr: int, value: int | bytes | bytearray | memoryview,
+                       bytes_count: int, byte_order: str):
+        self.mux.select(self.channel)
+        return super().write_register(device_addr, reg_addr, value, bytes_count, byte_order)
+
+    def read_register(self, device_addr: int, reg_addr: int, bytes_count: int) -> bytes:
+        self.mux.select(self.channel)
+        return super().read_register(device_addr, reg_addr, bytes_count)
+
+    def read(self, device_addr: int, n_bytes: int) -> bytes:
+        self.mux.select(self.channel)
+        return super().read(device_addr, n_bytes)
+
+    def read_to_buf(self, device_addr: int, buf: bytearray | memoryview) -> bytes:
+        self.mux.select(self.channel)
+        return super().read_to_buf(device_addr, buf)
+
+    def write(self, device_addr: int, buf: bytes | bytearray | memoryview):
+        self.mux.select(self.channel)
+        return super().write(device_addr, buf)
+
+    def read_buf_from_memory(self, device_addr: int, mem_addr, buf: bytearray | memoryview, address_size: int = 1):
+        self.mux.select(self.channel)
+        return super().read_buf_from_memory(device_addr, mem_addr, buf, address_size)
+
+    def write_buf_to_memory(self, device_addr: int, mem_addr, buf: bytes | bytearray | memoryview):
+        self.mux.select(self.channel)
+        return super().write_buf_to_memory(device_addr, mem_addr, buf)
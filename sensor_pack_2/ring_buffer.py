@@ -0,0 +1,166 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Кольцевой буфер сырых отсчётов датчика на массивах (array). Каждый отсчёт занимает 2 байта,
+каждая метка времени 4 байта, вместо ~20 байт на объект float в списке."""
+
+from array import array
+
+
+class RawRingBuffer:
+    """Кольцевой буфер пар сырых отсчётов (основной канал, дополнительный канал), например (ALS, WHITE),
+    с метками времени (ticks). Память выделяется один раз, в конструкторе.
+
+    Статистика основного канала (min, max, mean, variance) относится к отсчётам, находящимся в буфере,
+    и обновляется при каждом добавлении. Суммы для mean и variance обновляются за O(1). Для min и max хранятся
+    монотонные очереди индексов ячеек (array('H'), по 2 байта на отсчёт): кандидаты в наименьший (наибольший)
+    отсчёт в порядке поступления. Каждый индекс добавляется и удаляется из очереди один раз, поэтому push
+    выполняется за O(1) в среднем, без поиска по буферу и при монотонном тренде. capacity - не более 65536.
+    Суммы хранятся в целых числах, поэтому накопления погрешности нет. Сумма квадратов хранится двумя частями
+    (старшие и младшие 16 бит), так как квадрат отсчёта больше 32767 не умещается в small int MicroPython:
+    при capacity не более 16383 push не выделяет память. Свойства mean и variance возвращают float и выделяют."""
+
+    def __init__(self, capacity: int):
+        if not 0 < capacity <= 0x10000:
+            raise ValueError(f"Invalid capacity: {capacity}")
+        self._capacity = capacity
+        self._main = array('H', (0 for _ in range(capacity)))     # основной канал (ALS)
+        self._aux = array('H', (0 for _ in range(capacity)))      # дополнительный канал (WHITE)
+        self._ticks = array('I', (0 for _ in range(capacity)))    # метки времени
+        # монотонные очереди (кольцевые) индексов ячеек: значения в _dq_min возрастают, в _dq_max убывают,
+        # в начале очереди - индекс наименьшего (наибольшего) отсчёта в буфере
+        self._dq_min = array('H', (0 for _ in range(capacity)))
+        self._dq_max = array('H', (0 for _ in range(capacity)))
+        # заранее созданные memoryview, срезы которых не копируют данные
+        self._mv_main = memoryview(self._main)
+        self._mv_aux = memoryview(self._aux)
+        self._mv_ticks = memoryview(self._ticks)
+        self.clear()
+
+    def clear(self):
+        """Очищает буфер и сбрасывает статистику"""
+        self._head = 0      # индекс ячейки для следующего отсчёта
+        self._count = 0
+        self._sum = 0
+        self._sum_sq_hi = 0     # сумма квадратов = _sum_sq_hi * 2 ** 16 + _sum_sq_lo
+        self._sum_sq_lo = 0
+        self._min_head = self._min_len = 0     # начало и длина очереди _dq_min
+        self._max_head = self._max_len = 0
+
+    def _add_sq(self, value: int, sign: int):
+        """Добавляет (sign = 1) или вычитает (sign = -1) квадрат value из суммы квадратов без выхода за small int:
+        value ** 2 = (h * 2 ** 8 + l) ** 2 = h * h * 2 ** 16 + (2 * h * l * 2 ** 8 + l * l)"""
+        h = value >> 8
+        l = value & 0xFF
+        lo = self._sum_sq_lo + sign * ((h * l << 9) + l * l)
+        self._sum_sq_hi += sign * h * h + (lo >> 16)
+        self._sum_sq_lo = lo & 0xFFFF
+
+    def _dq_push(self, dq: array, head: int, n: int, i: int, sign: int) -> int:
+        """Добавляет индекс ячейки i с только что записанным отсчётом в конец монотонной очереди dq
+        (начало head, длина n). Из конца очереди удаляются отсчёты, которые уже не станут наименьшими
+        (sign = 1) или наибольшими (sign = -1): не меньше (не больше) нового и вытесняемые раньше него.
+        Возвращает новую длину очереди."""
+        buf = self._main
+        cap = self._capacity
+        value = sign * buf[i]
+        while n:
+            j = head + n - 1
+            if j >= cap:
+                j -= cap
+            if sign * buf[dq[j]] < value:
+                break
+            n -= 1
+        j = head + n
+        if j >= cap:
+            j -= cap
+        dq[j] = i
+        return n + 1
+
+    def push(self, main: int, aux: int = 0, ticks: int = 0):
+        """Добавляет отсчёт. При заполненном буфере вытесняет самый старый отсчёт."""
+        i = self._head
+        buf = self._main
+        cap = self._capacity
+        if self._count == cap:
+            old = buf[i]
+            self._sum -= old
+            self._add_sq(old, -1)
+            # вытесняемая ячейка - самая старая, в очередях она может быть только в начале
+            if self._dq_min[self._min_head] == i:
+                self._min_head = 0 if self._min_head + 1 == cap else self._min_head + 1
+                self._min_len -= 1
+            if self._dq_max[self._max_head] == i:
+                self._max_head = 0 if self._max_head + 1 == cap else self._max_head + 1
+                self._max_len -= 1
+        else:
+            self._count += 1
+        buf[i] = main
+        self._aux[i] = aux
+        self._ticks[i] = ticks
+        self._sum += main
+        self._add_sq(main, 1)
+        self._min_len = self._dq_push(self._dq_min, self._min_head, self._min_len, i, 1)
+        self._max_len = self._dq_push(self._dq_max, self._max_head, self._max_len, i, -1)
+        i += 1
+        if i == cap:
+            i = 0
+        self._head = i
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def get(self, index: int) -> tuple:
+        """Возвращает отсчёт (main, aux, ticks) по индексу. 0 - самый старый, -1 - самый новый."""
+        n = self._count
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("ring buffer index out of range")
+        i = (self._head - n + index) % self._capacity
+        return self._main[i], self._aux[i], self._ticks[i]
+
+    def window(self, n: int, channel: int = 0) -> tuple:
+        """Возвращает последние n отсчётов канала (0 - основной, 1 - дополнительный, 2 - метки времени)
+        без копирования, в виде кортежа из двух memoryview (старая часть, новая часть).
+        Из-за кольцевой организации окно может состоять из двух частей, вторая часть может быть пустой."""
+        n = min(n, self._count)
+        mv = (self._mv_main, self._mv_aux, self._mv_ticks)[channel]
+        start = self._head - n
+        if start >= 0:
+            return mv[start:self._head], mv[0:0]
+        return mv[start + self._capacity:], mv[0:self._head]
+
+    @property
+    def min(self) -> int:
+        """Наименьшее значение основного канала по отсчётам в буфере (0xFFFF, если буфер пуст)"""
+        if 0 == self._count:
+            return 0xFFFF
+        return self._main[self._dq_min[self._min_head]]
+
+    @property
+    def max(self) -> int:
+        """Наибольшее значение основного канала по отсчётам в буфере (0, если буфер пуст)"""
+        if 0 == self._count:
+            return 0
+        return self._main[self._dq_max[self._max_head]]
+
+    @property
+    def mean(self) -> float:
+        """Среднее значение основного канала по отсчётам в буфере"""
+        if 0 == self._count:
+            return 0.0
+        return self._sum / self._count
+
+    @property
+    def variance(self) -> float:
+        """Дисперсия (генеральная) основного канала по отсчётам в буфере"""
+        n = self._count
+        if 0 == n:
+            return 0.0
+        sum_sq = (self._sum_sq_hi << 16) + self._sum_sq_lo
+        return (n * sum_sq - self._sum * self._sum) / (n * n)
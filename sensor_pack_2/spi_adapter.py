@@ -0,0 +1,157 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Адаптер шины SPI. Вынесен из bus_service, чтобы не загружать его в проектах только с шиной I2C."""
+
+from machine import SPI, Pin
+from sensor_pack_2.bus_service import BusAdapter
+
+
+class SpiAdapter(BusAdapter):
+    """Адаптер шины SPI"""
+    def __init__(self, bus: SPI, data_mode: Pin = None):
+        """Параметр data_mode представляет собой вывод MCU, который используется для установки флага,
+        что посылка является данными (high) или командой (low). Например, это необходимо при обмене с ILI9481."""
+        super().__init__(bus)
+        # вывод MCU для режима данных
+        self.data_mode_pin = data_mode
+        # использовать ли вывод MCU для режима данных (Истина) или команд (Ложь)
+        self.use_data_mode_pin = False
+        # флаг для методов write.. . Если Истина, то data_mode (Pin) будет установлена в Истина, иначе в Ложь!
+        # flag for write.. methods. If True, then data_mode (Pin) will be set to True, otherwise to False!
+        self.data_packet = False
+        # индекс/номер байта в пересылаемом устройству по шину буферу, в котором находится адрес регистра устройства!
+        self._address_index = 0
+        # ссылка на функцию подготовки заголовка (адреса в памяти устройства) перед его пересылкой в устройство!
+        # вида prepare(buf: memoryview, address_index: int) -> None: ..., изменяет buf на месте,
+        # или None. Данные (buf методов read_buf_from_memory/write_buf_to_memory) ей не передаются
+        self._prepare_before_send_ref = None
+        # размер адреса в байтах для write_buf_to_memory (старший байт адреса передается первым)
+        self.mem_address_size = 1
+        # заранее созданный заголовок (адрес в памяти устройства) и его срезы длиной 1..4 байта,
+        # чтобы при обмене с памятью устройства не выделять память
+        hdr = memoryview(bytearray(4))
+        self._header_views = tuple(hdr[:n] for n in range(1, 5))
+
+    @property
+    def prepare_func(self):
+        """Возвращает ссылку на функцию обработки заголовка перед отправкой его по шине.
+        Функция вызывается методами read_buf_from_memory и write_buf_to_memory только для заголовка:
+        среза заранее созданного буфера длиной в размер адреса, адрес в нем записан с индекса 0
+        (старший байт первым). Функция изменяет заголовок на месте (например, устанавливает флаг чтения
+        или записи в старшем бите), возвращаемое значение не используется. Данные передаются без изменений,
+        буфер вызывающего не изменяется."""
+        return self._prepare_before_send_ref
+
+    @prepare_func.setter
+    def prepare_func(self, value):
+        """Устанавливает ссылку на функцию обработки заголовка перед отправкой его по шине"""
+        self._prepare_before_send_ref = value
+
+    def _call_prepare(self, buf: bytearray):
+        ref = self._prepare_before_send_ref
+        if ref is not None:
+            ref(buf, self._address_index)
+
+    def read(self, device_addr: Pin, n_bytes: int) -> bytes:
+        """Read a number of bytes specified by n_bytes while continuously writing the single byte given by write.
+        Returns a bytes object with the data that was read."""
+        try:
+            device_addr.value(0)
+            return self.bus.read(n_bytes)
+        finally:
+            device_addr.value(1)
+
+    def read_to_buf(self, device_addr: Pin, buf) -> bytes:
+        """Читает из устройства на шине с адресом device_addr в буфер buf количество байт, равное длине(len) буфера!"""
+        try:
+            device_addr.value(0)
+            self.bus.readinto(buf, 0x00)
+            return buf
+        finally:
+            device_addr.value(1)
+
+    def write(self, device_addr: Pin, buf: bytes | bytearray | memoryview):
+        """Параметр data_packet представляет собой признак того, что посылка является данными (high) или командой (low).
+        Например это необходимо при обмене ILI9481.
+        Write the bytes contained in buf. Returns None.
+        The data_packet parameter is an indication that the package is data (high) or command (low).
+         For example, this is necessary when exchanging ILI9481."""
+        try:
+            device_addr.value(0)   # chip select
+            if self.use_data_mode_pin and self.data_mode_pin:
+                self.data_mode_pin.value(self.data_packet)
+            return self.bus.write(buf)
+        finally:
+            device_addr.value(1)
+
+    def write_and_read(self, device_addr: Pin, wr_buf: bytes, rd_buf: bytes):
+        """Одновременная запись и чтение байт.
+        Записывает байты из write_buf и читает в read_buf. Буферы могут быть одинаковыми или разными,
+        но оба буфера должны иметь одинаковую длину?
+        Возвращает None.
+        Примечание: на WiPy эта функция возвращает количество записанных байтов.
+
+        Параметр data_packet представляет собой признак того, что посылка является данными (high) или командой (low).
+        Например это необходимо при обмене ILI9481.
+        Расширение возможностей базового класса.
+        Write the bytes from write_buf while reading into read_buf. The buffers can be the same or different,
+        but both buffers must have the same length. Returns None.
+        The data_packet parameter is an indication that the package is data (high) or command (low).
+         For example, this is necessary when exchanging ILI9481."""
+        try:
+            device_addr.value(0)   # chip select
+            if self.use_data_mode_pin and self.data_mode_pin:
+                self.data_mode_pin.value(self.data_packet)
+            return self.bus.write_readinto(wr_buf, rd_buf)
+        finally:
+            device_addr.value(1)
+
+    def _make_header(self, mem_addr: int, address_size: int) -> memoryview:
+        """Заполняет заголовок адресом mem_addr (старший байт первым) и вызывает функцию подготовки.
+        Возвращает срез заголовка длиной address_size байт."""
+        hdr = self._header_views[address_size - 1]
+        for i in range(address_size):
+            hdr[i] = (mem_addr >> (8 * (address_size - 1 - i))) & 0xFF
+        self._call_prepare(hdr)
+        return hdr
+
+    def _send_header(self, hdr: memoryview):
+        """Передает заголовок. Если используется вывод режима данных, заголовок передается как команда (low)."""
+        use_dm = self.use_data_mode_pin and self.data_mode_pin
+        if use_dm:
+            self.data_mode_pin.value(0)
+        self.bus.write(hdr)
+        if use_dm:
+            self.data_mode_pin.value(1)
+
+    def read_buf_from_memory(self, device_addr: Pin, mem_addr, buf: bytearray | memoryview, address_size: int = 1):
+        """Читает из устройства с адресом device_addr в буфер buf, начиная с адреса в устройстве mem_addr.
+        Количество считываемых байт определяется длиной буфера buf.
+        Передается заголовок с адресом (address_size байт, старший первым; флаг чтения, если он нужен устройству,
+        устанавливает функция prepare_func, которой передается только заголовок), затем данные принимаются
+        прямо в buf.
+        Память не выделяется."""
+        if not 1 <= address_size <= 4:
+            raise ValueError(f"Invalid address size: {address_size}")
+        hdr = self._make_header(mem_addr, address_size)
+        try:
+            device_addr.value(0)  # chip select
+            self._send_header(hdr)
+            self.bus.readinto(buf, 0x00)
+            return buf
+        finally:
+            device_addr.value(1)
+
+    def write_buf_to_memory(self, device_addr: Pin, mem_addr, buf: bytes | bytearray | memoryview):
+        """Записывает в устройство все байты из буфера buf, начиная с адреса mem_addr.
+        Размер адреса задается атрибутом mem_address_size. Заголовок и данные передаются в одной транзакции
+        (при одном выборе устройства), данные не копируются. Функция prepare_func применяется только
+        к заголовку, buf передается без изменений. Память не выделяется."""
+        hdr = self._make_header(mem_addr, self.mem_address_size)
+        try:
+            device_addr.value(0)  # chip select
+            self._send_header(hdr)
+            return self.bus.write(buf)
+        finally:
+            device_addr.value(1)
@@ -0,0 +1,43 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Общие фикстуры тестов. Драйвер работает под CPython с эмулятором VEML7700 (host/veml7700emu.py)
+и виртуальным временем, поэтому тесты не зависят от платы и выполняются быстро.
+
+Запуск из корня репозитория:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# заглушки machine и micropython, затем модули пакета
+sys.path[:0] = [os.path.join(ROOT, "host"), ROOT]
+
+import pytest
+import veml7700emu
+
+
+@pytest.fixture
+def clock(monkeypatch) -> veml7700emu.VirtualClock:
+    """Новые виртуальные часы для каждого теста. Функции модуля time переключаются на них
+    только на время теста (monkeypatch восстанавливает модуль time после него)."""
+    clock = veml7700emu.VirtualClock()
+    for name in veml7700emu.TIME_FUNCTIONS:
+        monkeypatch.setattr(time, name, getattr(clock, name), raising=False)
+    return clock
+
+
+@pytest.fixture
+def emu(clock) -> veml7700emu.Veml7700Emu:
+    """Эмулятор шины I2C с датчиком при постоянной освещенности 100 лк"""
+    return veml7700emu.Veml7700Emu(light=100.0, clock=clock)
+
+
+@pytest.fixture
+def sensor(emu):
+    """Драйвер датчика на эмуляторе"""
+    from sensor_pack_2.bus_service import I2cAdapter
+    from veml7700vishay import Veml7700
+    return Veml7700(I2cAdapter(emu))
@@ -0,0 +1,80 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Адаптивный контроллер частоты измерений на эмуляторе: переключение режимов и обмен по шине"""
+
+import pytest
+from sensor_pack_2.bus_service import I2cAdapter
+from veml7700vishay import Veml7700
+from veml7700event import EventMixin
+
+
+class _Sensor(EventMixin, Veml7700):
+    pass
+
+
+@pytest.fixture
+def sensor(emu):
+    """Драйвер с режимом событий (arm_window)"""
+    return _Sensor(I2cAdapter(emu))
+from veml7700adaptive import AdaptiveSampler, MODE_FAST, MODE_SLOW, MODE_SLEEP
+
+
+@pytest.fixture
+def psm_writes(emu) -> list:
+    """Значения, записанные в регистр PSM"""
+    writes = []
+    write = emu.writeto_mem
+
+    def writeto_mem(addr, memaddr, buf, *, addrsize=8):
+        if 3 == memaddr:
+            writes.append(buf[0] | (buf[1] << 8))
+        write(addr, memaddr, buf, addrsize=addrsize)
+    emu.writeto_mem = writeto_mem
+    return writes
+
+
+def _run_until(sampler, mode: int, limit: int = 100):
+    for _ in range(limit):
+        next(sampler)
+        if mode == sampler.mode:
+            return
+    raise AssertionError(f"mode {mode} not reached")
+
+
+def test_slow_mode_writes_psm_once(sensor, psm_writes):
+    sampler = AdaptiveSampler(sensor, max_latency_ms=1000)
+    psm_writes.clear()
+    _run_until(sampler, MODE_SLOW)
+    # IT 200 мс: PSM 0 - период 800 мс, PSM 1 - 1300 мс, больше max_latency_ms
+    assert [0b001] == psm_writes
+    assert sampler.delay_ms <= 1000
+
+
+def test_returns_to_fast_on_change(sensor, emu):
+    sampler = AdaptiveSampler(sensor, use_shutdown=True)
+    _run_until(sampler, MODE_SLEEP)
+    emu.light = 1000.0
+    next(sampler)
+    assert MODE_FAST == sampler.mode
+
+
+def test_keeps_persistence_and_interrupts(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=0, persistence=2, int_en=True)
+    sampler = AdaptiveSampler(sensor, use_shutdown=True)
+    for mode in (MODE_SLOW, MODE_SLEEP):
+        _run_until(sampler, mode)
+        _, _, pers, int_en, _ = emu._config()
+        assert (4, True) == (pers, int_en)
+
+
+def test_keeps_armed_window(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=0)
+    sensor.wait_fresh()
+    sensor.arm_window(0.1)
+    sampler = AdaptiveSampler(sensor)
+    _run_until(sampler, MODE_SLOW)
+    next(sampler)
+    # прерывания разрешены, окно пересчитано для нового времени интегрирования
+    assert emu._config()[3]
+    low, high = sensor.get_thresholds()
+    assert low < sensor.last_raw < high
@@ -0,0 +1,69 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Чтение и запись 16-ти битных регистров (DeviceEx.read_reg_16/write_reg_16) в установившемся режиме
+не выделяют память. Проверяется по gc.mem_alloc, который есть только в MicroPython, под CPython тест пропускается.
+На плате или в MicroPython (unix): micropython test_alloc.py"""
+
+import gc
+from sensor_pack_2.bus_service import I2cAdapter
+from sensor_pack_2.base_sensor import DeviceEx
+
+try:
+    import pytest
+    _micropython_only = pytest.mark.skipif(not hasattr(gc, "mem_alloc"), reason="gc.mem_alloc is not available")
+except ImportError:
+    def _micropython_only(func):
+        return func
+
+
+class _RegBus:
+    """Шина I2C с устройством из 16-ти битных регистров (младший байт первым). Обмен не выделяет память."""
+    def __init__(self):
+        self.regs = bytearray(16)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        regs = self.regs
+        buf[0] = regs[2 * memaddr]
+        buf[1] = regs[2 * memaddr + 1]
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        regs = self.regs
+        regs[2 * memaddr] = buf[0]
+        regs[2 * memaddr + 1] = buf[1]
+
+
+def _make_device() -> DeviceEx:
+    bus = _RegBus()
+    bus.regs[8] = 0x34
+    bus.regs[9] = 0x12
+    return DeviceEx(adapter=I2cAdapter(bus), address=0x10, big_byte_order=False)
+
+
+@_micropython_only
+def test_read_reg_16_no_alloc():
+    dev = _make_device()
+    dev.read_reg_16(4)      # первое обращение (создание объектов при первом вызове не учитывается)
+    gc.collect()
+    before = gc.mem_alloc()
+    for _ in range(100):
+        dev.read_reg_16(4)
+    assert 0 == gc.mem_alloc() - before
+    assert 0x1234 == dev.read_reg_16(4)
+
+
+@_micropython_only
+def test_write_reg_16_no_alloc():
+    dev = _make_device()
+    dev.write_reg_16(1, 0x0101)
+    gc.collect()
+    before = gc.mem_alloc()
+    for i in range(100):
+        dev.write_reg_16(1, i)
+    assert 0 == gc.mem_alloc() - before
+    assert 99 == dev.read_reg_16(1)
+
+
+if __name__ == "__main__":
+    test_read_reg_16_no_alloc()
+    test_write_reg_16_no_alloc()
+    print("OK")
@@ -0,0 +1,99 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Асинхронное чтение (read_async, async for, start_sampling) под asyncio CPython на эмуляторе.
+asyncio.sleep_ms (есть только в MicroPython) заменяется функцией, сдвигающей виртуальные часы
+и уступающей управление циклу событий."""
+
+import asyncio
+import pytest
+from sensor_pack_2.bus_service import I2cAdapter
+from veml7700vishay import Veml7700
+from veml7700async import AsyncMixin
+
+
+class _Sensor(AsyncMixin, Veml7700):
+    pass
+
+
+@pytest.fixture
+def sensor(emu):
+    """Драйвер с расширением asyncio"""
+    return _Sensor(I2cAdapter(emu))
+
+
+@pytest.fixture
+def virtual_sleep(clock, monkeypatch):
+    async def sleep_ms(ms):
+        clock.sleep_ms(ms)
+        await asyncio.sleep(0)
+    monkeypatch.setattr(asyncio, "sleep_ms", sleep_ms, raising=False)
+    return sleep_ms
+
+
+@pytest.fixture
+def ramp_sensor(sensor, emu, virtual_sleep):
+    """Датчик при освещенности, растущей со временем: каждый период интегрирования дает новое значение"""
+    emu.light = lambda t_ms: 10 + t_ms / 10
+    sensor.write_config(gain_index=3, it_index=2)
+    return sensor
+
+
+def test_read_async_waits_for_new_sample(ramp_sensor, emu):
+    async def main():
+        return [await ramp_sensor.read_async(1) for _ in range(5)]
+    values = asyncio.run(main())
+    assert len(set(values)) == 5
+    assert values == sorted(values)
+    assert 5 == emu.samples
+
+
+def test_read_async_does_not_block_loop(ramp_sensor):
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+        n = len(ticks)
+        await ramp_sensor.read_async(0)
+        task.cancel()
+        return len(ticks) - n
+    assert asyncio.run(main()) > 0
+
+
+def test_async_iterator(ramp_sensor):
+    async def main():
+        values = []
+        async for lux in ramp_sensor:
+            values.append(lux)
+            if 3 == len(values):
+                break
+        return values
+    values = asyncio.run(main())
+    assert values[0] < values[1] < values[2]
+
+
+def test_start_sampling_cancel(ramp_sensor, emu):
+    values = []
+
+    async def main():
+        task = ramp_sensor.start_sampling(values.append, 1)
+        while len(values) < 5:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        n, transactions = len(values), emu.transactions
+        for _ in range(10):
+            await asyncio.sleep(0)
+        return task, n, transactions
+
+    task, n, transactions = asyncio.run(main())
+    assert task.cancelled()
+    assert n == len(values)
+    assert transactions == emu.transactions
+    assert values == sorted(set(values))
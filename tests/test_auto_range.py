@@ -0,0 +1,55 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Автоматический выбор усиления и времени интегрирования (auto_range) на эмуляторе"""
+
+import pytest
+from sensor_pack_2.bus_service import I2cAdapter
+from veml7700vishay import Veml7700
+from veml7700range import AutoRangeMixin
+
+
+class _Sensor(AutoRangeMixin, Veml7700):
+    pass
+
+
+@pytest.fixture
+def sensor(emu):
+    """Драйвер с расширением auto_range"""
+    return _Sensor(I2cAdapter(emu))
+
+
+@pytest.mark.parametrize("light", (0.5, 20.0, 1000.0))
+def test_raw_in_range(sensor, emu, light):
+    emu.light = light
+    sensor.write_config(gain_index=2, it_index=2)
+    lux, raw, conversions, elapsed = sensor.auto_range()
+    assert 100 < raw <= 10_000
+
+
+def test_least_sensitive_step_limit(sensor, emu):
+    emu.light = 50_000.0
+    sensor.write_config(gain_index=2, it_index=2)
+    lux, raw, conversions, elapsed = sensor.auto_range()
+    assert (2, 0) == (sensor.gain[0], sensor.integration_time[0])
+    assert raw > 10_000
+
+
+def test_switch_discards_first_period(sensor, emu):
+    # 10 лк при gain 1/8, IT 100 мс - 21 отсчёт, нужно одно переключение на более чувствительную ступень
+    emu.light = 10.0
+    sensor.write_config(gain_index=2, it_index=2)
+    lux, raw, conversions, elapsed = sensor.auto_range()
+    # первый период, отброшенный период после переключения и период измерения
+    assert 3 == conversions
+    assert 100 < raw <= 10_000
+
+
+def test_off_ladder_start_discards_first_period(sensor, emu):
+    # gain 1, IT 25 мс нет среди ступеней: переключение на gain 1/8, IT 100 мс
+    emu.light = 1000.0
+    sensor.write_config(gain_index=0, it_index=0)
+    lux, raw, conversions, elapsed = sensor.auto_range()
+    assert (2, 2) == (sensor.gain[0], sensor.integration_time[0])
+    assert 2 == conversions
+    assert elapsed >= 3 + 2 * sensor.get_conversion_cycle_time()
+    assert 100 < raw <= 10_000
@@ -0,0 +1,65 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Пакетное преобразование (veml7700batch.convert) против преобразования драйвера (Veml7700._raw_to_lux)
+для NumPy и для обычного цикла, на списках и на bytes-буфере (memoryview)"""
+
+import random
+from array import array
+import pytest
+import veml7700batch
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@pytest.fixture(params=("numpy", "python"))
+def backend(request, monkeypatch):
+    """Вариант вычислений: NumPy или обычный цикл (как на MicroPython без ulab)"""
+    if "numpy" == request.param:
+        if numpy is None:
+            pytest.skip("numpy is not installed")
+        monkeypatch.setattr(veml7700batch, "np", numpy)
+    else:
+        monkeypatch.setattr(veml7700batch, "np", None)
+    return request.param
+
+
+def _samples(count: int) -> tuple:
+    rnd = random.Random(7)
+    als = [rnd.randrange(0x10000) for _ in range(count)] + [0, 1, 0xFFFF]
+    # примерно треть отсчётов с ИК-составляющей (WHITE > 2 * ALS)
+    white = [min(0xFFFF, a * rnd.choice((1, 2, 3)) + rnd.randrange(2)) for a in als]
+    return als, white
+
+
+@pytest.mark.parametrize("gain_index", range(4))
+@pytest.mark.parametrize("it_index", (0, 3, 5))
+def test_convert_matches_driver(sensor, backend, gain_index, it_index):
+    als, white = _samples(500)
+    sensor.write_config(gain_index=gain_index, it_index=it_index)
+    lux = veml7700batch.convert(als, white, gain_index=gain_index, it_index=it_index)
+    assert len(als) == len(lux)
+    for a, w, v in zip(als, white, lux):
+        assert float(v) == pytest.approx(sensor._raw_to_lux(a, w), rel=1E-9, abs=1E-9)
+
+
+def test_convert_bytes_buffer(sensor, backend):
+    als, white = _samples(200)
+    # журнал в виде байтов (little endian uint16), как его читают из файла
+    buf_als = memoryview(array("H", als).tobytes()).cast("H")
+    buf_white = memoryview(array("H", white).tobytes()).cast("H")
+    sensor.write_config(gain_index=3, it_index=2)
+    lux = veml7700batch.convert(buf_als, buf_white, gain_index=3, it_index=2)
+    assert [sensor._raw_to_lux(a, w) for a, w in zip(als, white)] == pytest.approx([float(v) for v in lux])
+
+
+def test_convert_without_correction(sensor, backend):
+    als, _ = _samples(100)
+    sensor.use_non_linear_correction = False
+    sensor.write_config(gain_index=2, it_index=0)
+    lux = veml7700batch.convert(als, None, gain_index=2, it_index=0, non_lin_corr=False)
+    assert [sensor._lux(a, False) for a in als] == pytest.approx([float(v) for v in lux])
+    with pytest.raises(ValueError):
+        veml7700batch.convert(als, gain_index=4)
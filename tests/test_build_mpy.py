@@ -0,0 +1,26 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""package.json, создаваемый tools/build_mpy.py, ссылается на файлы .mpy в dist относительными путями"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+import build_mpy
+
+
+def test_dist_package_json_uses_relative_urls(tmp_path, monkeypatch):
+    def fake_mpy_cross(args):
+        # вместо компиляции mpy-cross создаёт пустой файл .mpy
+        out = args[args.index("-o") + 1]
+        open(out, "wb").close()
+    monkeypatch.setattr(build_mpy, "DIST", str(tmp_path))
+    monkeypatch.setattr(build_mpy.subprocess, "check_call", fake_mpy_cross)
+    targets = build_mpy.build(["-march=xtensa"])
+    with open(tmp_path / "package.json") as f:
+        package = json.load(f)
+    assert targets == [dest for dest, _ in package["urls"]]
+    for dest, url in package["urls"]:
+        assert url.endswith(".mpy") and ":" not in url and not url.startswith("/")
+        assert os.path.isfile(tmp_path / url)
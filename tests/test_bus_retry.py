@@ -0,0 +1,52 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Повтор транзакций и восстановление шины (RetryI2cAdapter) на эмуляторе с ошибками транзакций"""
+
+import pytest
+import veml7700emu
+from sensor_pack_2.bus_retry import RetryI2cAdapter
+from veml7700vishay import Veml7700
+
+
+def test_transient_error_is_retried(emu):
+    adapter = RetryI2cAdapter(emu, retries=2)
+    sensor = Veml7700(adapter)
+    sensor.write_config(gain_index=3, it_index=2)
+    emu.fail_next(1)
+    sensor.read_config()
+    assert (3, 2) == (sensor.gain[0], sensor.integration_time[0])
+    assert 1 == adapter.retry_count == adapter.get_error_count(0x10)
+    assert 0 == adapter.recoveries
+
+
+def test_retries_exhausted(emu):
+    adapter = RetryI2cAdapter(emu, retries=2)
+    emu.fail_next(10)
+    with pytest.raises(OSError):
+        adapter.read_register(0x10, 0x00, 2)
+    assert 2 == adapter.retry_count
+    assert 3 == adapter.get_error_count()
+
+
+def test_retry_after_recovery_uses_new_bus(emu, clock):
+    emu.fail_next(1000)     # 'зависшая' шина
+    new_bus = veml7700emu.Veml7700Emu(light=100.0, clock=clock)
+    adapter = RetryI2cAdapter(emu, retries=3, scl_pin=7, sda_pin=6, bus_factory=lambda: new_bus)
+    n = emu.transactions
+    sensor = Veml7700(adapter)
+    sensor.write_config(gain_index=3, it_index=2)
+    assert 1 == adapter.recoveries
+    assert adapter.bus is new_bus
+    # до восстановления: первая попытка и один повтор на старой шине, после - только новая шина
+    assert 2 == emu.transactions - n
+    gain_index, it_index, _, _, shutdown = new_bus._config()
+    assert (3, 2, False) == (gain_index, it_index, shutdown)
+
+
+def test_retried_write_is_verified(emu):
+    adapter = RetryI2cAdapter(emu, retries=2)
+    emu.fail_next(1)
+    adapter.write_register(0x10, 0x01, 0x1234, 2, "little")
+    assert 0x1234 == emu.regs[1]
+    # повтор записи и проверочное чтение
+    assert 3 == emu.transactions
@@ -0,0 +1,95 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Учет транзакций на шине (InstrumentedAdapter): счетчики по парам (устройство, регистр), ошибки,
+перенос в старшую часть счетчика, устройства, заданные выводом CS"""
+
+import pytest
+from machine import Pin
+from sensor_pack_2.bus_service import BusAdapter, I2cAdapter
+from sensor_pack_2.bus_stats import InstrumentedAdapter
+from veml7700vishay import Veml7700
+
+pytestmark = pytest.mark.usefixtures("clock")   # time.ticks_us
+
+
+class _Recorder(BusAdapter):
+    """Адаптер без шины, записывающий аргументы вызовов"""
+    def __init__(self):
+        super().__init__(None)
+        self.calls = []
+
+    def read_buf_from_memory(self, device_addr, mem_addr, buf, address_size: int = 1):
+        self.calls.append(("read_buf_from_memory", device_addr, mem_addr, len(buf), address_size))
+        return buf
+
+    def write(self, device_addr, buf):
+        self.calls.append(("write", device_addr, bytes(buf)))
+
+
+def _stats(adapter: InstrumentedAdapter) -> dict:
+    return {(dev, reg): counters for dev, reg, *counters in adapter.get_stats()}
+
+
+def test_sensor_transactions(emu):
+    adapter = InstrumentedAdapter(I2cAdapter(emu))
+    sensor = Veml7700(adapter)
+    sensor.write_config(gain_index=3, it_index=2)
+    for _ in range(3):
+        next(sensor)    # ждёт нового отсчёта
+    stats = _stats(adapter)
+    reads, writes, n_bytes, errors = stats[(0x10, Veml7700.ADDR_RAW_LUX_REG)]
+    assert (3, 0, 6, 0) == (reads, writes, n_bytes, errors)
+    assert stats[(0x10, Veml7700.ADDR_CFG_REG)][1] >= 1
+    assert "dev 0x10 reg 04: rd 3 wr 0 bytes 6 err 0" in adapter.report()
+
+
+def test_errors_and_disabled(emu):
+    adapter = InstrumentedAdapter(I2cAdapter(emu))
+    emu.fail_next(1)
+    with pytest.raises(OSError):
+        adapter.read_register(0x10, 0x04, 2)
+    adapter.read_register(0x10, 0x04, 2)
+    # ошибочная транзакция учитывается только в счетчике ошибок
+    assert (1, 0, 2, 1) == tuple(_stats(adapter)[(0x10, 0x04)])
+    adapter.enabled = False
+    adapter.read_register(0x10, 0x04, 2)
+    assert (1, 0, 2, 1) == tuple(_stats(adapter)[(0x10, 0x04)])
+    adapter.reset()
+    assert [] == adapter.get_stats()
+
+
+def test_counter_carry():
+    adapter = InstrumentedAdapter(_Recorder())
+    adapter.write(0x20, b"\x01")
+    # младшая часть счетчика байт у предела small int MicroPython
+    adapter._bytes[0] = (1 << 30) - 3
+    for _ in range(4):
+        adapter.write(0x20, b"\x01\x02")
+    assert (0, 5, (1 << 30) - 3 + 8, 0) == tuple(_stats(adapter)[(0x20, None)])
+    assert all(v < 1 << 30 for v in adapter._bytes)
+
+
+def test_arguments_forwarded():
+    rec = _Recorder()
+    adapter = InstrumentedAdapter(rec)
+    buf = bytearray(3)
+    assert buf is adapter.read_buf_from_memory(0x50, 0x1234, buf, 2)
+    assert [("read_buf_from_memory", 0x50, 0x1234, 3, 2)] == rec.calls
+    assert (1, 0, 3, 0) == tuple(_stats(adapter)[(0x50, 0x1234 & 0x1FF)])
+
+
+def test_devices_by_cs_pin():
+    adapter = InstrumentedAdapter(_Recorder())
+    flash, display = Pin(5), Pin(6)
+    adapter.name_device(flash, "flash")
+    adapter.write(display, b"\x00\x01")
+    adapter.write(flash, b"\x9F")
+    adapter.write(display, b"\x02")
+    stats = _stats(adapter)
+    assert (0, 1, 1, 0) == tuple(stats[("flash", None)])
+    # устройство без имени получает номер после устройств, которым он уже присвоен
+    assert (0, 2, 3, 0) == tuple(stats[(0x401, None)])
+    assert "dev flash reg --: rd 0 wr 1 bytes 1 err 0" in adapter.report()
+    adapter.reset()
+    adapter.write(flash, b"\x05")
+    assert [("flash", None, 0, 1, 1, 0)] == adapter.get_stats()
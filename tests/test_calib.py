@@ -0,0 +1,62 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Калибровка периода обновления данных в режиме PSM (veml7700calib.CalibrationMixin) на эмуляторе.
+Период эмулятора в режиме PSM: время интегрирования плюс 500 * 2 ** psm мс."""
+
+import pytest
+from sensor_pack_2.bus_service import I2cAdapter
+from veml7700vishay import Veml7700
+from veml7700calib import CalibrationMixin
+
+
+class _Sensor(CalibrationMixin, Veml7700):
+    pass
+
+
+@pytest.fixture
+def sensor(emu):
+    # освещенность растёт со временем: соседние отсчёты различаются (как шум в младших разрядах)
+    emu.light = lambda t_ms: 100 + t_ms / 1000
+    s = _Sensor(I2cAdapter(emu))
+    s.write_config(gain_index=3, it_index=1, persistence=2)
+    return s
+
+
+def test_calibrate_refresh_time(sensor, emu):
+    table = sensor.calibrate_refresh_time(it_indexes=(0, 2), psms=(0, 1, 3), poll_us=1000)
+    assert table == sensor.refresh_table
+    for it_index in (0, 2):
+        for psm in (0, 1, 3):
+            assert table[4 * it_index + psm] == pytest.approx((25 << it_index) + (500 << psm), abs=1)
+    # не измерявшиеся пары
+    assert 0 == table[4 * 1 + 0] == table[4 * 0 + 2]
+    # исходные настройки восстановлены, PSM выключен
+    gain_index, it_index, pers, _, shutdown = emu._config()
+    assert (3, 1, 4, False) == (gain_index, it_index, pers, shutdown)
+    assert 0 == emu.regs[emu.ADDR_PWR_MODE_REG]
+    # get_conversion_cycle_time использует измеренный период вместо формулы
+    sensor.write_config(gain_index=3, it_index=2)
+    sensor.set_power_save_mode(enable_psm=True, psm=1)
+    assert table[4 * 2 + 1] == sensor.get_conversion_cycle_time()
+    sensor.set_power_save_mode(enable_psm=True, psm=2)
+    assert 100 + 100 + 2000 == sensor.get_conversion_cycle_time()
+
+
+def test_no_changes_leaves_pair_unmeasured(sensor, emu):
+    emu.light = 0.0
+    table = sensor.calibrate_refresh_time(it_indexes=(0,), psms=(0,), poll_us=2000)
+    assert [0] * 24 == table
+
+
+def test_save_and_load_refresh_table(sensor, emu, tmp_path):
+    table = sensor.calibrate_refresh_time(it_indexes=(0,), psms=(0, 1), poll_us=1000)
+    path = str(tmp_path / "veml7700_psm.json")
+    sensor.save_refresh_table(path)
+    other = _Sensor(I2cAdapter(emu))
+    assert other.refresh_table is None
+    other.load_refresh_table(path)
+    assert table == other.refresh_table
+    with open(path, "w") as f:
+        f.write("[1, 2, 3]")
+    with pytest.raises(ValueError):
+        other.load_refresh_table(path)
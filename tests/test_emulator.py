@@ -0,0 +1,80 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Проверка драйвера на эмуляторе: преобразование в люксы, тайминг периода интегрирования,
+теневые копии регистров, чтение без обмена по шине до готовности отсчёта, прерывания с учетом persistence."""
+
+import time
+import pytest
+import veml7700emu
+
+
+def test_lux_matches_light(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=2)
+    time.sleep_ms(sensor.get_conversion_cycle_time() + 3)
+    assert sensor.get_measurement_value(0) == pytest.approx(100.0, rel=0.01)
+
+
+def test_no_sample_before_integration_period(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=2)
+    time.sleep_ms(50)
+    assert 0 == emu.samples
+    time.sleep_ms(sensor.get_conversion_cycle_time())
+    sensor.get_measurement_value(1)
+    assert 1 == emu.samples
+
+
+def test_shadow_registers_skip_redundant_writes(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=2)
+    sensor.set_power_save_mode(enable_psm=False, psm=0)
+    n = emu.transactions
+    sensor.write_config(gain_index=3, it_index=2)
+    sensor.set_power_save_mode(enable_psm=False, psm=0)
+    assert n == emu.transactions
+
+
+def test_stale_reads_skip_bus(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=2)
+    sensor.wait_fresh()
+    lux = sensor.get_measurement_value(0)
+    n = emu.transactions
+    for _ in range(10):
+        assert lux == sensor.get_measurement_value(0)
+    assert n == emu.transactions
+    sensor.wait_fresh()
+    sensor.get_measurement_value(0)
+    assert emu.transactions > n
+
+
+def test_sample_read_error_invalidates_shadow(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=2)
+    sensor.wait_fresh()
+    # просадка питания: регистры датчика сброшены, чтение отсчёта завершилось ошибкой
+    emu.power_loss()
+    emu.fail_next(1)
+    with pytest.raises(OSError):
+        sensor.get_measurement_value(0)
+    # та же конфигурация записывается заново, а не пропускается по устаревшей теневой копии
+    sensor.write_config(gain_index=3, it_index=2)
+    assert (3, 2, False) == (emu._config()[0], emu._config()[1], emu._config()[4])
+
+
+def test_interrupt_persistence(sensor, emu):
+    # persistence 2 - прерывание после 4 выходов за окно подряд
+    sensor.write_config(gain_index=3, it_index=0, persistence=2, int_en=True)
+    sensor.set_thresholds(low=0, high=10)
+    period = sensor.get_conversion_cycle_time()
+    time.sleep_ms(3 + 3 * period + period // 2)
+    assert (False, False) == sensor.get_interrupt_status()
+    time.sleep_ms(period)
+    assert (False, True) == sensor.get_interrupt_status()
+    # чтение регистра состояния сбрасывает флаги
+    assert (False, False) == sensor.get_interrupt_status()
+
+
+def test_install_and_uninstall_time():
+    had_ticks = hasattr(time, "ticks_ms")
+    clock = veml7700emu.install()
+    assert time.ticks_ms == clock.ticks_ms
+    veml7700emu.uninstall()
+    # виртуальное время не остаётся в модуле time после эмулятора
+    assert had_ticks == hasattr(time, "ticks_ms")
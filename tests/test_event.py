@@ -0,0 +1,96 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Режим событий (veml7700event.EventMixin) на эмуляторе: окно порогов, его сохранение при смене диапазона,
+проверка пересечения окна (poll_event), выключение режима и обработка линии INT (attach_irq)."""
+
+import time
+import pytest
+from machine import Pin
+from sensor_pack_2.bus_service import I2cAdapter
+from veml7700vishay import Veml7700
+from veml7700event import EventMixin
+
+
+class _Sensor(EventMixin, Veml7700):
+    pass
+
+
+@pytest.fixture
+def sensor(emu):
+    """Датчик (gain 1/4, IT 100 мс) в режиме событий с окном +-10 % вокруг 100 лк"""
+    s = _Sensor(I2cAdapter(emu))
+    s.use_non_linear_correction = False     # эмулятор линейный
+    s.write_config(gain_index=3, it_index=2)
+    s.wait_fresh()
+    s.arm_window(0.1)
+    return s
+
+
+def _window_lux(sensor, emu) -> tuple:
+    res = sensor._resolution
+    return emu.regs[emu.ADDR_LOW_THRESHOLD_REG] * res, emu.regs[emu.ADDR_HIGH_THRESHOLD_REG] * res
+
+
+def test_arm_window(sensor, emu):
+    _, _, pers, int_en, _ = emu._config()
+    assert int_en and 2 == pers
+    low, high = _window_lux(sensor, emu)
+    assert low == pytest.approx(90.0, abs=0.5) and high == pytest.approx(110.0, abs=0.5)
+
+
+def test_write_config_keeps_event_mode(sensor, emu):
+    sensor.write_config(gain_index=2, it_index=2)
+    # прерывания разрешены, persistence прежний, окно в люксах прежнее при новом разрешении
+    assert 0x1012 == emu.regs[emu.ADDR_CFG_REG]
+    low, high = _window_lux(sensor, emu)
+    assert low == pytest.approx(90.0, abs=1.0) and high == pytest.approx(110.0, abs=1.0)
+    emu.light = 200.0
+    time.sleep_ms(3 + 3 * sensor.get_conversion_cycle_time())
+    assert sensor.poll_event() == pytest.approx(200.0, rel=0.01)
+
+
+def test_poll_event(sensor, emu):
+    period = sensor.get_conversion_cycle_time()
+    for _ in range(5):
+        time.sleep_ms(period)
+        n = emu.transactions
+        assert sensor.poll_event() is None
+        # освещенность в окне: только чтение регистра состояния
+        assert n + 1 == emu.transactions
+    emu.light = 200.0
+    # persistence 2: событие после двух отсчётов за окном
+    time.sleep_ms(2 * period)
+    assert sensor.poll_event() == pytest.approx(200.0, rel=0.01)
+    low, high = _window_lux(sensor, emu)
+    assert low == pytest.approx(180.0, rel=0.01) and high == pytest.approx(220.0, rel=0.01)
+    time.sleep_ms(2 * period)
+    assert sensor.poll_event() is None
+
+
+def test_disarm_window(sensor, emu):
+    sensor.disarm_window()
+    _, _, pers, int_en, _ = emu._config()
+    assert not int_en and 2 == pers
+    emu.light = 200.0
+    time.sleep_ms(3 + 3 * sensor.get_conversion_cycle_time())
+    assert sensor.poll_event() is None
+    # смена диапазона не включает режим событий заново
+    sensor.write_config(gain_index=2, it_index=2)
+    assert not emu._config()[3]
+
+
+def test_attach_irq(sensor, emu):
+    pin = Pin(5, Pin.IN, Pin.PULL_UP)
+    emu.int_pin = pin
+    values = []
+    sensor.attach_irq(pin, values.append)
+    period = sensor.get_conversion_cycle_time()
+    time.sleep_ms(2 * period)
+    emu.update()
+    assert [] == values
+    emu.light = 300.0
+    time.sleep_ms(2 * period)
+    emu.update()    # спад на линии INT, обработчик читает освещенность
+    assert 1 == len(values) and values[0] == pytest.approx(300.0, rel=0.01)
+    # чтение регистра состояния в poll_event освободило линию INT
+    assert 1 == pin.value()
@@ -0,0 +1,51 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Расширения драйвера (классы-примеси): основной модуль их не загружает, примеси работают вместе"""
+
+import os
+import subprocess
+import sys
+import time
+from sensor_pack_2.bus_service import I2cAdapter
+from veml7700vishay import Veml7700
+from veml7700ext import Veml7700Ex
+import veml7700batch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_core_module_loads_no_extensions():
+    code = ("import sys; sys.path[:0] = ['host', '.']; import veml7700vishay; "
+            "print(sorted(m for m in sys.modules if m.startswith('veml7700') or m in ('asyncio', 'json')))")
+    out = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT, text=True)
+    assert "['veml7700vishay']" == out.strip()
+
+
+def test_core_class_has_no_extension_methods():
+    for name in ("read_async", "arm_window", "auto_range", "calibrate_refresh_time", "export_state"):
+        assert not hasattr(Veml7700, name)
+        assert hasattr(Veml7700Ex, name)
+
+
+def test_core_float_lux_matches_batch(sensor):
+    sensor.write_config(gain_index=2, it_index=0)
+    raw = list(range(0, 0x10000, 97))
+    expected = veml7700batch.convert(raw, [0] * len(raw), gain_index=2, it_index=0)
+    for r, lux in zip(raw, expected):
+        assert abs(sensor._lux(r, False) - float(lux)) <= 1E-6 * max(1.0, float(lux))
+
+
+def test_mixins_combined(emu):
+    sensor = Veml7700Ex(I2cAdapter(emu))
+    sensor.write_config(gain_index=3, it_index=2)
+    time.sleep_ms(110)
+    sensor.arm_window(0.1)
+    low, high = sensor.get_thresholds()
+    # auto_range меняет разрешение, окно событий (в люксах) пересчитывается в отсчёты нового разрешения
+    emu.light = 5.0
+    time.sleep_ms(110)
+    sensor.auto_range()
+    new_low, new_high = sensor.get_thresholds()
+    assert (low, high) != (new_low, new_high)
+    res = sensor._resolution
+    assert abs(new_low * res - 90.0) < 0.5 and abs(new_high * res - 110.0) < 0.5
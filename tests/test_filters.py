@@ -0,0 +1,91 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Цепочки фильтров поверх итератора датчика на эмуляторе: каждое значение источника - новый отсчёт"""
+
+import random
+import time
+import pytest
+from sensor_pack_2.filters import MedianFilter, EmaFilter, DeadbandFilter, Decimator, HysteresisClamp
+
+
+class _Limited:
+    """Источник с ограничением количества значений: если источник не ждёт новых отсчётов,
+    фильтр зоны нечувствительности опрашивал бы его бесконечно"""
+    def __init__(self, source, limit: int = 1000):
+        self._source = source
+        self._left = limit
+
+    def __next__(self):
+        self._left -= 1
+        assert self._left >= 0, "source is not paced"
+        return next(self._source)
+
+
+@pytest.fixture
+def ramp_sensor(sensor, emu):
+    """Датчик при освещенности, медленно растущей со временем (1 лк за 100 мс)"""
+    emu.light = lambda t_ms: 100 + t_ms / 100
+    sensor.write_config(gain_index=3, it_index=2)
+    return sensor
+
+
+def test_sensor_iterator_yields_each_sample_once(ramp_sensor, emu):
+    values = [next(ramp_sensor) for _ in range(5)]
+    assert 5 == emu.samples
+    assert values == sorted(set(values))
+
+
+def test_decimator_waits_for_samples(ramp_sensor, emu):
+    t0 = time.ticks_ms()
+    out = [next(Decimator(ramp_sensor, 10)) for _ in range(3)]
+    assert 30 == emu.samples
+    assert time.ticks_diff(time.ticks_ms(), t0) >= 30 * ramp_sensor.get_conversion_cycle_time()
+    assert out[0] < out[1] < out[2]
+
+
+def test_median_of_distinct_samples(ramp_sensor, emu):
+    med = MedianFilter(ramp_sensor, 5)
+    for _ in range(5):
+        y = next(med)
+    assert 5 == emu.samples
+    # медиана растущих значений - третье из пяти
+    assert 100 < y < ramp_sensor.get_measurement_value(0)
+
+
+def test_deadband_passes_only_changes(ramp_sensor, emu):
+    flt = DeadbandFilter(_Limited(ramp_sensor), rel=0.02)
+    out = [next(flt) for _ in range(4)]
+    for a, b in zip(out, out[1:]):
+        assert b - a > 0.02 * a
+    # 2 % от ~100 лк - около 2 лк, 20 периодов по 100 мс
+    assert emu.samples < 4 * 25
+
+
+def test_pipeline_from_module_docstring(ramp_sensor, emu):
+    pipeline = HysteresisClamp(DeadbandFilter(EmaFilter(MedianFilter(_Limited(ramp_sensor), 5), 0.2), 0.02), 0.5)
+    out = [next(pipeline) for _ in range(5)]
+    assert out == sorted(out)
+    assert emu.samples >= 5
+
+
+@pytest.mark.parametrize("typecode", ('f', 'i', 'H'))
+@pytest.mark.parametrize("n", (1, 5, 8))
+def test_median_matches_window(typecode, n):
+    rnd = random.Random(n)
+    values = [rnd.choice((rnd.randrange(1000), 7, 0xFFFF)) for _ in range(300)]
+    med = MedianFilter(iter(values), n, typecode)
+    for i in range(len(values)):
+        window = sorted(values[max(0, i - n + 1):i + 1])
+        assert next(med) == window[len(window) // 2]
+
+
+def test_integer_ema():
+    rnd = random.Random(4)
+    values = [rnd.randrange(2 ** 21) for _ in range(500)]
+    ema_int = EmaFilter(iter(values), 0.2, integer=True)
+    ema = EmaFilter(iter(values), 51 / 256)     # alpha, округленное до 1/256
+    for _ in values:
+        y_int, y = next(ema_int), next(ema)
+        assert isinstance(y_int, int)
+        assert abs(y_int - y) <= 1
+        assert abs(ema_int._y) < 1 << 30    # small int MicroPython
@@ -0,0 +1,80 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Датчики VEML7700 с одинаковым адресом за мультиплексором I2C (эмулятор I2cMuxEmu):
+выбор канала только при смене канала и группировка чтений по каналам (group_by_channel)."""
+
+import time
+import pytest
+import veml7700emu
+from sensor_pack_2.i2c_mux import I2cMux
+from veml7700vishay import Veml7700
+
+_CHANNELS = 0, 2, 5, 7
+
+
+@pytest.fixture
+def bus(clock):
+    devices = {ch: veml7700emu.Veml7700Emu(light=100.0 * (ch + 1), clock=clock) for ch in _CHANNELS}
+    return veml7700emu.I2cMuxEmu(devices, clock=clock)
+
+
+@pytest.fixture
+def mux(bus):
+    return I2cMux(bus)
+
+
+@pytest.fixture
+def sensors(mux) -> dict:
+    result = {ch: Veml7700(mux.get_adapter(ch)) for ch in _CHANNELS}
+    for s in result.values():
+        s.write_config(gain_index=3, it_index=0)
+    time.sleep_ms(50)
+    return result
+
+
+def test_same_address_on_channels(sensors):
+    for ch, s in sensors.items():
+        assert s.get_measurement_value(1) == int(100.0 * (ch + 1) / 0.9216)
+
+
+def test_no_redundant_select(bus, mux, sensors):
+    s = sensors[2]
+    s.get_measurement_value(1)
+    n = bus.selects
+    for _ in range(3):
+        s.get_measurement_value(1)
+        s.get_thresholds()
+    assert n == bus.selects == mux.select_count
+
+
+def test_group_by_channel_selects_each_channel_once(bus, mux, sensors):
+    # два чтения на канал в порядке, при котором каналы чередуются
+    reads = [(ch, 1) for ch in _CHANNELS] + [(ch, 2) for ch in reversed(_CHANNELS)]
+    time.sleep_ms(50)
+    n = bus.selects
+    for ch, value_index in reads:
+        sensors[ch].get_measurement_value(value_index)
+    ungrouped = bus.selects - n
+
+    time.sleep_ms(50)
+    n = bus.selects
+    order = mux.group_by_channel(reads, key=lambda item: item[0])
+    for ch, value_index in order:
+        sensors[ch].get_measurement_value(value_index)
+    grouped = bus.selects - n
+
+    assert sorted(order) == sorted(reads)
+    assert len(_CHANNELS) * 2 - 1 == ungrouped
+    # обход начинается с выбранного канала, он не выбирается повторно
+    assert len(_CHANNELS) - 1 == grouped
+
+
+def test_select_error_makes_channel_unknown(bus, mux, sensors):
+    sensors[0].get_measurement_value(1)
+    bus.address = 0x71     # мультиплексор не отвечает
+    with pytest.raises(OSError):
+        sensors[5].get_measurement_value(1)
+    assert -1 == mux.channel
+    bus.address = 0x70
+    sensors[5].get_measurement_value(1)
+    assert 5 == mux.channel
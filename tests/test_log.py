@@ -0,0 +1,90 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Двоичный журнал отсчётов: точное восстановление записанного, размер записи, независимость страниц"""
+
+import io
+import random
+import pytest
+from veml7700log import LogWriter, iter_records, read_arrays, KEYFRAME_SIZE, DELTA_SIZE
+
+pytestmark = pytest.mark.usefixtures("clock")   # time.ticks_diff
+
+
+class _Stream(io.BytesIO):
+    def close(self):
+        pass    # содержимое нужно после LogWriter.close
+
+
+def _samples(count: int, seed: int = 1) -> list:
+    """Отсчёты (t_ms, gain_index, it_index, als, white): шум, скачки, смена конфигурации и длинные паузы"""
+    rnd = random.Random(seed)
+    t, als, cfg = 0, 1000, (3, 2)
+    result = []
+    for i in range(count):
+        t += 100 + rnd.randrange(-3, 4)
+        if 0 == i % 97:
+            t += rnd.choice((40_000, 70_000, 5_000_000))
+        if 0 == i % 50:
+            als = rnd.randrange(0x10000)
+            cfg = rnd.randrange(4), rnd.randrange(6)
+        als = min(0xFFFF, max(0, als + rnd.randrange(-20, 21)))
+        result.append((t, cfg[0], cfg[1], als, min(0xFFFF, als * 3 // 2)))
+    return result
+
+
+def _write(samples: list, page_size: int = 512, **kwargs) -> bytes:
+    stream = _Stream()
+    log = LogWriter(stream, page_size=page_size, **kwargs)
+    for t, gi, iti, als, white in samples:
+        log.append(als, white, t, gi, iti)
+    log.close()
+    return stream.getvalue()
+
+
+def _relative(samples: list) -> list:
+    t0 = samples[0][0]
+    return [(s[0] - t0,) + s[1:] for s in samples]
+
+
+@pytest.mark.parametrize("page_size,keyframe_interval", ((512, 0), (64, 0), (512, 10)))
+def test_roundtrip(page_size, keyframe_interval):
+    samples = _samples(2000)
+    data = _write(samples, page_size, keyframe_interval=keyframe_interval)
+    assert list(iter_records(io.BytesIO(data))) == _relative(samples)
+
+
+def test_steady_light_uses_delta_records():
+    rnd = random.Random(2)
+    samples = [(100 * i, 3, 2, 5000 + rnd.randrange(-50, 51), 7500 + rnd.randrange(-50, 51)) for i in range(5000)]
+    data = _write(samples)
+    per_page = (512 - KEYFRAME_SIZE) // DELTA_SIZE + 1
+    pages = -(-len(samples) // per_page)
+    assert len(data) == 512 * (pages + 1)
+    # одна опорная запись на страницу, остальные - разностные
+    assert len(data) / len(samples) < 4.5
+
+
+def test_lost_page_does_not_affect_others():
+    samples = _samples(100, seed=3)
+    data = _write(samples, page_size=64)
+    records = list(iter_records(io.BytesIO(data)))
+    lost = 3
+    damaged = data[:64 * lost] + data[64 * (lost + 1):]
+    pages = [list(iter_records(io.BytesIO(data[:64] + data[64 * i:64 * (i + 1)]))) for i in range(1, len(data) // 64)]
+    expected = [r for i, page in enumerate(pages, 1) if i != lost for r in page]
+    # страницы без заголовка декодируются каждая сама по себе - так же, как в целом журнале
+    assert [r for page in pages for r in page] == records
+    assert list(iter_records(io.BytesIO(damaged))) == expected
+    assert len(expected) < len(records)
+
+
+def test_read_arrays():
+    samples = _samples(300)
+    data = read_arrays(io.BytesIO(_write(samples)))
+    assert [int(v) for v in data["als"]] == [s[3] for s in samples]
+    assert [int(v) for v in data["t_ms"]] == [s[0] for s in _relative(samples)]
+
+
+def test_time_beyond_32_bits():
+    samples = [(i * 1_500_000_000, 3, 2, 100 + i, 150 + i) for i in range(6)]
+    assert list(iter_records(io.BytesIO(_write(samples)))) == _relative(samples)
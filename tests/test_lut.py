@@ -0,0 +1,48 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Таблица нелинейной коррекции АЦП: погрешность относительно полинома AppNote во всём диапазоне отсчётов"""
+
+import pytest
+import veml7700lut
+from sensor_pack_2.bus_service import I2cAdapter
+from veml7700vishay import Veml7700
+
+
+class _Sensor(veml7700lut.LutMixin, Veml7700):
+    pass
+
+
+@pytest.fixture
+def sensor(emu):
+    """Драйвер с нелинейной коррекцией по таблице"""
+    return _Sensor(I2cAdapter(emu))
+
+
+def _poly(t: float) -> float:
+    return 6.0135E-13 * t ** 4 - 9.3924E-09 * t ** 3 + 8.1488E-05 * t ** 2 + 1.0023 * t
+
+
+# коррекция выполняется только при gain 1/8 (индекс 2) и 1/4 (индекс 3)
+@pytest.mark.parametrize("gain_index", (2, 3))
+@pytest.mark.parametrize("it_index", range(6))
+def test_lut_error_bound(sensor, gain_index, it_index):
+    sensor.write_config(gain_index=gain_index, it_index=it_index)
+    res = sensor._resolution
+    worst = 0.0
+    for raw in range(0x10000):
+        t = raw * res
+        if t <= 100:
+            continue
+        ref = _poly(t)
+        worst = max(worst, abs(sensor._lux(raw, False) - ref) / ref)
+    assert worst < 5E-4
+
+
+def test_lut_cache_is_bounded(sensor):
+    veml7700lut._lut_cache.clear()
+    for it_index in range(6):
+        sensor.write_config(gain_index=2, it_index=it_index)
+        sensor._lux(0xFFFF, False)
+    assert veml7700lut._LUT_SLOTS == len(veml7700lut._lut_cache)
+    # таблица текущего разрешения - общая для датчика и хранилища
+    assert sensor._lut is veml7700lut._get_lut(5)
@@ -0,0 +1,35 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Точность целочисленного расчёта освещенности (_lux_mlx) относительно расчёта во float по AppNote
+для всех усилений, времен интегрирования и сырых значений 0..65535."""
+
+import pytest
+from veml7700vishay import Veml7700, _lux_mlx
+
+
+def _lux_float(raw: int, gain_index: int, it_index: int, ir_corr: bool) -> float:
+    """Освещенность [лк] по формулам AppNote: разрешение, полином нелинейной коррекции, ИК-компенсация"""
+    t = raw * Veml7700._get_resolution(gain_index, it_index)
+    if gain_index in (2, 3) and t > 100:
+        t = 6.0135E-13 * t ** 4 - 9.3924E-09 * t ** 3 + 8.1488E-05 * t ** 2 + 1.0023 * t
+    if ir_corr:
+        t *= 0.95
+    return t
+
+
+@pytest.mark.parametrize("gain_index", range(4))
+@pytest.mark.parametrize("it_index", range(6))
+def test_integer_lux_error_bound(gain_index, it_index):
+    res_dmlx = 18432 >> (it_index + Veml7700._K_SHIFT[gain_index])
+    adc_corr = gain_index in (2, 3)
+    for raw in range(0x10000):
+        ref = 1000 * _lux_float(raw, gain_index, it_index, False)
+        err = abs(_lux_mlx(raw, res_dmlx, adc_corr, False) - ref)
+        # не более 0.04 % или 1 млк
+        assert err <= max(1.0, 4E-4 * ref), (raw, ref, err)
+
+
+@pytest.mark.parametrize("raw", (1, 1000, 40_000, 65535))
+def test_integer_ir_compensation(raw):
+    ref = 1000 * _lux_float(raw, 3, 2, True)
+    assert abs(_lux_mlx(raw, 18432 >> 3, True, True) - ref) <= max(1.0, 4E-4 * ref)
@@ -0,0 +1,69 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Однократное измерение через shutdown (measure_once) и учет времени работы датчика (power_stats) на эмуляторе"""
+
+import time
+import pytest
+
+
+@pytest.fixture
+def cfg_writes(emu) -> list:
+    """Значения, записанные в регистр CFG"""
+    writes = []
+    write = emu.writeto_mem
+
+    def writeto_mem(addr, memaddr, buf, *, addrsize=8):
+        if 0 == memaddr:
+            writes.append(buf[0] | (buf[1] << 8))
+        write(addr, memaddr, buf, addrsize=addrsize)
+    emu.writeto_mem = writeto_mem
+    return writes
+
+
+@pytest.fixture
+def sleeping(sensor, emu):
+    """Датчик в shutdown: gain 1/4, IT 100 мс"""
+    sensor.write_config(gain_index=3, it_index=2, shutdown=True)
+    return sensor
+
+
+def test_measure_once_cycle(sleeping, emu, clock, cfg_writes):
+    for _ in range(3):
+        del cfg_writes[:]
+        samples, t_start = emu.samples, clock.us
+        raw = sleeping.measure_once(1)
+        # пробуждение и возврат в shutdown - две записи CFG, остальные настройки прежние
+        assert 2 == len(cfg_writes)
+        assert not cfg_writes[0] & 0x01 and cfg_writes[1] == cfg_writes[0] | 0x01
+        # стабилизация >= 2.5 мс и один полный период интегрирования
+        assert clock.us - t_start >= 2500 + 100_000
+        assert samples + 1 == emu.samples
+        assert raw == emu.regs[emu.ADDR_RAW_LUX_REG] > 0
+        assert emu._config()[4] and sleeping.is_single_shot_mode()
+        time.sleep_ms(1000)
+
+
+def test_measure_once_when_active(sensor, emu, cfg_writes):
+    sensor.write_config(gain_index=3, it_index=2)
+    del cfg_writes[:]
+    sensor.measure_once(1)
+    # ожидание готовности отсчёта, затем только запись shutdown
+    assert 1 == len(cfg_writes) and cfg_writes[0] & 0x01
+    assert 1 == emu.samples and emu._config()[4]
+
+
+def test_power_stats(sleeping):
+    sleeping.reset_power_stats()
+    for _ in range(4):
+        sleeping.measure_once()
+        time.sleep_ms(1000)
+    active_ms, shutdown_ms = sleeping.power_stats
+    # в активном режиме: 3 мс стабилизации, 100 мс интегрирования и транзакции (по 0.1 мс)
+    assert 4 * 103 <= active_ms <= 4 * 104
+    assert 4 * 1000 <= shutdown_ms <= 4 * 1000 + 4
+    sleeping.start_measurement()
+    time.sleep_ms(500)
+    active, shutdown = sleeping.power_stats
+    assert (active_ms + 500, shutdown_ms) == pytest.approx((active, shutdown), abs=1)
+    sleeping.reset_power_stats()
+    assert (0, 0) == sleeping.power_stats
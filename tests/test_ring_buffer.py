@@ -0,0 +1,79 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Кольцевой буфер сырых отсчётов: статистика по отсчётам в буфере и окна без копирования"""
+
+import random
+import pytest
+from sensor_pack_2.ring_buffer import RawRingBuffer
+
+
+def _check_stats(rb: RawRingBuffer, values: list):
+    window = values[-rb.capacity:]
+    n = len(window)
+    mean = sum(window) / n
+    assert len(rb) == n
+    assert rb.min == min(window)
+    assert rb.max == max(window)
+    assert rb.mean == pytest.approx(mean)
+    assert rb.variance == pytest.approx(sum((v - mean) ** 2 for v in window) / n)
+
+
+@pytest.mark.parametrize("capacity", (1, 7, 64))
+def test_stats_cover_window(capacity):
+    rnd = random.Random(capacity)
+    rb = RawRingBuffer(capacity)
+    values = []
+    for i in range(500):
+        # ступенька в начале: наибольшие отсчёты должны уйти из статистики вместе с вытеснением
+        v = rnd.randrange(60_000, 0x10000) if i < 10 else rnd.randrange(0, 0x10000 >> (i % 9))
+        rb.push(v, v >> 1, i)
+        values.append(v)
+        _check_stats(rb, values)
+
+
+def test_sum_of_squares_stays_small_int():
+    # small int MicroPython (32 бит): до 2 ** 30
+    rb = RawRingBuffer(16383)
+    for i in range(3 * 16383):
+        rb.push(0xFFFF if i % 3 else 0)
+        assert abs(rb._sum_sq_hi) < 1 << 30 and 0 <= rb._sum_sq_lo < 1 << 16
+        assert rb._sum < 1 << 30
+
+
+def test_clear_and_window():
+    rb = RawRingBuffer(5)
+    for i in range(8):
+        rb.push(i, 100 + i, 1000 + i)
+    old, new = rb.window(4)
+    assert list(old) + list(new) == [4, 5, 6, 7]
+    old, new = rb.window(3, channel=2)
+    assert list(old) + list(new) == [1005, 1006, 1007]
+    assert (3, 103, 1003) == rb.get(0) and (7, 107, 1007) == rb.get(-1)
+    rb.clear()
+    assert 0 == len(rb) and 0.0 == rb.mean
+    rb.push(10)
+    assert 10 == rb.min == rb.max
+
+
+@pytest.mark.parametrize("step", (1, -1))
+def test_monotonic_trend(step):
+    # при тренде на каждом шаге вытесняется наименьший (наибольший) отсчёт
+    rb = RawRingBuffer(64)
+    values = [30_000 + step * i for i in range(1000)]
+    for i, v in enumerate(values):
+        rb.push(v)
+        window = values[max(0, i - 63):i + 1]
+        assert (rb.min, rb.max) == (window[0], window[-1])[::step]
+        # очередь, из которой отсчёты уходят по вытеснению, растёт до capacity, другая - из одного элемента
+        assert sorted((rb._min_len, rb._max_len)) == [1, len(window)]
+    _check_stats(rb, values)
+
+
+def test_equal_values_and_capacity_limit():
+    rb = RawRingBuffer(4)
+    values = [5, 5, 5, 1, 5, 5, 5, 5, 9, 9, 0]
+    for i, v in enumerate(values):
+        rb.push(v)
+        _check_stats(rb, values[:i + 1])
+    with pytest.raises(ValueError):
+        RawRingBuffer(0x10001)
@@ -0,0 +1,100 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Адаптер шины SPI на записывающей шине: заполнение постоянным значением, чтение и запись памяти устройства,
+функция подготовки заголовка и вывод режима данных"""
+
+import pytest
+from machine import Pin
+from sensor_pack_2.spi_adapter import SpiAdapter
+
+
+class _Spi:
+    """Шина SPI, записывающая транзакции: ('w', байты, уровень вывода режима данных) и ('r', длина).
+    Проверяет, что устройство выбрано (CS в низком уровне)."""
+    def __init__(self, cs: Pin, dm: Pin = None, rx: bytes = b""):
+        self.cs, self.dm, self.rx = cs, dm, rx
+        self.log = []
+        self.fail = False
+
+    def write(self, buf):
+        assert 0 == self.cs.value()
+        if self.fail:
+            raise OSError(5)
+        self.log.append(("w", bytes(buf), None if self.dm is None else self.dm.value()))
+
+    def readinto(self, buf, write: int = 0x00):
+        assert 0 == self.cs.value()
+        buf[:] = self.rx[:len(buf)]
+        self.log.append(("r", len(buf)))
+
+
+def _adapter(**kwargs) -> tuple:
+    cs = Pin(5, value=1)
+    spi = _Spi(cs, **kwargs)
+    return SpiAdapter(spi, spi.dm), spi, cs
+
+
+def _set_read_flag(hdr, address_index: int):
+    hdr[address_index] |= 0x80
+
+
+@pytest.mark.parametrize("count", (0, 1, 63, 64, 65, 127, 128, 200))
+def test_write_const(count):
+    adapter, spi, cs = _adapter()
+    adapter.write_const(cs, 0xA5, count)
+    assert b"".join(w[1] for w in spi.log) == b"\xA5" * count
+    assert all(0 < len(w[1]) <= 64 for w in spi.log)
+    assert len(spi.log) == -(-count // 64)
+    assert 1 == cs.value()
+
+
+def test_write_const_reuses_buffers():
+    adapter, spi, cs = _adapter()
+    adapter.write_const(cs, 0x00, 70)
+    fill, tail = adapter._fill_buf, adapter._fill_tail
+    adapter.write_const(cs, 0xFF, 70)
+    assert fill is adapter._fill_buf and tail is adapter._fill_tail
+    assert b"\xFF" * 70 == b"".join(w[1] for w in spi.log[2:])
+    with pytest.raises(ValueError):
+        adapter.write_const(cs, 0x100, 10)
+
+
+def test_write_buf_to_memory_prepares_header_only():
+    adapter, spi, cs = _adapter()
+    adapter.mem_address_size = 2
+    adapter.prepare_func = _set_read_flag
+    data = bytearray(b"\x01\x02\x03")
+    adapter.write_buf_to_memory(cs, 0x0123, data)
+    # заголовок (адрес, старший байт первым) и данные - при одном выборе устройства
+    assert [("w", b"\x81\x23", None), ("w", b"\x01\x02\x03", None)] == spi.log
+    assert b"\x01\x02\x03" == data
+    assert 1 == cs.value()
+
+
+@pytest.mark.parametrize("address_size", (1, 2, 3, 4))
+def test_read_buf_from_memory(address_size):
+    adapter, spi, cs = _adapter(rx=b"\x10\x20\x30\x40")
+    adapter.prepare_func = _set_read_flag
+    buf = bytearray(4)
+    assert buf is adapter.read_buf_from_memory(cs, 0x01020304, buf, address_size)
+    expected = (0x01020304 & ((1 << 8 * address_size) - 1)).to_bytes(address_size, "big")
+    assert [("w", bytes((expected[0] | 0x80,)) + expected[1:], None), ("r", 4)] == spi.log
+    assert b"\x10\x20\x30\x40" == buf
+    with pytest.raises(ValueError):
+        adapter.read_buf_from_memory(cs, 0, buf, 5)
+
+
+def test_data_mode_pin():
+    adapter, spi, cs = _adapter(dm=Pin(6, value=0))
+    adapter.use_data_mode_pin = True
+    adapter.write_buf_to_memory(cs, 0x2C, b"\xAA\xBB")
+    # заголовок передается как команда (low), данные - как данные (high)
+    assert [("w", b"\x2C", 0), ("w", b"\xAA\xBB", 1)] == spi.log
+
+
+def test_chip_select_released_on_error():
+    adapter, spi, cs = _adapter()
+    spi.fail = True
+    with pytest.raises(OSError):
+        adapter.write_buf_to_memory(cs, 0x10, b"\x00")
+    assert 1 == cs.value()
@@ -0,0 +1,83 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Сохранение состояния драйвера на время глубокого сна (veml7700state.StateMixin) на эмуляторе:
+восстановление без обмена по шине, проверка после пропадания питания датчика, отказ от неверного состояния."""
+
+import time
+import pytest
+from sensor_pack_2.bus_service import I2cAdapter
+from veml7700vishay import Veml7700
+from veml7700state import StateMixin
+
+
+class _Sensor(StateMixin, Veml7700):
+    pass
+
+
+def _regs(emu) -> list:
+    """Записываемые регистры эмулятора: CFG, пороги, PSM"""
+    return emu.regs[:4]
+
+
+@pytest.fixture
+def state(emu) -> bytes:
+    """Состояние датчика, настроенного 'до сна'"""
+    s = _Sensor(I2cAdapter(emu))
+    s.write_config(gain_index=3, it_index=4, persistence=2, int_en=True)
+    s.set_thresholds(low=1000, high=2500)
+    s.set_power_save_mode(enable_psm=True, psm=1)
+    s.use_integer_math = True
+    s.skip_stale_reads = False
+    time.sleep_ms(1000)
+    return s.export_state()
+
+
+def test_roundtrip(emu, state):
+    assert 7 == len(state)
+    s = _Sensor(I2cAdapter(emu))
+    assert s.restore_state(state)
+    assert state == s.export_state()
+    assert (3, 4) == (s.gain[0], s.integration_time[0])
+    assert s.use_integer_math and not s.skip_stale_reads and s.use_non_linear_correction
+    assert (1000, 2500) == s.get_thresholds()
+
+
+def test_no_bus_traffic_before_first_read(emu, state):
+    n = emu.transactions
+    s = _Sensor(I2cAdapter(emu))
+    s.restore_state(state)
+    s.get_thresholds()
+    s.export_state()
+    assert n == emu.transactions
+    # первое измерение: каналы ALS и WHITE (ИК-коррекция), без чтения и записи конфигурации
+    lux = s.get_measurement_value(0)
+    assert n + 2 == emu.transactions
+    assert lux == pytest.approx(s._lux(emu.regs[emu.ADDR_RAW_LUX_REG], False))
+
+
+def test_verify_after_power_loss(emu, state):
+    expected = _regs(emu)
+    emu.power_loss()
+    s = _Sensor(I2cAdapter(emu))
+    assert not s.restore_state(state, verify=True)
+    # все записываемые регистры восстановлены по состоянию
+    assert expected == _regs(emu)
+    time.sleep_ms(3 + s.get_conversion_cycle_time())
+    assert 0 < s.get_measurement_value(1)
+
+
+def test_verify_without_power_loss(emu, state):
+    n = emu.transactions
+    s = _Sensor(I2cAdapter(emu))
+    assert s.restore_state(state, verify=True)
+    # одно чтение регистра CFG
+    assert n + 1 == emu.transactions
+
+
+@pytest.mark.parametrize("bad", (bytes(7), b"\x00\x10\x80", bytearray(16)))
+def test_invalid_state_rejected(emu, bad):
+    s = _Sensor(I2cAdapter(emu))
+    n = emu.transactions
+    with pytest.raises(ValueError):
+        s.restore_state(bad)
+    assert n == emu.transactions
@@ -0,0 +1,49 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Политика чтения канала белого для ИК-коррекции (set_white_policy) на эмуляторе"""
+
+import pytest
+
+
+def _read(sensor, count: int) -> list:
+    values = []
+    for _ in range(count):
+        sensor.wait_fresh()
+        values.append(sensor.get_measurement_value(0))
+    return values
+
+
+def test_every_sample_by_default(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=0)
+    n = emu.transactions
+    _read(sensor, 10)
+    assert 20 == emu.transactions - n
+
+
+def test_decimation(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=0)
+    sensor.set_white_policy(every=5)
+    n = emu.transactions
+    _read(sensor, 10)
+    assert 12 == emu.transactions - n
+
+
+def test_rel_change_refreshes_ir_flag(sensor, emu):
+    sensor.write_config(gain_index=3, it_index=0)
+    sensor.set_white_policy(every=0, rel_change=0.25)
+    _read(sensor, 3)
+    emu.light, emu.white_ratio = 200.0, 3.0     # источник с ИК-составляющей
+    n = emu.transactions
+    lux = _read(sensor, 1)[0]
+    # ALS изменился больше чем на 25 %: канал белого считан вместе с ним, ИК-коррекция включена
+    assert 2 == emu.transactions - n
+    assert sensor.white_ratio == pytest.approx(3.0, rel=0.01)
+    raw, white, lux_pair = sensor.read_als_white()
+    assert white > 2 * raw
+    assert lux == lux_pair
+
+
+@pytest.mark.parametrize("kwargs", ({"every": 0}, {"every": -1}, {"rel_change": 0}, {"period_ms": 0}))
+def test_invalid_policy(sensor, kwargs):
+    with pytest.raises(ValueError):
+        sensor.set_white_policy(**kwargs)
@@ -0,0 +1,54 @@
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Компиляция модулей пакета в байт-код MicroPython (.mpy) с помощью mpy-cross (запускается на ПК).
+Модуль .mpy импортируется быстрее .py и требует меньше памяти при загрузке: на плате не работает компилятор.
+Результат помещается в каталог dist вместе с package.json для установки модулей .mpy через mip.
+
+Usage:
+    pip install mpy-cross
+    python tools/build_mpy.py -march=xtensa
+
+Модули используют @micropython.native, поэтому архитектура платы обязательна: xtensa (ESP8266),
+xtensawin (ESP32), armv6m (RP2040), armv7emsp (STM32F4) и т.д.
+
+Установка на плату (mip, ссылки в dist/package.json указаны относительно него самого):
+    mpremote mip install dist/package.json
+или копированием:
+    mpremote cp -r dist/sensor_pack_2 :
+    mpremote cp dist/veml7700vishay.mpy :
+Каталог dist не хранится в репозитории. Его можно опубликовать целиком (например, на веб-сервере):
+mip ищет файлы по относительным ссылкам рядом с package.json.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIST = os.path.join(ROOT, "dist")
+
+
+def build(extra_args: list) -> list:
+    """Компилирует модули из package.json в DIST. Возвращает список путей файлов .mpy относительно DIST"""
+    with open(os.path.join(ROOT, "package.json")) as f:
+        package = json.load(f)
+    result = []
+    for dest, _ in package["urls"]:
+        target = dest[:-3] + ".mpy"
+        out = os.path.join(DIST, target)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        subprocess.check_call([sys.executable, "-m", "mpy_cross", *extra_args, "-o", out, os.path.join(ROOT, dest)])
+        result.append(target)
+    # относительные ссылки: mip ищет файлы относительно расположения package.json
+    package["urls"] = [[target, target] for target in result]
+    with open(os.path.join(DIST, "package.json"), "w") as f:
+        json.dump(package, f, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    if not any(arg.startswith("-march=") for arg in sys.argv[1:]):
+        sys.exit(__doc__)
+    for path in build(sys.argv[1:]):
+        print(path)
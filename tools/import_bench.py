@@ -0,0 +1,56 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Измерение времени импорта и памяти кучи, занимаемой модулями (запускается на плате).
+Каждый вариант импортируется 'с нуля': модули пакета удаляются из sys.modules перед измерением.
+Сравните результаты для .py, .mpy (tools/build_mpy.py) и замороженных модулей (manifest.py).
+
+Usage:
+    mpremote run tools/import_bench.py
+"""
+
+import gc
+import sys
+import time
+
+# варианты импорта: (название, модули)
+CASES = (
+    ("bus_service", ("sensor_pack_2.bus_service",)),
+    ("base_sensor", ("sensor_pack_2.base_sensor",)),
+    ("veml7700 (I2C)", ("veml7700vishay",)),
+    ("veml7700 + auto_range", ("veml7700vishay", "veml7700range")),
+    ("veml7700 + event", ("veml7700vishay", "veml7700event")),
+    ("veml7700 (all extensions)", ("veml7700ext",)),
+    ("spi_adapter", ("sensor_pack_2.spi_adapter",)),
+    ("i2c_mux", ("sensor_pack_2.i2c_mux",)),
+)
+
+
+def _unload():
+    for name in list(sys.modules):
+        if name.startswith("sensor_pack_2") or name.startswith("veml7700"):
+            del sys.modules[name]
+    gc.collect()
+
+
+def measure(modules: tuple) -> tuple:
+    """Возвращает (время импорта [мкс], занятая память [байт])"""
+    _unload()
+    free = gc.mem_free()
+    t_start = time.ticks_us()
+    for name in modules:
+        __import__(name)
+    dt = time.ticks_diff(time.ticks_us(), t_start)
+    gc.collect()
+    return dt, free - gc.mem_free()
+
+
+def main():
+    print("module: import time [us], heap [bytes]")
+    for title, modules in CASES:
+        dt, used = measure(modules)
+        print(f"{title}: {dt}, {used}")
+    _unload()
+
+
+main()
@@ -0,0 +1,186 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Адаптивное управление частотой измерений VEML7700 по скорости изменения освещенности.
+
+Пока освещенность меняется быстро, датчик работает с коротким временем интегрирования без режима экономии
+энергии (PSM) - изменения видны с наименьшей задержкой. Когда освещенность стабильна, контроллер переходит
+на длинное время интегрирования и PSM (датчик потребляет меньше, отсчёты реже, обмена по шине почти нет),
+а при разрешенном shutdown - в режим сна, в котором датчик включается только для одного измерения.
+Любое быстрое изменение сразу возвращает контроллер в быстрый режим.
+
+Границы задаются параметрами: max_latency_ms - наибольший интервал между отсчётами в стабильном режиме
+(задержка реакции на изменение), min_period_ms - наименьший интервал между отсчётами в быстром режиме
+(ограничение затрат шины и CPU).
+
+Example:
+    sampler = AdaptiveSampler(sensor, max_latency_ms=2000, use_shutdown=True)
+    for lux in sampler:     # __next__ ждёт следующего отсчёта
+        print(lux, sampler.mode)
+"""
+
+import time
+from micropython import const
+from sensor_pack_2.base_sensor import Iterator
+from veml7700vishay import Veml7700
+
+MODE_FAST = const(0)    # короткое время интегрирования, без PSM
+MODE_SLOW = const(1)    # длинное время интегрирования и PSM
+MODE_SLEEP = const(2)   # shutdown между отсчётами
+
+_RAW_LIMIT = const(0x8000)   # наибольший ожидаемый отсчёт ALS при выборе времени интегрирования (запас по насыщению)
+_RAW_OVERLOAD = const(0xF000)  # отсчёт, близкий к насыщению: нужен быстрый режим с коротким IT
+
+
+class AdaptiveSampler(Iterator):
+    """Контроллер частоты измерений. Управляет усилением, временем интегрирования, режимом экономии энергии
+    и shutdown датчика самостоятельно: не меняйте их, пока контроллер используется.
+    Persistence и разрешение прерываний (в том числе режим событий arm_window) сохраняются."""
+
+    def __init__(self, sensor: Veml7700, gain_index: int = 3, fast_it: int = 0, slow_it: int = 3,
+                 max_latency_ms: int = 2000, min_period_ms: int = 25, rate_high: float = 0.5,
+                 rate_low: float = 0.05, rel_step: float = 0.2, stable_samples: int = 5,
+                 use_shutdown: bool = False, lux_floor: float = 1.0):
+        """sensor - датчик;
+        gain_index - индекс усиления (0..3), не меняется контроллером;
+        fast_it - индекс времени интегрирования в быстром режиме (0..5);
+        slow_it - наибольший индекс времени интегрирования в стабильном режиме (уменьшается, если
+        при нём отсчёт приблизится к насыщению);
+        max_latency_ms - наибольший интервал между отсчётами в стабильном режиме;
+        min_period_ms - наименьший интервал между отсчётами в быстром режиме;
+        rate_high - относительная скорость изменения освещенности [1/с], выше которой включается быстрый режим;
+        rate_low - относительная скорость [1/с], ниже которой отсчёт считается стабильным;
+        rel_step - относительное изменение между соседними отсчётами, при котором быстрый режим включается
+        независимо от скорости (при редких отсчётах скачок освещенности дает небольшую скорость);
+        stable_samples - количество стабильных отсчётов подряд для перехода в более медленный режим;
+        use_shutdown - разрешить режим сна (shutdown между отсчётами) после стабильного режима;
+        lux_floor - освещенность (в единицах get_measurement_value(0): лк или млк при use_integer_math),
+        ниже которой относительное изменение считается от lux_floor (шум в темноте)."""
+        if not fast_it <= slow_it:
+            raise ValueError(f"Invalid integration time indexes: {fast_it}, {slow_it}")
+        if rate_low > rate_high:
+            raise ValueError(f"Invalid rate thresholds: {rate_low}, {rate_high}")
+        Veml7700.get_max_possible_illumination(gain_index, slow_it)     # проверка индексов
+        self._sensor = sensor
+        self._gain_index = gain_index
+        self._fast_it = fast_it
+        self._slow_it = slow_it
+        self.max_latency_ms = max_latency_ms
+        self.min_period_ms = min_period_ms
+        self.rate_high = rate_high
+        self.rate_low = rate_low
+        self.rel_step = rel_step
+        self.stable_samples = stable_samples
+        self.use_shutdown = use_shutdown
+        self.lux_floor = lux_floor
+        self._mode = MODE_FAST
+        self._stable = 0            # количество стабильных отсчётов подряд
+        self._prev = None           # предыдущее значение освещенности
+        self._t_prev = 0            # момент предыдущего отсчёта (time.ticks_ms)
+        self._delay = 0             # интервал до следующего отсчёта [мс]
+        self.mode_switches = 0      # количество переключений режима
+        self.samples = 0            # количество отсчётов
+        self._enter_fast()
+
+    @property
+    def mode(self) -> int:
+        """Возвращает текущий режим: MODE_FAST, MODE_SLOW или MODE_SLEEP"""
+        return self._mode
+
+    @property
+    def delay_ms(self) -> int:
+        """Возвращает интервал в мс до следующего отсчёта (после step)"""
+        return self._delay
+
+    def _enter_fast(self):
+        s = self._sensor
+        s.set_power_save_mode(enable_psm=False, psm=0)
+        s.write_config(gain_index=self._gain_index, it_index=self._fast_it)
+        self._mode = MODE_FAST
+        self._delay = max(self.min_period_ms, s.get_conversion_cycle_time())
+
+    def _slow_it_for(self, raw: int, it_index: int) -> int:
+        """Возвращает наибольший индекс времени интегрирования не больше slow_it, при котором
+        ожидаемый отсчёт (raw при it_index) не превысит _RAW_LIMIT"""
+        it = self._slow_it
+        while it > self._fast_it and raw << it >> it_index > _RAW_LIMIT:
+            it -= 1
+        return it
+
+    def _enter_slow(self, raw: int):
+        s = self._sensor
+        it = self._slow_it_for(raw, s.integration_time[0])
+        # наибольший период PSM, при котором интервал между отсчётами не превышает max_latency_ms.
+        # Период вычисляется без обмена по шине, регистр PSM записывается один раз
+        enable_psm, psm = False, 0
+        for p in range(3, -1, -1):
+            if s.get_conversion_cycle_time_for(it, True, p) <= self.max_latency_ms:
+                enable_psm, psm = True, p
+                break
+        s.write_config(gain_index=self._gain_index, it_index=it)
+        s.set_power_save_mode(enable_psm=enable_psm, psm=psm)
+        self._mode = MODE_SLOW
+        self._delay = s.get_conversion_cycle_time()
+
+    def _enter_sleep(self, raw: int):
+        s = self._sensor
+        it = self._slow_it_for(raw, s.integration_time[0])
+        s.set_power_save_mode(enable_psm=False, psm=0)
+        s.write_config(gain_index=self._gain_index, it_index=it, shutdown=True)
+        self._mode = MODE_SLEEP
+        self._delay = self.max_latency_ms
+
+    def _switch(self, mode: int, raw: int):
+        if MODE_FAST == mode:
+            self._enter_fast()
+        elif MODE_SLOW == mode:
+            self._enter_slow(raw)
+        else:
+            self._enter_sleep(raw)
+        self._stable = 0
+        self.mode_switches += 1
+
+    def step(self) -> int | float:
+        """Выполняет одно измерение, обновляет режим по скорости изменения освещенности и возвращает
+        освещенность (как get_measurement_value(0)). Интервал до следующего вызова - delay_ms."""
+        s = self._sensor
+        now = time.ticks_ms()
+        if MODE_SLEEP == self._mode:
+            lux = s.measure_once(0)     # пробуждение, один период интегрирования, чтение, shutdown
+        else:
+            s.wait_fresh()      # после переключения режима период может быть длиннее delay_ms
+            lux = s.get_measurement_value(0)
+        raw = s.last_raw
+        self.samples += 1
+        prev = self._prev
+        dt = time.ticks_diff(now, self._t_prev)
+        self._prev, self._t_prev = lux, now
+        if raw >= _RAW_OVERLOAD:
+            # насыщение при текущем времени интегрирования
+            if MODE_FAST != self._mode:
+                self._switch(MODE_FAST, raw)
+            return lux
+        if prev is None or dt <= 0:
+            return lux
+        # относительное изменение и относительная скорость изменения [1/с]
+        rel = abs(lux - prev) / max(abs(prev), self.lux_floor)
+        rate = 1000 * rel / dt
+        if rate > self.rate_high or rel > self.rel_step:
+            self._stable = 0
+            if MODE_FAST != self._mode:
+                self._switch(MODE_FAST, raw)
+        elif rate < self.rate_low:
+            self._stable += 1
+            if self._stable >= self.stable_samples:
+                if MODE_FAST == self._mode:
+                    self._switch(MODE_SLOW, raw)
+                elif MODE_SLOW == self._mode and self.use_shutdown:
+                    self._switch(MODE_SLEEP, raw)
+        else:
+            self._stable = 0
+        return lux
+
+    def __next__(self) -> int | float:
+        """Ждёт интервал delay_ms и возвращает следующий отсчёт (смотри step)"""
+        time.sleep_ms(self._delay)
+        return self.step()
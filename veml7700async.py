@@ -0,0 +1,67 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Расширение драйвера VEML7700: чтение под asyncio без блокировки цикла событий.
+
+Example:
+    from veml7700vishay import Veml7700
+    from veml7700async import AsyncMixin
+
+    class Sensor(AsyncMixin, Veml7700):
+        pass
+
+    sensor = Sensor(adapter)
+    async for lux in sensor:
+        print(lux)
+"""
+
+import asyncio
+
+
+async def _async_sleep_ms(ms: int):
+    """Неблокирующее ожидание ms миллисекунд в цикле событий asyncio.
+    В MicroPython используется asyncio.sleep_ms, в CPython (нет sleep_ms) - asyncio.sleep."""
+    sleep_ms = getattr(asyncio, "sleep_ms", None)
+    if sleep_ms is None:
+        await asyncio.sleep(ms / 1000)
+    else:
+        await sleep_ms(ms)
+
+
+class AsyncMixin:
+    """Примесь к Veml7700: read_async, асинхронный итератор и start_sampling"""
+
+    async def read_async(self, value_index: int | None = 0) -> int | float:
+        """Ждёт готовности нового отсчёта (смотри wait_fresh), не блокируя цикл событий asyncio,
+        и возвращает get_measurement_value(value_index).
+        Позволяет нескольким датчикам и сетевому стеку работать в одном цикле событий.
+
+        Example:
+            >>> lux = await sensor.read_async()
+        """
+        if not self._als_shutdown:
+            await _async_sleep_ms(self._ms_to_fresh())
+        return self.get_measurement_value(value_index)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> int | float:
+        """Асинхронный итератор: async for lux in sensor: ..."""
+        return await self.read_async(0)
+
+    def start_sampling(self, callback, value_index: int | None = 0):
+        """Запускает непрерывное измерение задачей asyncio. Для каждого измерения вызывается callback(value).
+        Возвращает задачу (asyncio.Task). Для остановки измерений вызовите у неё cancel().
+
+        Example:
+            >>> task = sensor.start_sampling(print)
+            >>> await asyncio.sleep_ms(5000)
+            >>> task.cancel()
+        """
+        return asyncio.create_task(self._sampling(callback, value_index))
+
+    async def _sampling(self, callback, value_index: int | None):
+        while True:
+            callback(await self.read_async(value_index))
+
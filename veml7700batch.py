@@ -0,0 +1,81 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Пакетное преобразование сохранённых сырых значений VEML7700 (каналы ALS и WHITE) в люксы.
+Выполняет те же преобразования, что и Veml7700.get_measurement_value(0): разрешение по индексам усиления и
+времени интегрирования, нелинейная коррекция АЦП и ИК-компенсация по каналу белого. Полином коррекции
+вычисляется так же, как в драйвере. Драйвер с расширением veml7700lut.LutMixin (таблица вместо полинома)
+может отличаться от результата не более чем на 0.05 %.
+
+Использует NumPy (CPython) или ulab (MicroPython), если они доступны, иначе - обычный цикл.
+Модуль не зависит от machine и sensor_pack_2, поэтому работает и на ПК, для обработки журналов.
+
+Example:
+    >>> from veml7700batch import convert
+    >>> lux = convert(raw_als, raw_white, gain_index=3, it_index=4)
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    try:
+        from ulab import numpy as np
+    except ImportError:
+        np = None
+
+# Базовое разрешение (наихудший случай): IT=25ms, gain=×1/8 (по таблице из AppNote), как в veml7700vishay
+_RESOLUTION_BASE = 1.8432   # [lx/ct]
+_K_SHIFT = 3, 4, 0, 1       # log2(gain / gain_base) для каждого индекса усиления
+# коэффициенты полинома нелинейной коррекции АЦП (AppNote), от старшей степени к младшей
+_A4, _A3, _A2, _A1 = 6.0135E-13, -9.3924E-09, 8.1488E-05, 1.0023
+
+
+def get_resolution(gain_index: int, it_index: int) -> float:
+    """Возвращает разрешение младшего разряда в [лк/отсчёт] по индексу усиления (0..3)
+    и индексу времени интегрирования (0..5)"""
+    if gain_index not in range(4):
+        raise ValueError(f"Invalid als gain index: {gain_index}")
+    if it_index not in range(6):
+        raise ValueError(f"Invalid als integration time index: {it_index}")
+    return _RESOLUTION_BASE / (1 << (it_index + _K_SHIFT[gain_index]))
+
+
+def convert(raw_als, raw_white=None, gain_index: int = 2, it_index: int = 2, non_lin_corr: bool = True):
+    """Преобразует последовательность (список, array, bytes-буфер через memoryview, ndarray) сырых значений
+    канала ALS в освещенность [лк].
+    raw_white - последовательность сырых значений канала белого той же длины или None (без ИК-компенсации);
+    gain_index, it_index - индексы усиления и времени интегрирования, при которых получены значения;
+    non_lin_corr - применять коррекцию (как Veml7700.use_non_linear_correction).
+    Возвращает ndarray (NumPy/ulab) или список float (если их нет)."""
+    res = get_resolution(gain_index, it_index)
+    adc_corr = non_lin_corr and gain_index in (2, 3)
+    ir_corr = non_lin_corr and raw_white is not None
+    if np is not None:
+        return _convert_np(raw_als, raw_white, res, adc_corr, ir_corr)
+    return _convert_py(raw_als, raw_white, res, adc_corr, ir_corr)
+
+
+def _convert_np(raw_als, raw_white, res: float, adc_corr: bool, ir_corr: bool):
+    dtype = getattr(np, "float64", None) or np.float    # в ulab нет float64
+    a = np.array(raw_als, dtype=dtype)
+    t = a * res
+    if adc_corr:
+        p = (((_A4 * t + _A3) * t + _A2) * t + _A1) * t
+        t = t + (p - t) * (t > 100)
+    if ir_corr:
+        w = np.array(raw_white, dtype=dtype)
+        t = t * (1.0 - 0.05 * ((w > 2 * a) * (a > 0)))
+    return t
+
+
+def _convert_py(raw_als, raw_white, res: float, adc_corr: bool, ir_corr: bool) -> list:
+    out = []
+    for i in range(len(raw_als)):
+        raw = raw_als[i]
+        t = raw * res
+        if adc_corr and t > 100:
+            t = (((_A4 * t + _A3) * t + _A2) * t + _A1) * t
+        if ir_corr and 0 < raw and raw_white[i] > 2 * raw:
+            t *= 0.95
+        out.append(t)
+    return out
@@ -0,0 +1,90 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Расширение драйвера VEML7700: измерение периода обновления данных в режиме экономии энергии (PSM).
+Таблица периодов используется Veml7700.get_conversion_cycle_time. Загрузить сохраненную таблицу можно
+и без этого модуля: sensor.refresh_table = json.load(f).
+
+Example:
+    from veml7700vishay import Veml7700
+    from veml7700calib import CalibrationMixin
+
+    class Sensor(CalibrationMixin, Veml7700):
+        pass
+"""
+
+import json
+import time
+
+
+class CalibrationMixin:
+    """Примесь к Veml7700: calibrate_refresh_time, save_refresh_table, load_refresh_table"""
+
+    def calibrate_refresh_time(self, it_indexes=range(6), psms=range(4), transitions: int = 4,
+                               poll_us: int = 500) -> list:
+        """Измеряет действительный период обновления данных датчика в режиме экономии энергии (PSM)
+        для каждой пары (it_index, psm) и сохраняет результат в таблице, которую затем использует
+        get_conversion_cycle_time. Документация на VEML7700 не позволяет вычислить этот период точно!
+
+        Для каждой пары настраивается датчик, регистр ALS опрашивается каждые poll_us мкс, и запоминаются
+        моменты изменения его значения. Периодом считается наименьший интервал между transitions изменениями:
+        если два соседних отсчёта совпали, интервал окажется кратным периоду, наименьший интервал от этого защищён.
+        Калибровку нужно выполнять при освещенности, дающей шум в младших разрядах (не в темноте)!
+        Если изменений не было, то значение для пары не измеряется (0).
+        По окончании восстанавливаются исходные настройки датчика.
+
+        Возвращает таблицу (смотри refresh_table). Сохраните её (save_refresh_table) и загружайте
+        при запуске (load_refresh_table), чтобы не калибровать датчик каждый раз.
+
+        Example:
+            >>> sensor.write_config(gain_index=3, it_index=0)
+            >>> table = sensor.calibrate_refresh_time()
+            >>> sensor.save_refresh_table("veml7700_psm.json")
+        """
+        gi, iti, pers, ie = self._als_gain_index, self._als_it_index, self._als_pers, self._als_int_en
+        sd = self._als_shutdown
+        en_psm, psm_old = self._enable_psm, self._psm
+        table = list(self._refresh_table) if self._refresh_table is not None else [0] * 24
+        self._refresh_table = None  # таймаут считается по формуле
+        addr = self.ADDR_RAW_LUX_REG
+        try:
+            for it_index in it_indexes:
+                self.write_config(gain_index=gi, it_index=it_index, persistence=pers, int_en=ie, shutdown=False)
+                for psm in psms:
+                    self.set_power_save_mode(enable_psm=True, psm=psm)
+                    timeout_ms = 2 * (transitions + 2) * self.get_conversion_cycle_time()
+                    t_start = time.ticks_ms()
+                    prev = self._set_reg(addr=addr)
+                    t_prev = None
+                    changes = 0
+                    best = 0
+                    while changes <= transitions and time.ticks_diff(time.ticks_ms(), t_start) < timeout_ms:
+                        time.sleep_us(poll_us)
+                        val = self._set_reg(addr=addr)
+                        if val == prev:
+                            continue
+                        prev = val
+                        t = time.ticks_us()
+                        if t_prev is not None:
+                            interval = time.ticks_diff(t, t_prev)
+                            if 0 == best or interval < best:
+                                best = interval
+                        t_prev = t
+                        changes += 1
+                    table[4 * it_index + psm] = (best + 500) // 1000
+        finally:
+            self.write_config(gain_index=gi, it_index=iti, persistence=pers, int_en=ie, shutdown=sd)
+            self.set_power_save_mode(enable_psm=en_psm, psm=psm_old)
+            self._refresh_table = table
+        self._restart_period(0)
+        return table
+
+    def save_refresh_table(self, filename: str):
+        """Сохраняет таблицу периодов обновления данных в файл (JSON)"""
+        with open(filename, "w") as f:
+            json.dump(self._refresh_table, f)
+
+    def load_refresh_table(self, filename: str):
+        """Загружает таблицу периодов обновления данных из файла (JSON), созданного save_refresh_table"""
+        with open(filename) as f:
+            self.refresh_table = json.load(f)
@@ -0,0 +1,104 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Расширение драйвера VEML7700: режим событий. Датчик сравнивает каждый отсчёт с окном порогов вокруг
+последней освещенности, обмен по шине нужен только после выхода освещенности за окно.
+
+Example:
+    from veml7700vishay import Veml7700
+    from veml7700event import EventMixin
+
+    class Sensor(EventMixin, Veml7700):
+        pass
+
+    sensor = Sensor(adapter)
+    sensor.write_config(gain_index=3, it_index=2)
+    sensor.arm_window(rel_width=0.1)
+    sensor.attach_irq(Pin(5, Pin.IN, Pin.PULL_UP), print)
+"""
+
+import micropython
+import time
+
+
+class EventMixin:
+    """Примесь к Veml7700: окно порогов вокруг текущей освещенности (arm_window), проверка его пересечения
+    (poll_event) и обработка линии INT (attach_irq)."""
+    # окно порогов прерывания вокруг освещенности _win_lux [лк].
+    # _win_rel - относительная полуширина окна или None, если режим событий выключен.
+    _win_lux = 0.0
+    _win_rel = None
+    _win_min = 2            # наименьшая полуширина окна в отсчётах
+    _irq_callback = None
+    _irq_ref = None         # ссылка на self._on_irq, создаётся заранее, чтобы не выделять память в ISR
+
+    def _on_resolution_change(self):
+        """Разрешение изменилось (write_config), пороги окна в отсчётах пересчитываются"""
+        if self._win_rel is not None:
+            self._program_window(self._win_lux)
+
+    def _program_window(self, lux: float):
+        """Программирует окно порогов вокруг освещенности lux с полушириной _win_rel * lux,
+        но не менее _win_min отсчётов."""
+        self._win_lux = lux
+        res = self._resolution
+        delta = max(lux * self._win_rel, self._win_min * res)
+        self.set_thresholds_lux(max(0.0, lux - delta), lux + delta)
+
+    def arm_window(self, rel_width: float = 0.1, min_counts: int = 2) -> None:
+        """Включает режим событий: программирует окно порогов вокруг текущей освещенности
+        (lux * (1 - rel_width) .. lux * (1 + rel_width)) и разрешает прерывания датчика.
+        После пересечения окна poll_event возвращает новое значение и заново программирует окно.
+        При изменении усиления или времени интегрирования (write_config) окно пересчитывается автоматически,
+        persistence и разрешение прерываний сохраняются (write_config с persistence, int_en в None).
+        min_counts - наименьшая полуширина окна в отсчётах (для темноты, чтобы шум не вызывал событий)."""
+        self._win_rel = rel_width
+        self._win_min = min_counts
+        if not self._als_int_en:
+            self.write_config(gain_index=self._als_gain_index, it_index=self._als_it_index, int_en=True,
+                              shutdown=self._als_shutdown)
+        raw = self.get_measurement_value(1)
+        self._program_window(raw * self._resolution)
+        self.get_interrupt_status()     # сброс флагов, установленных до программирования окна
+
+    def disarm_window(self) -> None:
+        """Выключает режим событий и запрещает прерывания датчика"""
+        self._win_rel = None
+        if self._als_int_en:
+            self.write_config(gain_index=self._als_gain_index, it_index=self._als_it_index, int_en=False,
+                              shutdown=self._als_shutdown)
+
+    def poll_event(self) -> int | float | None:
+        """Проверяет флаги прерывания (чтение регистра состояния сбрасывает их).
+        Если освещенность вышла за окно порогов, то считывает её, программирует новое окно вокруг неё
+        и возвращает освещенность (как get_measurement_value(0)). Иначе возвращает None.
+        Вызывайте с низкой частотой или из обработчика линии INT (attach_irq).
+        Пока освещенность не меняется, каждый вызов стоит одной транзакции на шине."""
+        low, high = self.get_interrupt_status()
+        if not (low or high):
+            return None
+        # флаг прерывания означает, что в датчике уже новый отсчёт
+        self._t_next = time.ticks_ms()
+        lux = self.get_measurement_value(0)
+        if self._win_rel is not None:
+            self._program_window(self._last_raw_ill * self._resolution)
+        return lux
+
+    def attach_irq(self, pin, callback) -> None:
+        """Подключает обработчик прерывания от линии INT датчика к выводу MCU pin (machine.Pin).
+        У VEML7700 в корпусе с 4 выводами линии INT нет! Тогда вызывайте poll_event периодически.
+        При спаде сигнала на линии обработка планируется через micropython.schedule (обмен по шине
+        в ISR недопустим), затем вызывается callback(lux).
+        pin - вывод MCU, настроенный на вход с подтяжкой к питанию (INT - выход с открытым стоком)."""
+        self._irq_callback = callback
+        self._irq_ref = self._on_irq
+        pin.irq(trigger=pin.IRQ_FALLING, handler=self._isr)
+
+    def _isr(self, pin):
+        micropython.schedule(self._irq_ref, 0)
+
+    def _on_irq(self, _):
+        lux = self.poll_event()
+        if lux is not None and self._irq_callback is not None:
+            self._irq_callback(lux)
+
@@ -0,0 +1,26 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Драйвер VEML7700 со всеми расширениями (смотри документацию класса veml7700vishay.Veml7700).
+Удобен на платах с большим объемом памяти и для примеров. На платах с малым объемом памяти
+составьте класс только из нужных примесей.
+
+Example:
+    from veml7700ext import Veml7700Ex
+    sensor = Veml7700Ex(adapter)
+    lux, raw, conversions, elapsed_ms = sensor.auto_range()
+"""
+
+from veml7700vishay import Veml7700
+from veml7700async import AsyncMixin
+from veml7700calib import CalibrationMixin
+from veml7700event import EventMixin
+from veml7700lut import LutMixin
+from veml7700range import AutoRangeMixin
+from veml7700state import StateMixin
+
+
+class Veml7700Ex(AsyncMixin, EventMixin, AutoRangeMixin, CalibrationMixin, StateMixin, LutMixin, Veml7700):
+    """Veml7700 с чтением под asyncio, режимом событий, автоматическим выбором диапазона, калибровкой
+    периода обновления в режиме PSM, сохранением состояния и нелинейной коррекцией по таблице"""
+    pass
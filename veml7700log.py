@@ -0,0 +1,243 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Компактный двоичный журнал сырых отсчётов VEML7700 (каналы ALS и WHITE) для длительной записи во flash.
+
+Вместо ~120 байт форматированного текста на отсчёт запись занимает DELTA_SIZE (4) байта (разности с предыдущим
+отсчётом) или KEYFRAME_SIZE (9) байт (опорная запись), форматирование строк не нужно. Записи накапливаются
+в заранее созданном буфере размером со страницу flash и записываются в файл целыми страницами, что уменьшает
+износ flash и количество обращений к файловой системе.
+
+Формат файла (все числа little endian):
+    страница 0 - заголовок: MAGIC (4 байта), размер страницы (2 байта), 0xFF до конца страницы;
+    страницы 1.. - записи. Запись не пересекает границу страницы, остаток страницы заполняется 0xFF.
+Опорная запись (KEYFRAME_SIZE байт):
+    байт 0 - бит 7 равен 1, биты 2..4 - индекс времени интегрирования, биты 0..1 - индекс усиления;
+    байты 1..2 - ALS (uint16); байты 3..4 - WHITE (uint16);
+    байты 5..8 - время от первого отсчёта журнала [мс] (uint32, переполняется через ~49 суток).
+Разностная запись (DELTA_SIZE байт), с той же конфигурацией, что у предыдущей записи:
+    байты 0..1 - интервал с предыдущего отсчёта [мс], старшим байтом вперед, бит 7 байта 0 равен 0 (0..32767);
+    байт 2 - разность ALS с предыдущим отсчётом (int8); байт 3 - разность WHITE (int8).
+Опорная запись пишется в начале каждой страницы, при смене конфигурации, при разности или интервале,
+не умещающихся в разностной записи, и через keyframe_interval записей. Так как она содержит абсолютные
+значения и время, потеря или повреждение страницы не влияет на остальные.
+
+Example (MicroPython):
+    with open("light.bin", "wb") as f:
+        log = LogWriter(f)
+        while True:
+            raw, white, _ = sensor.read_als_white()
+            log.append(raw, white, time.ticks_ms(), sensor.gain[0], sensor.integration_time[0])
+            ...
+        log.close()
+
+Example (ПК):
+    for t_ms, gain_index, it_index, als, white in iter_records(open("light.bin", "rb")):
+        ...
+    data = read_arrays("light.bin", lux=True)    # NumPy, если установлен
+"""
+
+import time
+
+MAGIC = b"V7L2"
+KEYFRAME_SIZE = 9
+DELTA_SIZE = 4
+_HEADER_SIZE = 6
+_FLAG_KEY = 0x80
+_PAD = 0xFF
+_MAX_DT = 0x7FFF    # наибольший интервал разностной записи [мс]
+
+
+class LogWriter:
+    """Запись отсчётов в двоичный журнал. Память выделяется в конструкторе, append ее не выделяет:
+    все промежуточные значения, включая время (хранится двумя 16-ти битными частями), - small int."""
+
+    def __init__(self, stream, page_size: int = 512, keyframe_interval: int = 0):
+        """stream - файл, открытый для записи в двоичном режиме (или любой объект с методом write);
+        page_size - размер страницы (блока) flash, которыми данные записываются в stream;
+        keyframe_interval - наибольшее количество разностных записей между опорными (0 - без ограничения)."""
+        if page_size < 2 * KEYFRAME_SIZE or page_size > 0xFFFF:
+            raise ValueError(f"Invalid page size: {page_size}")
+        self._stream = stream
+        self._page_size = page_size
+        self._buf = bytearray(page_size)
+        self._keyframe_interval = keyframe_interval
+        self._pos = 0
+        self._key_needed = True     # следующая запись будет опорной
+        self._since_key = 0
+        self._prev_cfg = -1
+        self._prev_als = 0
+        self._prev_white = 0
+        self._prev_ticks = None
+        # время от первого отсчёта [мс] = _t_hi * 2 ** 16 + _t_lo
+        self._t_hi = 0
+        self._t_lo = 0
+        self.records = 0            # количество записей
+        self.pages = 0              # количество записанных страниц (включая заголовок)
+        # заголовок
+        buf = self._buf
+        for i in range(page_size):
+            buf[i] = _PAD
+        buf[0:4] = MAGIC
+        buf[4] = page_size & 0xFF
+        buf[5] = page_size >> 8
+        self._write_page()
+
+    def _write_page(self):
+        buf = self._buf
+        self._stream.write(buf)
+        self.pages += 1
+        for i in range(self._page_size):
+            buf[i] = _PAD
+        self._pos = 0
+        self._key_needed = True
+
+    def _put_key(self, cfg: int, als: int, white: int):
+        if self._page_size - self._pos < KEYFRAME_SIZE:
+            self._write_page()
+        buf = self._buf
+        p = self._pos
+        t_lo, t_hi = self._t_lo, self._t_hi
+        buf[p] = _FLAG_KEY | cfg
+        buf[p + 1] = als & 0xFF
+        buf[p + 2] = als >> 8
+        buf[p + 3] = white & 0xFF
+        buf[p + 4] = white >> 8
+        buf[p + 5] = t_lo & 0xFF
+        buf[p + 6] = t_lo >> 8
+        buf[p + 7] = t_hi & 0xFF
+        buf[p + 8] = t_hi >> 8
+        self._pos = p + KEYFRAME_SIZE
+        self._key_needed = False
+        self._since_key = 0
+        self.records += 1
+
+    def _put_delta(self, dt: int, da: int, dw: int):
+        buf = self._buf
+        p = self._pos
+        buf[p] = dt >> 8
+        buf[p + 1] = dt & 0xFF
+        buf[p + 2] = da & 0xFF
+        buf[p + 3] = dw & 0xFF
+        self._pos = p + DELTA_SIZE
+        self._since_key += 1
+        self.records += 1
+
+    def append(self, raw_als: int, raw_white: int, ticks_ms: int, gain_index: int, it_index: int):
+        """Добавляет отсчёт: сырые значения каналов ALS и WHITE, момент измерения (time.ticks_ms),
+        индексы усиления и времени интегрирования, при которых он получен."""
+        prev_ticks = self._prev_ticks
+        dt = 0 if prev_ticks is None else time.ticks_diff(ticks_ms, prev_ticks)
+        if dt < 0:
+            dt = 0
+        self._prev_ticks = ticks_ms
+        t_lo = self._t_lo + dt
+        self._t_hi = (self._t_hi + (t_lo >> 16)) & 0xFFFF
+        self._t_lo = t_lo & 0xFFFF
+        cfg = (it_index << 2) | gain_index
+        da = raw_als - self._prev_als
+        dw = raw_white - self._prev_white
+        self._prev_als = raw_als
+        self._prev_white = raw_white
+        if not self._key_needed and self._page_size - self._pos < DELTA_SIZE:
+            self._write_page()
+        ki = self._keyframe_interval
+        if (self._key_needed or cfg != self._prev_cfg or ki and self._since_key >= ki or dt > _MAX_DT
+                or not -0x80 <= da <= 0x7F or not -0x80 <= dw <= 0x7F):
+            self._prev_cfg = cfg
+            self._put_key(cfg, raw_als, raw_white)
+        else:
+            self._put_delta(dt, da, dw)
+
+    def flush(self):
+        """Записывает неполную страницу в stream. Следующая запись начнётся с новой страницы.
+        Вызывайте редко (например, перед сном), так как остаток страницы не используется."""
+        if self._pos:
+            self._write_page()
+        flush = getattr(self._stream, "flush", None)
+        if flush is not None:
+            flush()
+
+    def close(self):
+        """Записывает неполную страницу и закрывает stream"""
+        self.flush()
+        self._stream.close()
+
+
+def _int8(v: int) -> int:
+    return v - 0x100 if v & 0x80 else v
+
+
+def iter_records(stream):
+    """Читает журнал из stream (файл, открытый в двоичном режиме) по страницам и возвращает
+    кортежи (t_ms, gain_index, it_index, raw_als, raw_white), где t_ms - время от первого отсчёта [мс].
+    Каждая страница декодируется независимо от остальных, начиная с ее опорной записи."""
+    header = stream.read(_HEADER_SIZE)
+    if len(header) < _HEADER_SIZE or header[0:4] != MAGIC:
+        raise ValueError("Invalid log header")
+    page_size = header[4] | (header[5] << 8)
+    stream.read(page_size - _HEADER_SIZE)
+    epoch = 0       # число переполнений 32-х битного времени * 2 ** 32
+    t = None
+    while True:
+        page = stream.read(page_size)
+        if not page:
+            return
+        n = len(page)
+        p = 0
+        key = False
+        while p < n:
+            b = page[p]
+            if _PAD == b:
+                break   # конец записей страницы
+            if b & _FLAG_KEY:
+                if p + KEYFRAME_SIZE > n:
+                    break
+                cfg = b & 0x1F
+                als = page[p + 1] | (page[p + 2] << 8)
+                white = page[p + 3] | (page[p + 4] << 8)
+                t32 = page[p + 5] | (page[p + 6] << 8) | (page[p + 7] << 16) | (page[p + 8] << 24)
+                if t is not None and epoch + t32 < t - 0x80000000:
+                    epoch += 0x100000000
+                t = epoch + t32
+                key = True
+                p += KEYFRAME_SIZE
+            else:
+                if not key or p + DELTA_SIZE > n:
+                    break   # страница повреждена: разностная запись без опорной
+                t += ((b & 0x7F) << 8) | page[p + 1]
+                als = (als + _int8(page[p + 2])) & 0xFFFF
+                white = (white + _int8(page[p + 3])) & 0xFFFF
+                p += DELTA_SIZE
+            yield t, cfg & 0x03, (cfg >> 2) & 0x07, als, white
+
+
+def read_arrays(source, lux: bool = False, non_lin_corr: bool = True) -> dict:
+    """Читает весь журнал (имя файла или поток) и возвращает словарь массивов с ключами
+    't_ms', 'gain_index', 'it_index', 'als', 'white' и, при lux в Истина, 'lux'
+    (рассчитывается veml7700batch.convert для каждой конфигурации отдельно).
+    Массивы - ndarray (NumPy/ulab), если они доступны, иначе списки."""
+    from veml7700batch import np, convert
+    stream = open(source, "rb") if isinstance(source, str) else source
+    try:
+        columns = list(zip(*iter_records(stream)))
+    finally:
+        if stream is not source:
+            stream.close()
+    keys = "t_ms", "gain_index", "it_index", "als", "white"
+    if not columns:
+        columns = [() for _ in keys]
+    result = {k: list(col) for k, col in zip(keys, columns)}
+    if lux:
+        out = [0.0] * len(result["als"])
+        configs = set(zip(result["gain_index"], result["it_index"]))
+        for gi, iti in configs:
+            idx = [i for i, c in enumerate(zip(result["gain_index"], result["it_index"])) if c == (gi, iti)]
+            values = convert([result["als"][i] for i in idx], [result["white"][i] for i in idx],
+                             gain_index=gi, it_index=iti, non_lin_corr=non_lin_corr)
+            for i, v in zip(idx, values):
+                out[i] = float(v)
+        result["lux"] = out
+    if np is not None:
+        result = {k: np.array(v) for k, v in result.items()}
+    return result
@@ -0,0 +1,78 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Расширение драйвера VEML7700: нелинейная коррекция АЦП (gain 1/8, 1/4) по таблице множителя
+вместо вычисления полинома AppNote при каждом чтении. Таблица занимает ~1 КБ на разрешение.
+
+Example:
+    from veml7700vishay import Veml7700
+    from veml7700lut import LutMixin
+
+    class Sensor(LutMixin, Veml7700):
+        pass
+"""
+
+from array import array
+from micropython import const
+from veml7700vishay import _lux_mlx
+
+_RESOLUTION_BASE = 1.8432           # [лк/отсчёт] при IT=25ms, gain=×1/8
+# Таблица множителя нелинейной коррекции АЦП g(t) = f(t) / t, где f - полином из AppNote, t - освещенность [лк].
+# Строится при первом использовании для каждого разрешения (их 7: сдвиг it_index + _K_SHIFT[gain] от 0 до 6)
+# по сырым отсчётам 0, 256, 512 .. 65536: 257 значений float, ~1 КБ. Между узлами - линейная интерполяция.
+# Относительная погрешность освещенности против полинома не более 0.05 % во всём диапазоне 0..65535 отсчётов.
+# Память: модуль хранит не более _LUT_SLOTS таблиц, но каждый датчик держит ссылку на таблицу своего разрешения,
+# поэтому таблица, вытесненная из хранилища, остается в памяти, пока ее использует датчик (до _LUT_SLOTS таблиц
+# плюс по одной на датчик). Таблица строится при первом чтении после смены разрешения (в том числе при переключениях
+# auto_range и AdaptiveSampler), то есть в пути чтения: 257 вычислений полинома, однократно для каждого разрешения,
+# пока таблица не вытеснена.
+_LUT_SHIFT = const(8)               # log2 шага таблицы в отсчётах
+_LUT_MASK = const(0xFF)             # (1 << _LUT_SHIFT) - 1
+_LUT_SLOTS = const(2)               # наибольшее количество таблиц в хранилище модуля
+_lut_cache = []    # [(сдвиг разрешения, array('f')), ...], не более _LUT_SLOTS таблиц, общие для всех датчиков
+
+
+def _get_lut(res_shift: int) -> array:
+    """Возвращает таблицу множителя нелинейной коррекции для разрешения _RESOLUTION_BASE / 2 ** res_shift.
+    Таблица строится при первом обращении. Если таблиц больше _LUT_SLOTS, из хранилища удаляется самая старая
+    (память освобождается, когда ее перестанут использовать и датчики)."""
+    for key, tbl in _lut_cache:
+        if key == res_shift:
+            return tbl
+    res = _RESOLUTION_BASE / (1 << res_shift)
+    step = 1 << _LUT_SHIFT
+    tbl = array('f', (0.0 for _ in range((0x10000 >> _LUT_SHIFT) + 1)))
+    for i in range(len(tbl)):
+        t = i * step * res
+        tbl[i] = ((6.0135E-13 * t - 9.3924E-09) * t + 8.1488E-05) * t + 1.0023
+    if len(_lut_cache) >= _LUT_SLOTS:
+        _lut_cache.pop(0)
+    _lut_cache.append((res_shift, tbl))
+    return tbl
+
+
+class LutMixin:
+    """Примесь к Veml7700: освещенность (float) с нелинейной коррекцией по таблице _get_lut.
+    Относительная разница с полиномом (Veml7700, veml7700batch) не более 0.05 %."""
+    _lut = None             # таблица нелинейной коррекции для разрешения _lut_shift или None
+    _lut_shift = -1
+
+    def _lux(self, raw_lux: int, ir_corr: bool) -> int | float:
+        """Преобразует сырое значение ALS в освещенность, как Veml7700._lux, но по таблице множителя"""
+        ir_corr = ir_corr and self._en_non_lin_corr and 0 < raw_lux
+        if self._int_math:
+            return _lux_mlx(raw_lux, self._res_dmlx, self._adc_corr, ir_corr)
+        #
+        _t = raw_lux * self._resolution
+        if self._adc_corr and _t > 100:
+            lut = self._lut
+            if self._lut_shift != self._res_shift:
+                # разрешение изменилось (write_config, read_config)
+                lut = self._lut = _get_lut(self._res_shift)
+                self._lut_shift = self._res_shift
+            i = raw_lux >> _LUT_SHIFT
+            g = lut[i]
+            _t *= g + (lut[i + 1] - g) * (raw_lux & _LUT_MASK) / (_LUT_MASK + 1)
+        if ir_corr:
+            _t *= 0.95
+        return _t
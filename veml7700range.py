@@ -0,0 +1,111 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Расширение драйвера VEML7700: автоматический выбор усиления и времени интегрирования по блок-схеме AppNote.
+
+Example:
+    from veml7700vishay import Veml7700
+    from veml7700range import AutoRangeMixin
+
+    class Sensor(AutoRangeMixin, Veml7700):
+        pass
+
+    lux, raw, conversions, elapsed_ms = Sensor(adapter).auto_range()
+"""
+
+import time
+from micropython import const
+from veml7700vishay import Veml7700
+
+# Границы допустимого сырого значения ALS при автоматическом выборе диапазона (по AppNote):
+# не более 100 отсчётов - мало, нужно повысить чувствительность;
+# более 10000 отсчётов - много, нужно понизить чувствительность (меньше влияние нелинейности АЦП).
+_AUTO_RANGE_LOW = const(100)
+_AUTO_RANGE_HIGH = const(10_000)
+# ступени автоматического выбора диапазона (gain_index, it_index) в порядке возрастания чувствительности,
+# как в блок-схеме AppNote: gain 1/8 с IT 25..100 мс, затем рост усиления при IT 100 мс, затем рост IT.
+# Разрешение соседних ступеней отличается в 2 или 4 раза (смотри _K_SHIFT).
+_AUTO_RANGE_STEPS = (2, 0), (2, 1), (2, 2), (3, 2), (0, 2), (1, 2), (1, 3), (1, 4), (1, 5)
+
+
+class AutoRangeMixin:
+    """Примесь к Veml7700: auto_range"""
+
+    def auto_range(self, max_conversions: int = 6, wait_first: bool = True) -> tuple:
+        """Автоматически подбирает усиление и время интегрирования так, чтобы сырое значение ALS
+        оказалось в диапазоне (_AUTO_RANGE_LOW.._AUTO_RANGE_HIGH], и возвращает измерение.
+
+        По сырому значению и текущему разрешению оценивается освещенность и сразу выбирается ступень
+        _AUTO_RANGE_STEPS с наибольшей чувствительностью, при которой отсчёт не превысит _AUTO_RANGE_HIGH.
+        Только при насыщении (65535) или нуле оценка невозможна, тогда выбирается крайняя ступень.
+        Поэтому от темноты до прямого солнца обычно хватает одного переключения.
+        Первое измерение после каждого переключения отбрасывается (неполный период интегрирования).
+
+        max_conversions - наибольшее количество ожидаемых периодов преобразования;
+        wait_first - ждать период преобразования перед первым чтением. Ложь - если датчик уже
+        проработал с текущими настройками не менее одного периода.
+
+        Возвращает кортеж (lux, raw, conversions, elapsed_ms), где conversions - количество
+        ожидавшихся периодов преобразования (включая отброшенные), elapsed_ms - затраченное время.
+
+        Example:
+            >>> lux, raw, n, ms = sensor.auto_range()
+        """
+        steps = _AUTO_RANGE_STEPS
+        k_shift = Veml7700._K_SHIFT
+        last = len(steps) - 1
+        t_start = time.ticks_ms()
+        if self._als_shutdown:
+            self.start_measurement()
+            wait_first = True
+        conversions = 0
+        try:
+            step = steps.index((self._als_gain_index, self._als_it_index))
+        except ValueError:
+            # текущих настроек нет среди ступеней. Начинаю с gain 1/8, IT 100 мс, как в AppNote
+            step = 2
+            self._auto_range_switch(step)
+            conversions += 1
+            wait_first = True
+        while True:
+            if wait_first:
+                time.sleep_ms(self.get_conversion_cycle_time())
+                conversions += 1
+            wait_first = True
+            lux = self.get_measurement_value(0)
+            raw = self._last_raw_ill
+            if conversions >= max_conversions:
+                break
+            if _AUTO_RANGE_LOW < raw <= _AUTO_RANGE_HIGH:
+                break
+            if raw > _AUTO_RANGE_HIGH and 0 == step or raw <= _AUTO_RANGE_LOW and last == step:
+                break   # предел диапазона датчика
+            if raw >= 0xFFFF:
+                new_step = 0
+            elif 0 == raw:
+                new_step = last
+            else:
+                # ожидаемый отсчёт на ступени j: raw * 2 ** (shift(j) - shift(step)), shift = it_index + _K_SHIFT
+                g, it = steps[step]
+                cur_shift = it + k_shift[g]
+                new_step = 0
+                for j in range(last, -1, -1):
+                    g, it = steps[j]
+                    if raw << (it + k_shift[g]) >> cur_shift <= _AUTO_RANGE_HIGH:
+                        new_step = j
+                        break
+            if new_step == step:
+                break
+            step = new_step
+            self._auto_range_switch(step)
+            conversions += 1
+        return lux, raw, conversions, time.ticks_diff(time.ticks_ms(), t_start)
+
+    def _auto_range_switch(self, step: int):
+        """Устанавливает ступень step из _AUTO_RANGE_STEPS, сохраняя остальные параметры конфигурации.
+        Ждёт стабилизации датчика после выхода из режима ожидания и первый период преобразования,
+        измерение которого отбрасывается (неполный период интегрирования)."""
+        gain_index, it_index = _AUTO_RANGE_STEPS[step]
+        self.write_config(gain_index=gain_index, it_index=it_index, shutdown=False)
+        time.sleep_ms(3)    # >= 2.5 мс после выхода из режима ожидания
+        time.sleep_ms(self.get_conversion_cycle_time())
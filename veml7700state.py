@@ -0,0 +1,110 @@
+# micropython
+# MIT license
+# Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
+"""Расширение драйвера VEML7700: быстрый старт после глубокого сна. Состояние драйвера (7 байт) сохраняется
+перед сном в памяти RTC, после пробуждения первое измерение выполняется без чтения и записи конфигурации.
+
+Example:
+    from veml7700vishay import Veml7700
+    from veml7700state import StateMixin
+
+    class Sensor(StateMixin, Veml7700):
+        pass
+"""
+
+import time
+from micropython import const
+from veml7700vishay import Veml7700
+
+# состояние драйвера (export_state/restore_state): байты 0..1 - CFG, байт 2 - флаги, байты 3..6 - пороги high, low
+_STATE_SIZE = const(7)
+_STATE_MARK = const(0x80)           # признак правильного состояния (нулевая память RTC не примется за состояние)
+_STATE_THRESHOLDS = const(0x40)     # пороги известны
+_STATE_SKIP_STALE = const(0x20)
+_STATE_INT_MATH = const(0x10)
+_STATE_NON_LIN = const(0x08)        # биты 0..2 - значение регистра PSM
+
+
+class StateMixin:
+    """Примесь к Veml7700: export_state, restore_state"""
+
+    def export_state(self) -> bytes:
+        """Возвращает программное состояние драйвера в виде _STATE_SIZE байт: регистр CFG (усиление,
+        время интегрирования, persistence, int_en, shutdown), регистр PSM, признаки нелинейной коррекции,
+        целочисленного режима и чтения без обмена по шине, пороги прерывания (если они известны).
+        Сохраните его перед глубоким сном (в памяти RTC или файле) и передайте в restore_state после пробуждения.
+        Обмен по шине не выполняется, если теневые копии регистров известны.
+        Режим событий (arm_window) и таблица refresh_table не сохраняются.
+
+        Example:
+            >>> machine.RTC().memory(sensor.export_state())
+            >>> machine.deepsleep(60_000)
+        """
+        shadow = self._shadow
+        cfg = shadow[self.ADDR_CFG_REG]
+        if cfg is None:
+            cfg = Veml7700._make_cfg(self._als_gain_index, Veml7700._it_index_to_raw_it(self._als_it_index),
+                                     self._als_pers, self._als_int_en, self._als_shutdown)
+        flags = _STATE_MARK | int(self._enable_psm) | (self._psm << 1)
+        if self._en_non_lin_corr:
+            flags |= _STATE_NON_LIN
+        if self._int_math:
+            flags |= _STATE_INT_MATH
+        if self._skip_stale:
+            flags |= _STATE_SKIP_STALE
+        high, low = shadow[self.ADDR_HIGH_THRESHOLD_REG], shadow[self.ADDR_LOW_THRESHOLD_REG]
+        if high is None or low is None:
+            high = low = 0
+        else:
+            flags |= _STATE_THRESHOLDS
+        return bytes((cfg & 0xFF, cfg >> 8, flags, high & 0xFF, high >> 8, low & 0xFF, low >> 8))
+
+    def restore_state(self, state: bytes | bytearray | memoryview, verify: bool = False) -> bool:
+        """Восстанавливает программное состояние драйвера, сохраненное export_state, без обмена по шине.
+        Содержимое регистров датчика считается совпадающим с состоянием (датчик не терял питание),
+        теневые копии регистров заполняются, поэтому первое измерение выполняется сразу, одной транзакцией
+        (двумя - с каналом белого), без read_config/write_config/set_power_save_mode.
+        Если датчик не в shutdown, он продолжал измерять во время сна и отсчёт считается готовым.
+
+        verify - проверить регистр CFG одним чтением. Если он отличается (датчик терял питание),
+        все регистры записываются заново по состоянию.
+        Возвращает Истина, если регистры датчика совпадали с состоянием (или не проверялись).
+
+        Example:
+            >>> sensor = Veml7700(adapter)
+            >>> sensor.restore_state(machine.RTC().memory())
+            >>> lux = sensor.get_measurement_value(0)
+        """
+        if len(state) < _STATE_SIZE or not state[2] & _STATE_MARK:
+            raise ValueError("Invalid driver state")
+        cfg = state[0] | (state[1] << 8)
+        flags = state[2]
+        psm_reg = flags & 0x07
+        self._en_non_lin_corr = bool(flags & _STATE_NON_LIN)
+        self._int_math = bool(flags & _STATE_INT_MATH)
+        self._skip_stale = bool(flags & _STATE_SKIP_STALE)
+        self._enable_psm = bool(psm_reg & 0x01)
+        self._psm = psm_reg >> 1
+        self._apply_cfg(cfg)
+        shadow = self._shadow
+        shadow[self.ADDR_CFG_REG] = cfg
+        shadow[self.ADDR_PWR_MODE_REG] = psm_reg
+        if flags & _STATE_THRESHOLDS:
+            shadow[self.ADDR_HIGH_THRESHOLD_REG] = state[3] | (state[4] << 8)
+            shadow[self.ADDR_LOW_THRESHOLD_REG] = state[5] | (state[6] << 8)
+        else:
+            shadow[self.ADDR_HIGH_THRESHOLD_REG] = shadow[self.ADDR_LOW_THRESHOLD_REG] = None
+        self._last_raw_ill = self._last_raw_white = None
+        self._pair_valid = False
+        self._t_next = time.ticks_ms()
+        if not verify or cfg == self._set_reg(addr=self.ADDR_CFG_REG):
+            return True
+        # датчик терял питание: записываю все известные регистры
+        self._set_reg(addr=self.ADDR_CFG_REG, value=cfg | 0x01)
+        for addr in (self.ADDR_HIGH_THRESHOLD_REG, self.ADDR_LOW_THRESHOLD_REG, self.ADDR_PWR_MODE_REG):
+            if shadow[addr] is not None:
+                self._set_reg(addr=addr, value=shadow[addr])
+        self._set_reg(addr=self.ADDR_CFG_REG, value=cfg)
+        if not self._als_shutdown:
+            self._restart_period(3)
+        return False
@@ -3,22 +3,73 @@
 # Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
 
 import micropython
+import time
 from micropython import const
 # from collections import namedtuple
 from sensor_pack_2 import bus_service
 from sensor_pack_2.base_sensor import Iterator, IBaseSensorEx, DeviceEx, check_value
 
-FMT_UINT16_LE = "H" # для правильной распаковки сырого значения в unsigned int 16 bit
 # Базовая конфигурация для расчёта макс. освещённости (по таблице из AppNote)
 _MAX_ILL_BASE = const(120796)   # лк при IT=25ms, gain=×1/8
 _GAIN_BASE = const(0.125)        # базовый gain (×1/8)
 # Базовое разрешение (наихудший случай): IT=25ms, gain=×1/8 (по таблице из AppNote)
 _RESOLUTION_BASE = const(1.8432)  # [lx/ct]
+# То же базовое разрешение в десятых долях миллилюкса на отсчёт. 18432 = 9 * 2 ** 11, поэтому
+# деление на 2 ** it_index и на gain / gain_base (степени двойки) всегда выполняется нацело!
+_RESOLUTION_BASE_DMLX = const(18432)  # [0.1 mlx/ct]
+# Нелинейная коррекция в целых числах (схема Горнера), x - освещенность в [млк]:
+#   P(x) = x * (a1 + X * (a2 + X * (a3 + X * a4))), где X = x >> _NL_XS.
+# Коэффициенты заранее масштабированы, промежуточные значения умещаются в small int MicroPython (30 бит)
+# вплоть до ~34000 лк на входе коррекции (выше - корректно, но с выделением памяти под long int).
+# Погрешность относительно float-расчёта: не более 0.04 % или 1 млк.
+_NL_THRESHOLD_MLX = const(100_000)  # коррекция применяется выше 100 лк
+_NL_XS = const(10)
+_NL_S = const(13)
+_NL_Q = const(13)
+_NL_MASK = const(0x1FFF)            # (1 << _NL_Q) - 1
+_NL_A4 = const(2908)                # 6.0135E-13 * 2 ** (3 * _NL_XS) / 1E9 * 2 ** (_NL_Q + 3 * _NL_S)
+_NL_A3 = const(-5414)               # -9.3924E-09 * 2 ** (2 * _NL_XS) / 1E6 * 2 ** (_NL_Q + 2 * _NL_S)
+_NL_A2 = const(5600)                # 8.1488E-05 * 2 ** _NL_XS / 1E3 * 2 ** (_NL_Q + _NL_S)
+_NL_A1 = const(8211)                # 1.0023 * 2 ** _NL_Q
+
+
+@micropython.native
+def _lux_mlx(raw: int, res_dmlx: int, adc_corr: bool, ir_corr: bool) -> int:
+    """Целочисленный расчёт освещенности в миллилюксах, без использования float.
+    raw - сырое значение канала ALS (0..65535);
+    res_dmlx - разрешение в [0.1 млк/отсчёт];
+    adc_corr - применять нелинейную коррекцию АЦП;
+    ir_corr - применять ИК-компенсацию (WHITE/ALS > 2)."""
+    # raw * res_dmlx / 10 без выхода за пределы small int
+    x = raw * (res_dmlx // 10) + raw * (res_dmlx % 10) // 10
+    if adc_corr and x > _NL_THRESHOLD_MLX:
+        X = x >> _NL_XS
+        h = (_NL_A4 * X >> _NL_S) + _NL_A3
+        h = (h * X >> _NL_S) + _NL_A2
+        h = (h * X >> _NL_S) + _NL_A1
+        # x * h >> _NL_Q, по частям, чтобы не переполнить small int
+        x = (x >> _NL_Q) * h + ((x & _NL_MASK) * h >> _NL_Q)
+    if ir_corr:
+        x -= x // 20    # x * 0.95
+    return x
+
 
 class Veml7700(IBaseSensorEx, Iterator):
     """Class for work with ambient Light Sensor VEML7700.
-    Please read: https://www.vishay.com/docs/84286/veml7700.pdf"""
+    Please read: https://www.vishay.com/docs/84286/veml7700.pdf
+
+    Редко используемые возможности вынесены в отдельные модули-расширения (классы-примеси), чтобы не загружать
+    их в проектах, которым они не нужны:
+        veml7700async.AsyncMixin - чтение под asyncio (read_async, async for, start_sampling);
+        veml7700event.EventMixin - режим событий по окну порогов (arm_window, poll_event, attach_irq);
+        veml7700range.AutoRangeMixin - автоматический выбор усиления и времени интегрирования (auto_range);
+        veml7700calib.CalibrationMixin - калибровка периода обновления в режиме PSM (calibrate_refresh_time);
+        veml7700state.StateMixin - сохранение состояния на время глубокого сна (export_state, restore_state);
+        veml7700lut.LutMixin - нелинейная коррекция АЦП по таблице вместо полинома.
+    Примеси указываются перед Veml7700: class Sensor(AutoRangeMixin, EventMixin, Veml7700): pass.
+    Все возможности сразу - veml7700ext.Veml7700Ex."""
     _IT = 12, 8, 0, 1, 2, 3     # integration time const
+    _K_SHIFT = 3, 4, 0, 1       # log2(gain / gain_base) для каждого индекса усиления
     ADDR_CFG_REG = const(0x00)
     #
     ADDR_HIGH_THRESHOLD_REG = const(0x01)
@@ -94,35 +145,132 @@ class Veml7700(IBaseSensorEx, Iterator):
     def __init__(self, adapter: bus_service.I2cAdapter, address: int = 0x10):
         """  """
         self._connection = DeviceEx(adapter=adapter, address=address, big_byte_order=False)
-        self._buf_2 = bytearray(2)  # для _read_from_into
+        # буфер для чтения пары каналов ALS (байты 0..1) и WHITE (байты 2..3) и заранее созданные срезы,
+        # чтобы не выделять память под memoryview при каждом чтении
+        self._buf_4 = bytearray(4)
+        self._mv_als = memoryview(self._buf_4)[0:2]
+        self._mv_white = memoryview(self._buf_4)[2:4]
         #
         self._last_raw_ill =None    # хранит последнее, считанное из датчика, сырое значение освещенности
+        self._last_raw_white = None  # хранит последнее, считанное из датчика, сырое значение канала белого
         self._als_gain_index = 0           # gain
         self._als_it_index = 0       # integration time
-        self._als_pers = 0           # persistence protect number setting
+        # persistence protect number setting. До первого чтения или записи CFG - значение по умолчанию write_config
+        self._als_pers = 1
         self._als_int_en = False     # interrupt enable setting
         self._als_shutdown = False   # ALS shut down setting
         self._enable_psm = False     # Enable power save mode for sensor
         self._psm = 0                # power save mode for sensor 0..3
         # включить нелинейное исправление значения освещенности (True) или выключить (False)
         self._en_non_lin_corr = True
-
-    def _set_reg(self, addr: int, format_value: str | None, value: int | None = None) -> int:
+        # контекст преобразования сырых данных в люксы. Вычисляется один раз при изменении настроек,
+        # чтобы в get_measurement_value не было проверок индексов и возведения в степень.
+        self._resolution = 0.0      # разрешение [лк/отсчёт]
+        self._max_ill = 0.0         # максимально возможная освещенность [лк]
+        self._gain = 0.0            # коэффициент усиления
+        self._it_ms = 0             # время интегрирования [мс]
+        self._adc_corr = False      # нужна ли нелинейная коррекция АЦП (gain 1/8, 1/4 и _en_non_lin_corr)
+        self._res_dmlx = 0          # разрешение [0.1 млк/отсчёт] для целочисленного режима
+        self._res_shift = 0         # log2(_RESOLUTION_BASE / разрешение)
+        # целочисленный режим: get_measurement_value(0) возвращает int в миллилюксах (для MCU без FPU)
+        self._int_math = False
+        # теневые копии записываемых регистров 0x00..0x03 (CFG, пороги, PSM).
+        # None - содержимое регистра неизвестно и при необходимости будет считано из датчика.
+        self._shadow = [None, None, None, None]
+        # момент (time.ticks_ms), когда завершится очередной период интегрирования и в регистре ALS
+        # появится новое значение. До этого момента повторное чтение по шине вернёт то же значение.
+        self._t_next = time.ticks_ms()
+        self._pair_valid = False    # последний отсчёт содержит оба канала (ALS и WHITE)
+        # возвращать последний считанный отсчёт без обмена по шине, пока новый не готов
+        self._skip_stale = True
+        # измеренные периоды обновления данных [мс] в режиме экономии энергии, для каждой пары (it_index, psm),
+        # индекс: it_index * 4 + psm, 0 - не измерен. None - таблицы нет (смотри veml7700calib.CalibrationMixin)
+        self._refresh_table = None
+        # политика чтения канала белого (смотри set_white_policy) и запомненные по последнему его чтению
+        # признак ИК-коррекции, отношение WHITE/ALS (* 256), значение ALS, количество отсчётов после него и момент.
+        # _wh_t равно None, пока канал белого не считывался.
+        self._wh_every = 1
+        self._wh_rel = None
+        self._wh_period = None
+        self._wh_ir = False
+        self._wh_ratio_q8 = 0
+        self._wh_als = 0
+        self._wh_count = 0
+        self._wh_t = None
+        # время в активном режиме и в shutdown [мс] (смотри power_stats) и момент последнего учета
+        self._active_ms = 0
+        self._shutdown_ms = 0
+        self._t_power = time.ticks_ms()
+        self._update_conversion_ctx()
+
+    def _update_conversion_ctx(self):
+        """Пересчитывает контекст преобразования по текущим _als_gain_index и _als_it_index.
+        Вызывается после каждого изменения настроек датчика (write_config, read_config)."""
+        gi, iti = self._als_gain_index, self._als_it_index
+        self._resolution = Veml7700._get_resolution(gi, iti)
+        self._max_ill = Veml7700.get_max_possible_illumination(gi, iti)
+        self._gain = Veml7700._raw_gain_to_gain(gi)
+        self._it_ms = Veml7700._get_integration_time(iti)
+        self._adc_corr = self._en_non_lin_corr and gi in (2, 3)
+        self._res_shift = iti + Veml7700._K_SHIFT[gi]
+        self._res_dmlx = _RESOLUTION_BASE_DMLX >> self._res_shift
+
+    def _set_reg(self, addr: int, value: int | None = None) -> int:
         """Возвращает (при value is None)/устанавливает (при not value is None) содержимое регистра с адресом addr.
-        разрядность регистра 16 бит!"""
-        buf = self._buf_2
-        _conn = self._connection
+        разрядность регистра 16 бит! Чтение и запись выполняются без выделения памяти (DeviceEx.read_reg_16)."""
         if value is None:
-            # читаю из Register устройства в буфер два байта
-            if format_value is None:
-                raise ValueError("При чтении из регистра не задан формат его значения!")
-            _conn.read_buf_from_mem(address=addr, buf=buf, address_size=1)
-            return _conn.unpack(fmt_char=format_value, source=buf)[0]
+            return self._connection.read_reg_16(addr)
         #
-        return self._connection.write_reg(reg_addr=addr, value=value, bytes_count=len(buf))
+        return self._connection.write_reg_16(addr, value)
+
+    def _read_shadowed(self, addr: int) -> int:
+        """Возвращает содержимое записываемого регистра addr (0x00..0x03) из его теневой копии.
+        Если копия неизвестна, то регистр считывается из датчика."""
+        val = self._shadow[addr]
+        if val is None:
+            try:
+                val = self._set_reg(addr=addr)
+            except OSError:
+                self.invalidate_shadow()
+                raise
+            self._shadow[addr] = val
+        return val
+
+    def _write_shadowed(self, addr: int, value: int) -> bool:
+        """Записывает value в записываемый регистр addr (0x00..0x03), только если оно отличается от теневой копии.
+        Возвращает Истина, если запись по шине была выполнена.
+        При ошибке шины все теневые копии сбрасываются, так как содержимое регистров становится неизвестным."""
+        shadow = self._shadow
+        if shadow[addr] == value:
+            return False
+        try:
+            self._set_reg(addr=addr, value=value)
+        except OSError:
+            self.invalidate_shadow()
+            raise
+        shadow[addr] = value
+        return True
+
+    def invalidate_shadow(self):
+        """Сбрасывает теневые копии регистров. Следующее обращение к ним будет выполнено по шине.
+        Вызывайте после сброса питания датчика или записи в его регистры в обход драйвера!"""
+        shadow = self._shadow
+        for i in range(len(shadow)):
+            shadow[i] = None
 
-    def write_config(self, gain_index: int, it_index: int, persistence: int = 1,
-                       int_en: bool = False, shutdown: bool = False):
+    @staticmethod
+    def _make_cfg(gain_index: int, raw_it: int, pers: int, int_en: bool, shutdown: bool) -> int:
+        """Возвращает значение регистра CFG по значениям его битовых полей"""
+        _cfg = 0
+        _cfg |= int(shutdown)
+        _cfg |= int(int_en) << 1
+        _cfg |= pers << 4
+        _cfg |= raw_it << 6
+        _cfg |= gain_index << 11
+        return _cfg
+
+    def write_config(self, gain_index: int, it_index: int, persistence: int | None = None,
+                       int_en: bool | None = None, shutdown: bool = False):
         """Установка параметров Датчика Внешней Освещенности (ДВО - ALS).
         Setting Ambient Light Sensor (ALS) parameters.
         gain_index = 0..3; 0-gain=1, 1-gain=2, 2-gain=0.125(1/8), 3-gain=0.25(1/4).
@@ -130,44 +278,61 @@ class Veml7700(IBaseSensorEx, Iterator):
         int_en - разрешение прерываний.
         shutdown - выключить (Истина) или включить (Ложь) датчик
         persistence protect number = 0..3; 0-1, 1-2, 2-4, 3-8. Это фильтр количества срабатываний!
+        persistence, int_en в None (по умолчанию) - оставить текущее значение, поэтому смена усиления или времени
+        интегрирования не выключает прерывания режима событий (veml7700event). До первого чтения или записи
+        регистра CFG текущие значения: persistence 1, int_en Ложь.
+        Если новое значение регистра совпадает с его теневой копией, то обмен по шине не выполняется.
         """
         addr = self.ADDR_CFG_REG
-        # перед любой перенастройкой, документация требует перевода датчика в режим ожидания
-        _cfg = self._set_reg(addr=addr, format_value=FMT_UINT16_LE) # читаю
-        self._set_reg(addr=addr, format_value=None, value=_cfg | 0x01)
-
+        if persistence is None:
+            persistence = self._als_pers
+        if int_en is None:
+            int_en = self._als_int_en
         gain = check_value(gain_index, range(4), f"Invalid als gain value: {gain_index}")
         _tmp = check_value(it_index, range(6), f"Invalid als integration_time: {it_index}")
         it = Veml7700._it_index_to_raw_it(_tmp)    # integration_time
 
         pers = check_value(persistence, range(4), f"Invalid als persistence protect number: {persistence}")
-        ie = 0
-        if int_en:
-            ie = 1
-        sd = 0
-        if shutdown:
-            sd = 1
-        #
-        _cfg = 0
-        _cfg |= sd
-        _cfg |= ie << 1
-        _cfg |= pers << 4
-        _cfg |= it << 6
-        _cfg |= gain << 11
-
-        self._set_reg(addr=addr, format_value=None, value=_cfg)
+        _cfg = Veml7700._make_cfg(gain, it, pers, int_en, shutdown)
+
+        old = self._read_shadowed(addr)
+        if old != _cfg:
+            # перед любой перенастройкой, документация требует перевода датчика в режим ожидания.
+            # если датчик уже в режиме ожидания, то запись будет пропущена
+            self._write_shadowed(addr, old | 0x01)
+            self._write_shadowed(addr, _cfg)
+            config_changed = True
+        else:
+            config_changed = False
 
         # save
         self._als_gain_index = gain
         self._als_it_index = it_index
         self._als_pers = pers
         self._als_int_en = int_en
-        self._als_shutdown = shutdown
+        self._track_power(shutdown)
+        old_res = self._resolution
+        self._update_conversion_ctx()
+        if config_changed:
+            # после выхода из режима ожидания (>= 2.5 мс) начинается новый период интегрирования
+            self._restart_period(3)
+        if old_res != self._resolution:
+            self._on_resolution_change()
+
+    def _on_resolution_change(self):
+        """Вызывается write_config после изменения разрешения (усиления или времени интегрирования).
+        Переопределяется расширениями, хранящими значения в отсчётах (смотри veml7700event.EventMixin)."""
+        pass
 
     def read_config(self) -> None:
-        """read ALS config from register (2 byte)"""
-        cfg = self._set_reg(addr=self.ADDR_CFG_REG, format_value=FMT_UINT16_LE)  # читаю
-        #
+        """read ALS config from register (2 byte).
+        Теневые копии регистров сбрасываются, копия CFG обновляется считанным значением."""
+        self.invalidate_shadow()
+        cfg = self._read_shadowed(self.ADDR_CFG_REG)  # читаю
+        self._apply_cfg(cfg)
+
+    def _apply_cfg(self, cfg: int):
+        """Устанавливает программные настройки датчика по значению регистра CFG"""
         tmp = (cfg & 0b0001_1000_0000_0000) >> 11  # gain
         self._als_gain_index = tmp
 
@@ -178,7 +343,33 @@ class Veml7700(IBaseSensorEx, Iterator):
         self._als_pers = tmp     # 2 ** tmp
         #
         self._als_int_en = bool(cfg & 0b0000_0000_0000_0010)
-        self._als_shutdown = bool(cfg & 0b0000_0000_0000_0001)
+        self._track_power(bool(cfg & 0b0000_0000_0000_0001))
+        self._update_conversion_ctx()
+
+    def _track_power(self, shutdown: bool):
+        """Учитывает время, проведенное датчиком в активном режиме и в shutdown, и устанавливает
+        новое состояние shutdown"""
+        now = time.ticks_ms()
+        dt = time.ticks_diff(now, self._t_power)
+        self._t_power = now
+        if self._als_shutdown:
+            self._shutdown_ms += dt
+        else:
+            self._active_ms += dt
+        self._als_shutdown = shutdown
+
+    @property
+    def power_stats(self) -> tuple[int, int]:
+        """Возвращает кортеж (active_ms, shutdown_ms) - время в мс, проведенное датчиком в активном режиме
+        (измерения, основное потребление) и в shutdown, с момента создания драйвера или reset_power_stats.
+        Время учитывается по командам драйвера."""
+        self._track_power(self._als_shutdown)
+        return self._active_ms, self._shutdown_ms
+
+    def reset_power_stats(self):
+        """Обнуляет счетчики времени power_stats"""
+        self._t_power = time.ticks_ms()
+        self._active_ms = self._shutdown_ms = 0
 
     def set_power_save_mode(self, enable_psm: bool, psm: int) -> None:
         """Set power save mode for sensor.
@@ -189,14 +380,16 @@ class Veml7700(IBaseSensorEx, Iterator):
         reg_val = 0
         reg_val |= int(enable_psm)
         reg_val |= psm << 1
-        self._set_reg(addr=self.ADDR_PWR_MODE_REG, format_value=None, value=reg_val)
+        changed = self._write_shadowed(self.ADDR_PWR_MODE_REG, reg_val)
         self._enable_psm = enable_psm
         self._psm = psm
+        if changed:
+            self._restart_period(0)
 
     def get_interrupt_status(self) -> tuple:
         """Return interrupt flags while trigger occurred due to data crossing low/high threshold windows.
         tuple (low_threshold, high_threshold)."""
-        irq_status = self._set_reg(addr=self.ADDR_STATUS_REG, format_value=FMT_UINT16_LE)  # читаю
+        irq_status = self._set_reg(addr=self.ADDR_STATUS_REG)  # читаю
         # Bit 15 defines interrupt flag while trigger occurred due to data crossing low threshold windows.
         int_th_low = bool(irq_status & 0b1000_0000_0000_0000)
         # Bit 14 defines interrupt flag while trigger occurred due to data crossing high threshold windows.
@@ -211,9 +404,11 @@ class Veml7700(IBaseSensorEx, Iterator):
                     _en_non_lin_corr применяются две коррекции (согласно Vishay AppNote):
                       1. Нелинейность АЦП: полином 4-й степени для gain 1/8 или 1/4
                          при освещённости > 100 лк.
-                      2. ИК-компенсация: автоматически считывается канал белого.
-                    • Разрешение расчёта автоматически берётся из текущих настроек
-                      _als_gain_index и _als_it_index.
+                      2. ИК-компенсация: канал белого считывается сразу вслед за ALS.
+                    • Разрешение расчёта берётся из контекста преобразования, который
+                      вычисляется при изменении настроек (write_config, read_config).
+                    • При use_integer_math в Истина возвращается int в миллилюксах,
+                      рассчитанный без float (смотри _lux_mlx).
 
                 Example:
                     >>> sensor.write_config(gain_index=2, it_index=2)
@@ -222,42 +417,216 @@ class Veml7700(IBaseSensorEx, Iterator):
                     >>> lux = sensor.get_measurement_value()          # или value_index=0
                     >>> raw_als = sensor.get_measurement_value(1)
                     >>> raw_white = sensor.get_measurement_value(2)
+
+                Пока новый период интегрирования не завершен (get_data_status() возвращает Ложь), значение
+                берётся из последнего считанного отсчёта, без обмена по шине (смотри skip_stale_reads).
                 """
-        raw_lux = self._set_reg(addr=self.ADDR_RAW_LUX_REG, format_value=FMT_UINT16_LE)  # читаю
+        if self._skip_stale and not self.get_data_status():
+            # значение в регистре датчика еще не обновилось
+            val = self._get_cached(value_index)
+            if val is not None:
+                return val
+        return self._read_sample(value_index)
+
+    def _read_sample(self, value_index: int | None) -> int | float:
+        """Считывает из датчика каналы, необходимые для значения value_index, и возвращает его
+        (смотри get_measurement_value)"""
+        if 2 == value_index:
+            self._read_als_white()
+            return self._last_raw_white
+        if self._en_non_lin_corr and 1 != value_index:
+            # канал белого нужен для ИК-коррекции, он считывается согласно set_white_policy
+            self._read_als_decimated()
+            return self._lux(self._last_raw_ill, self._wh_ir)
+        self._read_data(self.ADDR_RAW_LUX_REG, self._mv_als)
+        buf = self._buf_4
+        raw_lux = buf[0] | (buf[1] << 8)
         self._last_raw_ill = raw_lux
+        self._pair_valid = False
+        self._mark_read()
+        if 1 == value_index:
+            return raw_lux
+        return self._lux(raw_lux, False)
+
+    def _get_cached(self, value_index: int | None) -> int | float | None:
+        """Возвращает значение по индексу value_index из последнего считанного отсчёта
+        или None, если нужного канала в нём нет."""
+        raw_lux = self._last_raw_ill
+        if raw_lux is None:
+            return None
         if 1 == value_index:
             return raw_lux
         if 2 == value_index:
-            return self._get_white_channel()
-        #
-        _t = raw_lux * Veml7700._get_resolution(self._als_gain_index, self._als_it_index)
-        # блок расширенной коррекции
+            return self._last_raw_white if self._pair_valid else None
         if self._en_non_lin_corr:
-            # 1. Нелинейная коррекция АЦП (только gain 1/8, 1/4 и >100 лк)
-            if self._als_gain_index in (2, 3) and _t > 100:
-                _t = 6.0135E-13 * _t ** 4 - 9.3924E-09 * _t ** 3 + 8.1488E-05 * _t ** 2 + 1.0023 * _t
-
-            # 2. ИК-коррекция по белому каналу (WHITE/ALS > 2, источник галоген/солнце)
-            # Оптимизация для MCU: white > 2 * raw_lux вместо float-деления
-            if raw_lux > 0:
-                wh = self._get_white_channel()
-                if wh > 2 * raw_lux:
-                    _t *= 0.95  # эмпирическая компенсация завышения показаний
-
-        # без коррекции!
-        return _t
+            if self._wh_t is None:
+                return None     # канал белого еще не считывался
+            return self._lux(raw_lux, self._wh_ir)
+        return self._lux(raw_lux, False)
+
+    def _restart_period(self, settle_ms: int):
+        """Запоминает момент готовности первого отсчёта после изменения настроек или пробуждения датчика.
+        settle_ms - время стабилизации датчика перед началом интегрирования."""
+        self._t_next = time.ticks_add(time.ticks_ms(), settle_ms + self.get_conversion_cycle_time())
+
+    def _mark_read(self):
+        """Отмечает, что текущий отсчёт считан. Момент готовности следующего отсчёта сдвигается на целое
+        число периодов преобразования, так как датчик измеряет непрерывно, независимо от чтений."""
+        late = time.ticks_diff(time.ticks_ms(), self._t_next)
+        if late >= 0:
+            period = self.get_conversion_cycle_time()
+            self._t_next = time.ticks_add(self._t_next, (late // period + 1) * period)
+
+    def _ms_to_fresh(self) -> int:
+        """Возвращает время в мс до готовности нового отсчёта (0 - уже готов)"""
+        return max(0, time.ticks_diff(self._t_next, time.ticks_ms()))
+
+    def wait_fresh(self):
+        """Блокирующее ожидание готовности нового отсчёта. Ждёт ровно до завершения текущего периода
+        интегрирования (смотри get_data_status). В режиме shutdown новых отсчётов нет, метод сразу возвращает управление."""
+        if self._als_shutdown:
+            return
+        d = self._ms_to_fresh()
+        if d > 0:
+            time.sleep_ms(d)
+
+    def _read_data(self, addr: int, buf: memoryview):
+        """Считывает регистр данных addr (ALS или WHITE) в buf (срез _buf_4) без выделения памяти.
+        Ошибка шины при чтении данных (например, просадка питания датчика) означает, что содержимое
+        остальных регистров тоже неизвестно, поэтому теневые копии сбрасываются."""
+        try:
+            self._connection.read_buf_from_mem(address=addr, buf=buf, address_size=1)
+        except OSError:
+            self.invalidate_shadow()
+            raise
+
+    def _read_als_white(self):
+        """Считывает каналы ALS и WHITE в буфер _buf_4 двумя транзакциями, следующими одна за другой.
+        VEML7700 не поддерживает последовательное чтение нескольких регистров за одну транзакцию
+        (одна команда - одно 16-ти битное слово), поэтому между чтениями нет никакой другой работы,
+        чтобы оба значения с наибольшей вероятностью относились к одному периоду интегрирования.
+        Результат сохраняется в _last_raw_ill и _last_raw_white."""
+        self._read_data(self.ADDR_RAW_LUX_REG, self._mv_als)
+        self._read_data(self.ADDR_WH_CH_REG, self._mv_white)
+        buf = self._buf_4
+        # little endian, без struct.unpack
+        self._last_raw_ill = buf[0] | (buf[1] << 8)
+        self._last_raw_white = buf[2] | (buf[3] << 8)
+        self._pair_valid = True
+        self._update_white_cache()
+        self._mark_read()
+
+    def _update_white_cache(self):
+        """Запоминает отношение каналов WHITE/ALS и признак ИК-коррекции по только что считанной паре"""
+        als, white = self._last_raw_ill, self._last_raw_white
+        self._wh_ir = 0 < als and white > 2 * als
+        self._wh_ratio_q8 = (white << 8) // als if als else 0
+        self._wh_als = als
+        self._wh_count = 0
+        self._wh_t = time.ticks_ms()
+
+    def _white_due(self, raw_lux: int) -> bool:
+        """Возвращает Истина, если канал белого нужно считать вместе с отсчётом ALS raw_lux (смотри set_white_policy)"""
+        if self._wh_t is None:
+            return True
+        every = self._wh_every
+        if every and self._wh_count + 1 >= every:
+            return True
+        rel = self._wh_rel
+        if rel is not None and abs(raw_lux - self._wh_als) > rel * self._wh_als:
+            return True
+        period = self._wh_period
+        return period is not None and time.ticks_diff(time.ticks_ms(), self._wh_t) >= period
+
+    def _read_als_decimated(self):
+        """Считывает канал ALS и, если это требует политика set_white_policy, сразу вслед за ним канал белого.
+        Иначе для ИК-коррекции используется запомненное отношение каналов."""
+        self._read_data(self.ADDR_RAW_LUX_REG, self._mv_als)
+        buf = self._buf_4
+        raw_lux = buf[0] | (buf[1] << 8)
+        self._last_raw_ill = raw_lux
+        if self._white_due(raw_lux):
+            self._read_data(self.ADDR_WH_CH_REG, self._mv_white)
+            self._last_raw_white = buf[2] | (buf[3] << 8)
+            self._pair_valid = True
+            self._update_white_cache()
+        else:
+            self._pair_valid = False
+            self._wh_count += 1
+        self._mark_read()
+
+    def set_white_policy(self, every: int = 1, rel_change: float | None = None, period_ms: int | None = None):
+        """Задает, когда канал белого считывается для ИК-коррекции в get_measurement_value(0) и measure_once.
+        Между его чтениями используется запомненное отношение WHITE/ALS (спектр источника света меняется
+        медленно), и отсчёт стоит одну транзакцию вместо двух. Канал белого считывается, если выполнено любое условие:
+            every - каждый every-й отсчёт (1 - всегда, по умолчанию; 0 - условие не используется);
+            rel_change - относительное изменение ALS с момента последнего чтения канала белого больше rel_change;
+            period_ms - с момента последнего чтения канала белого прошло не менее period_ms мс.
+        read_als_white и get_measurement_value(2) считывают канал белого всегда.
+
+        Хотя бы одно условие должно использоваться, иначе канал белого не считывался бы никогда.
+
+        Example:
+            >>> sensor.set_white_policy(every=0, rel_change=0.25, period_ms=60_000)
+        """
+        check_value(every, range(0x10000), f"Invalid white channel decimation: {every}")
+        if 0 == every and rel_change is None and period_ms is None:
+            raise ValueError("White channel would never be read: set every, rel_change or period_ms")
+        if rel_change is not None and rel_change <= 0:
+            raise ValueError(f"Invalid relative change: {rel_change}")
+        if period_ms is not None and period_ms <= 0:
+            raise ValueError(f"Invalid white channel period: {period_ms}")
+        self._wh_every = every
+        self._wh_rel = rel_change
+        self._wh_period = period_ms
 
-    def _get_white_channel(self) -> int:
-        """Return white channel output data.
-        Не следует кривой V(lambda) человеческого глаза — чувствителен к ИК-излучению!
-        Второй фотодиод в том же корпусе, но с широкой спектральной чувствительностью (включая ИК-диапазон 750–900 нм)!
-        Назначение: для компенсации погрешности при источниках с ИК-составляющей:"""
-        return self._set_reg(addr=self.ADDR_WH_CH_REG, format_value=FMT_UINT16_LE)
+    @property
+    def white_ratio(self) -> float:
+        """Возвращает отношение WHITE/ALS при последнем чтении канала белого (0 - неизвестно)"""
+        return self._wh_ratio_q8 / 256
+
+    def read_als_white(self) -> tuple:
+        """Возвращает кортеж (raw_als, raw_white, lux) из одного снимка обоих каналов датчика.
+        lux рассчитывается так же, как в get_measurement_value(0), но без повторного чтения
+        по шине (в миллилюксах при use_integer_math в Истина).
+
+        Example:
+            >>> raw_als, raw_white, lux = sensor.read_als_white()
+        """
+        if not (self._skip_stale and self._pair_valid and not self.get_data_status()):
+            self._read_als_white()
+        raw_lux, wh = self._last_raw_ill, self._last_raw_white
+        return raw_lux, wh, self._raw_to_lux(raw_lux, wh)
+
+    def _raw_to_lux(self, raw_lux: int, white: int) -> int | float:
+        """Преобразует сырое значение ALS в освещенность по текущему контексту преобразования.
+        white - сырое значение канала белого для ИК-коррекции (0 - коррекция не выполняется)."""
+        # ИК-коррекция по белому каналу (WHITE/ALS > 2, источник галоген/солнце)
+        # Оптимизация для MCU: white > 2 * raw_lux вместо float-деления
+        return self._lux(raw_lux, white > 2 * raw_lux)
+
+    def _lux(self, raw_lux: int, ir_corr: bool) -> int | float:
+        """Преобразует сырое значение ALS в освещенность по текущему контексту преобразования.
+        ir_corr - источник с ИК-составляющей (WHITE/ALS > 2), выполняется при включенной коррекции."""
+        ir_corr = ir_corr and self._en_non_lin_corr and 0 < raw_lux
+        if self._int_math:
+            return _lux_mlx(raw_lux, self._res_dmlx, self._adc_corr, ir_corr)
+        #
+        _t = raw_lux * self._resolution
+        # 1. Нелинейная коррекция АЦП (только gain 1/8, 1/4 и >100 лк):
+        # 6.0135E-13 * _t ** 4 - 9.3924E-09 * _t ** 3 + 8.1488E-05 * _t ** 2 + 1.0023 * _t, по схеме Горнера.
+        # Таблица вместо полинома - veml7700lut.LutMixin
+        if self._adc_corr and _t > 100:
+            _t *= ((6.0135E-13 * _t - 9.3924E-09) * _t + 8.1488E-05) * _t + 1.0023
+        # 2. эмпирическая компенсация завышения показаний
+        if ir_corr:
+            _t *= 0.95
+        return _t
 
     def get_thresholds(self) -> tuple[int, int]:
         """Return ALS low and high threshold window setting as tuple (low_thr, high_thr)"""
-        low = self._set_reg(addr=self.ADDR_LOW_THRESHOLD_REG, format_value=FMT_UINT16_LE)
-        high = self._set_reg(addr=self.ADDR_HIGH_THRESHOLD_REG, format_value=FMT_UINT16_LE)
+        low = self._read_shadowed(self.ADDR_LOW_THRESHOLD_REG)
+        high = self._read_shadowed(self.ADDR_HIGH_THRESHOLD_REG)
         return low, high
 
     def set_thresholds(self, low: int, high: int) -> None:
@@ -298,16 +667,33 @@ class Veml7700(IBaseSensorEx, Iterator):
         check_value(high, range(65536), f"Invalid high threshold: {high} (0..65535)")
         if low > high:
             raise ValueError(f"Low threshold ({low}) must be <= high ({high})")
-        self._set_reg(addr=self.ADDR_LOW_THRESHOLD_REG, format_value=None, value=low)
-        self._set_reg(addr=self.ADDR_HIGH_THRESHOLD_REG, format_value=None, value=high)
+        self._write_shadowed(self.ADDR_LOW_THRESHOLD_REG, low)
+        self._write_shadowed(self.ADDR_HIGH_THRESHOLD_REG, high)
+
+    def set_thresholds_lux(self, low: float, high: float) -> None:
+        """Установка порогов окна прерываний в люксах. Пороги пересчитываются в отсчёты по текущему
+        разрешению (без нелинейной коррекции) и ограничиваются диапазоном 0..65535."""
+        res = self._resolution
+        self.set_thresholds(low=min(0xFFFF, max(0, int(low / res))), high=min(0xFFFF, max(0, int(high / res) + 1)))
 
     @property
     def last_raw(self)->int:
         """Возвращает последнее, считанное из датчика, сырое значение освещенности"""
         return self._last_raw_ill
 
-    def __next__(self) -> float:
-        return self.get_measurement_value(value_index=0)
+    @property
+    def last_white(self) -> int:
+        """Возвращает последнее, считанное из датчика, сырое значение канала белого"""
+        return self._last_raw_white
+
+    def __next__(self) -> int | float:
+        """Ждёт готовности нового отсчёта (wait_fresh) и возвращает get_measurement_value(0).
+        Каждый отсчёт датчика возвращается один раз, поэтому итератор задает темп цепочке фильтров
+        (sensor_pack_2.filters). В shutdown выполняется однократное измерение (measure_once)."""
+        if self._als_shutdown:
+            return self.measure_once(0)
+        self.wait_fresh()
+        return self.get_measurement_value(0)
 
     @micropython.native
     def get_conversion_cycle_time(self, offset: int = 100) -> int:
@@ -316,14 +702,50 @@ class Veml7700(IBaseSensorEx, Iterator):
         measurement results, at least for the programmed integration time. For example, for ALS_IT = 100 ms a wait time
         of ≥ 100 ms is needed. A more simple way of continuous measurements can be realized by activating the PSM feature,
         setting PSM_EN = 1."""
-        base = 25 * 2 ** self._als_it_index
+        base = self._it_ms
         if not self._enable_psm:
             return base
+        tbl = self._refresh_table
+        if tbl is not None:
+            t = tbl[4 * self._als_it_index + self._psm]
+            if t:
+                return t    # измерено калибровкой (veml7700calib)
         # весь код ниже этой строки в этой функции под вопросом. документация на Veml7700
         # не позволяет мне понять алгоритм вычисления времени преобразования датчика при включенном режиме
         # экономии электроэнергии (power save mode)!
         return offset + base + 500 * (2 ** self._psm)
 
+    def get_conversion_cycle_time_for(self, it_index: int, enable_psm: bool, psm: int, offset: int = 100) -> int:
+        """Возвращает период преобразования [мс], как get_conversion_cycle_time, для времени интегрирования
+        it_index и режима экономии энергии (enable_psm, psm) без их установки и без обмена по шине.
+        Позволяет выбрать режим до записи в регистры датчика."""
+        base = Veml7700._get_integration_time(it_index)
+        if not enable_psm:
+            return base
+        tbl = self._refresh_table
+        if tbl is not None:
+            t = tbl[4 * it_index + psm]
+            if t:
+                return t
+        return offset + base + 500 * (2 ** psm)
+
+    @property
+    def refresh_table(self) -> list | None:
+        """Возвращает таблицу измеренных периодов обновления данных [мс] в режиме экономии энергии:
+        24 значения, индекс it_index * 4 + psm, 0 - не измерен. None - таблицы нет."""
+        if self._refresh_table is None:
+            return None
+        return list(self._refresh_table)
+
+    @refresh_table.setter
+    def refresh_table(self, value):
+        """Устанавливает таблицу периодов обновления данных (24 целых значения) или None"""
+        if value is not None:
+            if 24 != len(value):
+                raise ValueError(f"Invalid refresh table length: {len(value)}")
+            value = [int(t) for t in value]
+        self._refresh_table = value
+
     def start_measurement(self):
         """Запускает процесс измерения освещённости.
 
@@ -342,25 +764,53 @@ class Veml7700(IBaseSensorEx, Iterator):
         # Если в shutdown — выходим из него
         if self._als_shutdown:
             # Перезаписываем конфиг с ALS_SD=0, сохраняя остальные параметры
-            self.write_config(gain_index=self._als_gain_index, it_index=self._als_it_index,
-                              persistence=self._als_pers,int_en=self._als_int_en, shutdown=False)
-            self._als_shutdown = False
+            self.write_config(gain_index=self._als_gain_index, it_index=self._als_it_index, shutdown=False)
+
+    def measure_once(self, value_index: int | None = 0) -> int | float:
+        """Однократное измерение (эмуляция single-shot режима, которого нет у VEML7700):
+        выход из shutdown, стабилизация (>= 2.5 мс), ровно один период интегрирования, чтение ALS
+        (и WHITE, если он нужен для value_index или ИК-коррекции) и возврат в shutdown.
+        Регистр CFG записывается два раза (пробуждение и shutdown), остальные настройки не меняются.
+        Между вызовами датчик находится в shutdown и почти не потребляет тока.
+        Если датчик уже активен, ждёт готовности отсчёта, считывает его и переводит датчик в shutdown.
+        value_index - как в get_measurement_value. Время в активном режиме и в shutdown - power_stats.
+
+        Example:
+            >>> sensor.write_config(gain_index=3, it_index=2, shutdown=True)
+            >>> while True:
+            ...     lux = sensor.measure_once()
+            ...     time.sleep(60)
+        """
+        addr = self.ADDR_CFG_REG
+        cfg = Veml7700._make_cfg(self._als_gain_index, Veml7700._it_index_to_raw_it(self._als_it_index),
+                                 self._als_pers, self._als_int_en, False)
+        if self._als_shutdown:
+            self._write_shadowed(addr, cfg)
+            self._track_power(False)
+            # стабилизация после выхода из shutdown и один период интегрирования
+            time.sleep_ms(3 + self._it_ms)
+        else:
+            self.wait_fresh()
+        val = self._read_sample(value_index)
+        self._write_shadowed(addr, cfg | 0x01)
+        self._track_power(True)
+        return val
 
     def get_data_status(self, raw: bool = True):
         """
-        Возвращает готовность данных.
-        Для VEML7700 данные в регистре ALS всегда актуальны после завершения
-        интеграции. Этот метод возвращает True, если датчик активен.
+        Возвращает готовность нового (еще не считанного) отсчёта.
+        Для VEML7700 данные в регистре ALS обновляются после завершения каждого периода интегрирования.
+        Этот метод возвращает True, если датчик активен и с момента последнего чтения, изменения настроек
+        или пробуждения завершился очередной период преобразования (get_conversion_cycle_time).
         """
-        return not self._als_shutdown
+        return not self._als_shutdown and time.ticks_diff(time.ticks_ms(), self._t_next) >= 0
 
     def is_single_shot_mode(self) -> bool:
-        """VEML7700 не поддерживает аппаратный single-shot.
-        Возвращает False всегда. Метод start_measurement() эмулирует
-        "запуск" через выход из shutdown, но измерения продолжаются
-        непрерывно до явного перевода в shutdown.
+        """VEML7700 не поддерживает аппаратный single-shot, он эмулируется методом measure_once.
+        Возвращает Истина, когда датчик находится в shutdown: измерения выполняются только вызовом
+        measure_once, после которого датчик снова переходит в shutdown.
         """
-        return False
+        return self._als_shutdown
 
     def is_continuously_mode(self) -> bool:
         """Возвращает Истина, когда датчик находится в режиме многократных измерений,
@@ -370,14 +820,18 @@ class Veml7700(IBaseSensorEx, Iterator):
     @property
     def gain(self) -> tuple[int, float]:
         """Возвращает коэффициент усиления (raw_gain, gain)"""
-        rg = self._als_gain_index
-        return rg, Veml7700._raw_gain_to_gain(rg)
+        return self._als_gain_index, self._gain
 
     @property
     def integration_time(self) -> tuple[int, int]:
         """Возвращает время интегрирования (raw_integration_time, integration_time_ms)"""
-        rit = self._als_it_index
-        return rit, self._get_integration_time(rit)
+        return self._als_it_index, self._it_ms
+
+    @property
+    def max_possible_illumination(self) -> float:
+        """Возвращает максимально возможный уровень освещенности в lux для текущих настроек датчика.
+        В отличие от get_max_possible_illumination, берется из контекста преобразования без вычислений."""
+        return self._max_ill
 
     @property
     def use_non_linear_correction(self) -> bool:
@@ -389,4 +843,27 @@ class Veml7700(IBaseSensorEx, Iterator):
     def use_non_linear_correction(self, value: bool):
         """Устанавливает признак использования нелинейной коррекции освещенности.
         Смотри страницу 21 документа 'Designing the VEML7700 Into an Application'"""
-        self._en_non_lin_corr = value
\ No newline at end of file
+        self._en_non_lin_corr = value
+        self._adc_corr = value and self._als_gain_index in (2, 3)
+
+    @property
+    def skip_stale_reads(self) -> bool:
+        """Возвращает Истина, если чтение до готовности нового отсчёта возвращает последний
+        считанный отсчёт без обмена по шине"""
+        return self._skip_stale
+
+    @skip_stale_reads.setter
+    def skip_stale_reads(self, value: bool):
+        """Включает (Истина) или выключает (Ложь) чтение последнего отсчёта без обмена по шине"""
+        self._skip_stale = value
+
+    @property
+    def use_integer_math(self) -> bool:
+        """Возвращает Истина, если get_measurement_value(0) возвращает освещенность в миллилюксах (int),
+        рассчитанную только целочисленной арифметикой. Для MCU без FPU (ESP8266, Cortex-M0)."""
+        return self._int_math
+
+    @use_integer_math.setter
+    def use_integer_math(self, value: bool):
+        """Включает (Истина) или выключает (Ложь) целочисленный режим расчёта освещенности"""
+        self._int_math = value